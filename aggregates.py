@@ -0,0 +1,163 @@
+import bisect
+
+import numpy as np
+import pandas as pd
+
+# Предрассчитанный куб агрегатов: год x страна x показатель x статистика.
+# Последний элемент по осям года и страны - итог "по всем годам" / "по всем странам".
+# Страницы берут из куба готовые срезы вместо groupby по всей таблице.
+
+INDICATORS = ['world_rank', 'teaching', 'international', 'research', 'citations', 'income',
+              'total_score', 'num_students', 'student_staff_ratio', 'international_students',
+              'female_percentage']
+STATISTICS = ['mean', 'count', 'min', 'max', 'p25', 'p50', 'p75']
+QUANTILES = {'p25': 0.25, 'p50': 0.5, 'p75': 0.75}
+
+ALL = None
+
+
+class AggregateCube:
+
+    def __init__(self, indicators=INDICATORS):
+        self.indicators = list(indicators)
+        self.years = []
+        self.countries = []
+        self._indicator_pos = {name: i for i, name in enumerate(self.indicators)}
+        self._stat_pos = {name: i for i, name in enumerate(STATISTICS)}
+        self._year_pos = {}
+        self._country_pos = {}
+        # Пока есть только итоговые ячейки
+        self.values = np.full((1, 1, len(self.indicators), len(STATISTICS)), np.nan)
+        self.values[..., self._stat_pos['count']] = 0
+        self.rows = np.zeros((1, 1), dtype=np.int64)
+
+    @classmethod
+    def from_frame(cls, frame, indicators=INDICATORS):
+        cube = cls(indicators)
+        for year, year_frame in frame.groupby('year', sort=True):
+            cube.update_year(year, year_frame, recompute_totals=False)
+        cube._recompute_all_years()
+        return cube
+
+    @classmethod
+    def from_arrays(cls, indicators, years, countries, values, rows):
+        # Куб поверх готовых массивов без пересчета (например, отображенных из общего файла, см. shared_store.py)
+        cube = cls(indicators)
+        cube.years = [int(year) for year in years]
+        cube.countries = list(countries)
+        cube._year_pos = {value: i for i, value in enumerate(cube.years)}
+        cube._country_pos = {value: i for i, value in enumerate(cube.countries)}
+        cube.values = values
+        cube.rows = rows
+        return cube
+
+    def copy(self):
+        # Независимая копия (массивы общего файла доступны только для чтения)
+        return AggregateCube.from_arrays(self.indicators, self.years, self.countries, self.values.copy(),
+                                         self.rows.copy())
+
+    def _empty_cells(self, shape):
+        cells = np.full(shape + (len(self.indicators), len(STATISTICS)), np.nan)
+        cells[..., self._stat_pos['count']] = 0
+        return cells
+
+    def _add_year(self, year):
+        position = bisect.bisect(self.years, year)
+        self.years.insert(position, year)
+        self.values = np.insert(self.values, position, self._empty_cells((len(self.countries) + 1,)), axis=0)
+        self.rows = np.insert(self.rows, position, 0, axis=0)
+        self._year_pos = {value: i for i, value in enumerate(self.years)}
+
+    def _add_countries(self, countries):
+        position = len(self.countries)
+        self.countries.extend(countries)
+        cells = self._empty_cells((self.values.shape[0], len(countries)))
+        self.values = np.concatenate([self.values[:, :position], cells, self.values[:, position:]], axis=1)
+        self.rows = np.concatenate([self.rows[:, :position],
+                                    np.zeros((self.rows.shape[0], len(countries)), dtype=np.int64),
+                                    self.rows[:, position:]], axis=1)
+        self._country_pos = {value: i for i, value in enumerate(self.countries)}
+
+    def _statistics(self, grouped):
+        # grouped - groupby по странам, результат: статистика -> таблица (страна x показатель)
+        stats = {'mean': grouped.mean(), 'count': grouped.count(), 'min': grouped.min(), 'max': grouped.max()}
+        quantiles = grouped.quantile(list(QUANTILES.values()))
+        for name, q in QUANTILES.items():
+            stats[name] = quantiles.xs(q, level=-1)
+        return stats
+
+    def update_year(self, year, year_frame, recompute_totals=True):
+        # Пересчитывается только срез одного года (и итоги по всем годам, они дешевые)
+        year = int(year)
+        new_countries = [country for country in pd.unique(year_frame['country'].dropna())
+                         if country not in self._country_pos]
+        if new_countries:
+            self._add_countries(new_countries)
+        if year not in self._year_pos:
+            self._add_year(year)
+
+        y = self._year_pos[year]
+        self.values[y] = self._empty_cells((len(self.countries) + 1,))
+        self.rows[y] = 0
+        values = year_frame[self.indicators].astype(np.float64)
+        grouped = values.groupby(year_frame['country'], observed=True)
+        positions = [self._country_pos[country] for country in grouped.size().index]
+        # Страны может не быть ни у одной строки (в Шанхайском рейтинге ее нет вовсе) - тогда только итог
+        if positions:
+            for name, table in self._statistics(grouped).items():
+                self.values[y, positions, :, self._stat_pos[name]] = table.to_numpy()
+            self.rows[y, positions] = grouped.size().to_numpy()
+        # Итог по всем странам за год - та же статистика по одной общей группе
+        overall = values.groupby(np.zeros(len(values), dtype=np.int8))
+        for name, table in self._statistics(overall).items():
+            self.values[y, -1, :, self._stat_pos[name]] = table.to_numpy()[0]
+        self.rows[y, -1] = len(values)
+
+        if recompute_totals:
+            self._recompute_all_years()
+
+    def _recompute_all_years(self):
+        # Итоги по всем годам собираются из годовых срезов: среднее взвешивается числом значений.
+        # Процентили так не складываются, поэтому в итогах по годам их нет (NaN).
+        per_year = self.values[:-1]
+        counts = per_year[..., self._stat_pos['count']]
+        totals = self._empty_cells((len(self.countries) + 1,))
+        total_counts = counts.sum(axis=0)
+        weighted = np.nansum(per_year[..., self._stat_pos['mean']] * counts, axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            totals[..., self._stat_pos['mean']] = np.where(total_counts > 0, weighted / total_counts, np.nan)
+        totals[..., self._stat_pos['count']] = total_counts
+        has_values = (counts > 0).any(axis=0)
+        for name, reduce in [('min', np.fmin.reduce), ('max', np.fmax.reduce)]:
+            stat = reduce(per_year[..., self._stat_pos[name]], axis=0) if len(per_year) else np.nan
+            totals[..., self._stat_pos[name]] = np.where(has_values, stat, np.nan)
+        self.values[-1] = totals
+        self.rows[-1] = self.rows[:-1].sum(axis=0)
+
+    def _year_index(self, year):
+        return -1 if year is ALL else self._year_pos[int(year)]
+
+    def _country_index(self, country):
+        return -1 if country is ALL else self._country_pos[country]
+
+    def get(self, indicator, stat='mean', year=ALL, country=ALL):
+        return self.values[self._year_index(year), self._country_index(country),
+                           self._indicator_pos[indicator], self._stat_pos[stat]]
+
+    def by_year(self, indicators, stat='mean', country=ALL):
+        # Таблица год -> значения показателей (для линейных графиков по годам)
+        indicators = [indicators] if isinstance(indicators, str) else list(indicators)
+        c = self._country_index(country)
+        cells = self.values[:-1, c][:, [self._indicator_pos[name] for name in indicators], self._stat_pos[stat]]
+        result = pd.DataFrame(cells, columns=indicators)
+        result.insert(0, 'year', self.years)
+        return result[self.rows[:-1, c] > 0].reset_index(drop=True)
+
+    def by_country(self, indicators, stat='mean', year=ALL):
+        # Таблица страна -> значения показателей (для карты и столбчатой диаграммы)
+        indicators = [indicators] if isinstance(indicators, str) else list(indicators)
+        y = self._year_index(year)
+        cells = self.values[y, :-1][:, [self._indicator_pos[name] for name in indicators], self._stat_pos[stat]]
+        result = pd.DataFrame(cells, columns=indicators)
+        result.insert(0, 'country', self.countries)
+        return result[self.rows[y, :-1] > 0].reset_index(drop=True)
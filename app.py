@@ -1,12 +1,29 @@
+import hmac
+
 import dash_bootstrap_components as dbc
 
 from dash import Dash, Input, Output, dcc, html
-from pages import country_sravnenie, main, university_results, global_tendensii, university_sravnenie
+from flask import Response, abort, jsonify, request, stream_with_context
+
+import config
+import data
+import export
+import http_cache
+import sources
+from figure_cache import cache
+from metrics import metrics
+from page_registry import registry
+from reloader import reloader
 
 external_stylesheets = [dbc.themes.PULSE] 
 app = Dash(__name__, external_stylesheets=external_stylesheets,  use_pages=True)
 app.config.suppress_callback_exceptions = True
 
+# Модули страниц регистрируют колбэки при импорте; данные и макеты загружаются при первом открытии страницы
+registry.import_all()
+if config.PAGE_WARMUP:
+    registry.start_warm_up()
+
 # Задаем аргументы стиля для боковой панели. Мы используем position:fixed и фиксированную ширину
 SIDEBAR_STYLE = {
     "position": "fixed",
@@ -29,6 +46,16 @@ sidebar = html.Div(
     [
         html.H2("Показатели университетов мира", className="display-6"),
         html.Hr(),
+        # Источник рейтингов для всех страниц: колбэки страниц получают его как State('ranking-source')
+        dbc.Label("Рейтинг:"),
+        dcc.Dropdown(
+            id='ranking-source',
+            options=sources.options(),
+            value=config.DEFAULT_SOURCE,
+            clearable=False,
+            persistence=True,
+            className="mb-3",
+        ),
         dbc.Nav(
             [
                 dbc.NavLink("О проекте", href="/page-3", active="exact"),
@@ -36,6 +63,7 @@ sidebar = html.Div(
                 dbc.NavLink("Сравнение стран", href="/page-1", active="exact"),
                 dbc.NavLink("Результаты университетов", href="/page-2", active="exact"),
                 dbc.NavLink("Сравнение университетов", href="/page-4", active="exact"),
+                dbc.NavLink("Лидеры по показателям", href="/page-5", active="exact"),
             ],
             vertical=True,
             pills=True,
@@ -50,18 +78,13 @@ app.layout = html.Div([dcc.Location(id="url"), sidebar, content])
 
 @app.callback(
     Output("page-content", "children"),
-    [Input("url", "pathname")])
-def render_page_content(pathname):
-    if pathname == "/":
-        return global_tendensii.layout
-    elif pathname == "/page-1":
-        return country_sravnenie.layout
-    elif pathname == "/page-2":
-        return university_results.layout
-    elif pathname == "/page-3":
-        return main.layout
-    elif pathname == "/page-4":
-        return university_sravnenie.layout
+    [Input("url", "pathname"),
+     Input("ranking-source", "value")])
+@metrics.instrumented('app.render_page_content')
+def render_page_content(pathname, source=None):
+    # Смена источника пересобирает страницу: колбэки новых компонентов сработают уже с новым источником
+    if pathname in registry:
+        return registry.layout(pathname, source)
     # Если пользователь попытается перейти на другую страницу, верните сообщение 404. Мы изменим её в следующей практической.
     return html.Div(
         [
@@ -72,6 +95,91 @@ def render_page_content(pathname):
         className="p-3 bg-light rounded-3",
     )
 
+# Счетчики кэша фигур: попадания, промахи, вытеснения
+@app.server.route('/stats/figure-cache')
+def figure_cache_stats():
+    return jsonify(cache.stats())
+
+# Время импорта и первой загрузки каждой страницы и загрузки датасета
+@app.server.route('/stats/pages')
+def page_stats():
+    return jsonify(registry.stats())
+
+# Загруженные источники рейтингов, их память и выгрузки по бюджету памяти
+@app.server.route('/stats/sources')
+def source_stats():
+    return jsonify(data.stats())
+
+# Размер ответа и время кодирования JSON для метрик колбэков
+@app.server.before_request
+def start_callback_metrics():
+    metrics.start_request()
+
+@app.server.after_request
+def record_callback_metrics(response):
+    if request.path.endswith('/_dash-update-component'):
+        metrics.observe_response(response.calculate_content_length() or 0)
+    return response
+
+# Сжатие, ETag и ответы 304 (регистрируется после метрик, поэтому метрики видят размер сжатого ответа)
+http_cache.init_app(app.server)
+
+# Метрики колбэков в формате Prometheus
+@app.server.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+# Профиль выборки вызовов колбэка (при UNIVERSITY_METRICS_PROFILE_RATE > 0)
+@app.server.route('/stats/profile/<name>')
+def callback_profile(name):
+    report = metrics.profile_report(name)
+    if report is None:
+        abort(404)
+    return Response(report, mimetype='text/plain')
+
+# Выгрузка среза данных потоком: /export/csv?university=...&country=...&year=2016&indicator=research
+# (параметры можно повторять; без фильтра - все строки и все показатели; source - источник рейтингов)
+@app.server.route('/export/<fmt>')
+def export_slice(fmt):
+    try:
+        state = data.current(sources.require(request.args.get('source')).name)
+        chunks = export.stream(
+            state, fmt,
+            universities=request.args.getlist('university'),
+            countries=request.args.getlist('country'),
+            years=request.args.getlist('year'),
+            indicators=request.args.getlist('indicator'),
+        )
+    except ValueError as error:
+        abort(400, description=str(error))
+    return Response(stream_with_context(chunks), content_type=export.FORMATS[fmt],
+                    headers={'Content-Disposition':
+                             f'attachment; filename=universities-{state.source}-{state.version}.{fmt}'})
+
+# Перезагрузка датасета без перезапуска (см. reloader.py): POST запускает сборку в фоне, GET - ее состояние.
+# Доступно только с заголовком X-Admin-Token, равным UNIVERSITY_ADMIN_TOKEN
+@app.server.route('/admin/reload', methods=['GET', 'POST'])
+def admin_reload():
+    if not config.ADMIN_TOKEN:
+        abort(404)
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), config.ADMIN_TOKEN):
+        abort(403)
+    if request.method == 'POST':
+        return jsonify(started=reloader.start(), **reloader.status), 202
+    return jsonify(reloader.status)
+
+# Проверки для балансировщика и оркестратора: процесс жив / датасет и страницы загружены
+@app.server.route('/healthz')
+def healthz():
+    return jsonify(status='ok')
+
+@app.server.route('/readyz')
+def readyz():
+    ready = data.is_loaded() and all(registry.is_loaded(path) for path in registry.routes)
+    return jsonify(ready=ready, version=data.current().version if ready else None), 200 if ready else 503
+
+# Сервер для разработки (с отладкой и перезагрузкой). В продакшене: gunicorn -c gunicorn.conf.py wsgi:server
 if __name__ == '__main__':
-        app.run_server(debug=True)
+    reloader.start_watcher()
+    app.run(debug=True)
 
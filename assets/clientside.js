@@ -0,0 +1,35 @@
+// Клиентские колбэки. Dash подключает файлы из assets/ автоматически.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    variants: {
+        // store = {base: [...], variants: {key: [...]}}, см. clientside.py.
+        // Возвращает выходы колбэка для выбранного значения переключателя без запроса к серверу.
+        apply: function (key, store) {
+            if (!store || !store.variants[key]) {
+                return window.dash_clientside.no_update;
+            }
+            var outputs = store.base.map(function (base, i) {
+                var diff = store.variants[key][i];
+                if (!base || typeof base !== 'object' || !Array.isArray(base.data)) {
+                    return diff;
+                }
+                if (diff.figure) {
+                    return diff.figure;
+                }
+                var removed = diff.removed || {data: [], layout: []};
+                var without = function (object, keys) {
+                    (keys || []).forEach(function (key) {
+                        delete object[key];
+                    });
+                    return object;
+                };
+                return {
+                    data: base.data.map(function (trace, j) {
+                        return without(Object.assign({}, trace, diff.data[j]), removed.data[j]);
+                    }),
+                    layout: without(Object.assign({}, base.layout, diff.layout), removed.layout)
+                };
+            });
+            return outputs.length === 1 ? outputs[0] : outputs;
+        }
+    }
+});
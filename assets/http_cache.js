@@ -0,0 +1,55 @@
+// Условные запросы для колбэков (см. http_cache.py). Браузер не кэширует ответы на POST, поэтому
+// ответы /_dash-update-component хранятся здесь по телу запроса вместе с ETag. Повторный запрос
+// с теми же входами уходит с If-None-Match; на 304 сервер не вызывает колбэк, а ответ берется отсюда.
+// Хранится не больше MAX_BYTES символов ответов, давно не использованные удаляются первыми.
+(function () {
+    var ENDPOINT = '_dash-update-component';
+    var MAX_BYTES = 16 * 1024 * 1024;
+    var entries = new Map();
+    var size = 0;
+    var fetch = window.fetch.bind(window);
+
+    function remember(key, entry) {
+        forget(key);
+        entries.set(key, entry);
+        size += entry.body.length;
+        while (size > MAX_BYTES && entries.size) {
+            forget(entries.keys().next().value);
+        }
+    }
+
+    function forget(key) {
+        var entry = entries.get(key);
+        if (entry) {
+            size -= entry.body.length;
+            entries.delete(key);
+        }
+    }
+
+    window.fetch = function (input, init) {
+        var url = typeof input === 'string' ? input : input.url;
+        if (!init || init.method !== 'POST' || typeof init.body !== 'string' || url.indexOf(ENDPOINT) === -1) {
+            return fetch(input, init);
+        }
+        var key = init.body;
+        var cached = entries.get(key);
+        var headers = new Headers(init.headers || {});
+        if (cached) {
+            headers.set('If-None-Match', cached.etag);
+        }
+        return fetch(input, Object.assign({}, init, {headers: headers})).then(function (response) {
+            if (response.status === 304 && cached) {
+                remember(key, cached);
+                return new Response(cached.body, {status: 200, headers: {'Content-Type': 'application/json'}});
+            }
+            var etag = response.headers.get('ETag');
+            if (response.status !== 200 || !etag) {
+                return response;
+            }
+            return response.text().then(function (body) {
+                remember(key, {etag: etag, body: body});
+                return new Response(body, {status: 200, statusText: response.statusText, headers: response.headers});
+            });
+        });
+    };
+})();
@@ -0,0 +1,272 @@
+# Бенчмарк колбэков: задержка (p50/p95/p99), размер ответа и пиковая память.
+#   direct - функции колбэков вызываются напрямую на наборах входов (кэш фигур очищается перед каждым
+#            вызовом, поэтому меряется построение, а не поиск в кэше)
+#   http   - те же колбэки через /_dash-update-component тестового клиента Flask (разбор запроса,
+#            сериализация ответа Dash)
+# Наборы входов: все показатели для global_tendensii и country_sravnenie, все университеты для
+# university_results, растущий выбор университетов для university_sravnenie (полная перерисовка
+# и частичное обновление), поисковые запросы для выпадающих списков, макеты всех страниц.
+# Результаты сохраняются в JSON; --compare сравнивает прогон с сохраненным и отмечает регрессии.
+#
+# Запуск из корня проекта:
+#   python benchmarks/callbacks.py --output results.json
+#   python benchmarks/callbacks.py --rows 500000 --universities 200 --compare results.json
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+SELECTION_SIZES = [1, 2, 5, 10, 20, 50]
+QUERIES = ['u', 'uni', 'univ of', 'tech', 'state', 'japan', 'oxfrd', 'zzz']
+
+
+def direct_cases(universities, year):
+    from pages import country_sravnenie, global_tendensii, university_results, university_sravnenie
+    import app
+
+    yield 'global_tendensii.update_line_graph', global_tendensii.update_line_graph, \
+        [(indicator,) for indicator in global_tendensii.INDICATORS]
+    yield 'country_sravnenie.update_graphs', country_sravnenie.update_graphs, \
+        [(indicator,) for indicator in country_sravnenie.INDICATORS]
+    yield 'university_results.update_graphs', university_results.update_graphs, \
+        [(university,) for university in universities]
+
+    sizes = [k for k in SELECTION_SIZES if k <= len(universities)]
+    yield 'university_sravnenie.update_graphs[full]', university_sravnenie.update_graphs, \
+        [(universities[:k], year, None) for k in sizes]
+    # Частичное обновление: к уже нарисованному выбору добавляется один университет
+    yield 'university_sravnenie.update_graphs[patch]', university_sravnenie.update_graphs, \
+        [(universities[:k], year, {'universities': universities[:k - 1], 'year': year}) for k in sizes if k > 1]
+
+    if hasattr(university_results, 'update_university_options'):
+        yield 'university_results.update_university_options', university_results.update_university_options, \
+            [(query, universities[0]) for query in QUERIES]
+        yield 'university_sravnenie.update_university_options', university_sravnenie.update_university_options, \
+            [(query, universities[:5]) for query in QUERIES]
+
+    yield 'app.render_page_content', app.render_page_content, [(path,) for path in app.registry.routes]
+
+
+def http_cases(universities, year):
+    # (первый выход колбэка, значения входов, значения состояний)
+    import app
+    import config
+    from pages import global_tendensii
+
+    yield 'page-content', [([path, config.DEFAULT_SOURCE], []) for path in app.registry.routes]
+    yield 'line-graph', [([indicator], []) for indicator in global_tendensii.INDICATORS]
+    yield 'choropleth-map', [([indicator], []) for indicator in global_tendensii.INDICATORS]
+    yield 'line-graph-ranking', [([university], []) for university in universities]
+    sizes = [k for k in SELECTION_SIZES if k <= len(universities)]
+    yield 'criteria-comparison', [([universities[:k], year], [None]) for k in sizes]
+    yield 'university-dropdown', [([query], [universities[0]]) for query in QUERIES]
+
+
+def _outputs(spec):
+    # '..a.figure...b.figure..' -> [{'id': 'a', 'property': 'figure'}, ...]
+    def parse(item):
+        component, prop = item.rsplit('.', 1)
+        return {'id': component, 'property': prop}
+
+    if spec.startswith('..'):
+        return [parse(item) for item in spec[2:-2].split('...')]
+    return parse(spec)
+
+
+class DashClient:
+
+    def __init__(self, app):
+        self.client = app.server.test_client()
+        self.dependencies = {}
+        for dependency in json.loads(self.client.get('/_dash-dependencies').data):
+            if dependency.get('clientside_function'):
+                continue
+            outputs = _outputs(dependency['output'])
+            first = outputs[0] if isinstance(outputs, list) else outputs
+            self.dependencies[first['id']] = dependency
+
+    def body(self, output_id, values, states):
+        dependency = self.dependencies[output_id]
+        inputs = [dict(item, value=value) for item, value in zip(dependency['inputs'], values)]
+        states = list(states) + [None] * (len(dependency['state']) - len(states))
+        return {
+            'output': dependency['output'],
+            'outputs': _outputs(dependency['output']),
+            'inputs': inputs,
+            'state': [dict(item, value=value) for item, value in zip(dependency['state'], states)],
+            'changedPropIds': [f"{inputs[0]['id']}.{inputs[0]['property']}"],
+        }
+
+    def post(self, body):
+        response = self.client.post('/_dash-update-component', json=body)
+        if response.status_code not in (200, 204):
+            raise RuntimeError(f'{body["output"]}: HTTP {response.status_code}')
+        return len(response.data)
+
+
+def summarize(latencies, sizes, peak):
+    latencies = np.array(latencies) * 1000
+    return {
+        'calls': len(latencies),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'mean_bytes': float(np.mean(sizes)),
+        'max_bytes': int(np.max(sizes)),
+        'peak_memory_kib': peak / 1024 if peak is not None else None,
+    }
+
+
+def peak_memory(call, inputs):
+    # Пиковое выделение памяти Python (tracemalloc) за один вызов; отдельный проход, он замедляет вызовы
+    tracemalloc.start()
+    peak = 0
+    try:
+        for args in inputs:
+            tracemalloc.reset_peak()
+            call(args)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def invoke(func, args):
+    from dash.exceptions import PreventUpdate
+    from figure_cache import cache
+
+    cache.clear()
+    try:
+        return func(*args)
+    except PreventUpdate:
+        # Поиск с пустым запросом - обычный ответ колбэка без обновления
+        return None
+
+
+def run_direct(universities, year, memory_samples):
+    from plotly.io.json import to_json_plotly
+
+    results = {}
+    for name, func, inputs in direct_cases(universities, year):
+        latencies, sizes = [], []
+        for args in inputs:
+            started = time.perf_counter()
+            result = invoke(func, args)
+            latencies.append(time.perf_counter() - started)
+            sizes.append(len(to_json_plotly(result)) if result is not None else 0)
+        peak = peak_memory(lambda args: invoke(func, args), inputs[:memory_samples])
+        results[name] = summarize(latencies, sizes, peak)
+    return results
+
+
+def run_http(universities, year, memory_samples):
+    import app
+    from figure_cache import cache
+
+    client = DashClient(app.app)
+    results = {}
+    for output_id, cases in http_cases(universities, year):
+        if output_id not in client.dependencies:
+            # Колбэк выполняется в браузере (INDICATOR_SWITCHING='client')
+            continue
+        bodies = [client.body(output_id, values, states) for values, states in cases]
+        latencies, sizes = [], []
+        for body in bodies:
+            cache.clear()
+            started = time.perf_counter()
+            sizes.append(client.post(body))
+            latencies.append(time.perf_counter() - started)
+
+        def post(body):
+            cache.clear()
+            client.post(body)
+
+        results[f'http:{output_id}'] = summarize(latencies, sizes, peak_memory(post, bodies[:memory_samples]))
+    return results
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path) as f:
+        baseline = json.load(f)['cases']
+    print(f"\n{'case':<52} {'p50 before':>11} {'p50 now':>9} {'ratio':>7}")
+    regressions = 0
+    for name, case in results.items():
+        if name not in baseline:
+            continue
+        ratio = case['p50_ms'] / baseline[name]['p50_ms'] if baseline[name]['p50_ms'] else float('inf')
+        flag = '  REGRESSION' if ratio > threshold else ''
+        regressions += bool(flag)
+        print(f"{name:<52} {baseline[name]['p50_ms']:>11.2f} {case['p50_ms']:>9.2f} {ratio:>7.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=0, help='синтетическая таблица вместо timesData.csv')
+    parser.add_argument('--universities', type=int, default=0, help='ограничить число университетов (0 - все)')
+    parser.add_argument('--memory-samples', type=int, default=5, help='вызовов на случай для замера памяти')
+    parser.add_argument('--skip-http', action='store_true')
+    parser.add_argument('--output', help='сохранить результаты в JSON')
+    parser.add_argument('--compare', help='JSON прошлого прогона для сравнения')
+    parser.add_argument('--threshold', type=float, default=1.2, help='во сколько раз p50 может вырасти')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.rows:
+            # Синтетический CSV и его снимок - во временном каталоге, настройки читаются при импорте config
+            from synthetic import make_raw
+            make_raw(args.rows).to_csv(os.path.join(directory, 'timesData.csv'), index=False)
+            os.environ['UNIVERSITY_DATA_DIR'] = directory
+            os.environ['UNIVERSITY_SHARED_STORE_DIR'] = directory
+        os.environ.setdefault('UNIVERSITY_PAGE_WARMUP', '0')
+
+        import app  # noqa: F401  (регистрирует колбэки всех страниц)
+        import config
+        import data
+
+        universities = list(data.university_index.names)
+        if args.universities:
+            universities = universities[:args.universities]
+        year = int(data.df['year'].max())
+
+        results = run_direct(universities, year, args.memory_samples)
+        if not args.skip_http:
+            results.update(run_http(universities, year, args.memory_samples))
+
+        report = {
+            'meta': {
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'dataset_version': data.version,
+                'rows': len(data.df),
+                'universities': len(universities),
+                'indicator_switching': config.INDICATOR_SWITCHING,
+                'search_mode': config.UNIVERSITY_SEARCH_MODE,
+            },
+            'cases': results,
+        }
+
+    print(f"{'case':<52} {'calls':>6} {'p50, ms':>8} {'p95, ms':>8} {'p99, ms':>8} {'bytes':>9} {'peak, KiB':>10}")
+    for name, case in results.items():
+        print(f"{name:<52} {case['calls']:>6} {case['p50_ms']:>8.2f} {case['p95_ms']:>8.2f} {case['p99_ms']:>8.2f} "
+              f"{case['mean_bytes']:>9.0f} {case['peak_memory_kib']:>10.0f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
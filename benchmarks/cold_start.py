@@ -0,0 +1,68 @@
+# Сравнение холодного старта слоя данных:
+#   csv-http  - прежний путь, pd.read_csv по ссылке на GitHub
+#   csv-local - разбор локальной копии CSV
+#   snapshot  - загрузка бинарного снимка (data.read_snapshot)
+# Каждый вариант запускается в отдельном процессе, чтобы учитывать только загрузку данных.
+#
+# Запуск из корня проекта:  python benchmarks/cold_start.py [--repeat 5] [--skip-http]
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import config
+
+CASES = {
+    'csv-http': (
+        "import pandas as pd, time; t = time.perf_counter(); "
+        "pd.read_csv({url!r}, sep=','); print(time.perf_counter() - t)"
+    ),
+    'csv-local': (
+        "import pandas as pd, time; t = time.perf_counter(); "
+        "pd.read_csv({csv!r}, sep=','); print(time.perf_counter() - t)"
+    ),
+    'snapshot': (
+        "import sys; sys.path.insert(0, {root!r}); import pandas, urllib.request, time; "
+        "t = time.perf_counter(); "
+        "import data; data.current(); print(time.perf_counter() - t)"
+    ),
+}
+
+
+def run_case(code, repeat):
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', code], check=True,
+                                capture_output=True, text=True, cwd=ROOT).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--skip-http', action='store_true', help='не обращаться к сети')
+    args = parser.parse_args()
+
+    # Первый запуск создает снимок, если его еще нет
+    subprocess.run([sys.executable, '-c', 'import data; data.current()'], check=True, cwd=ROOT)
+
+    print(f"{'case':<10} {'median, ms':>12} {'min, ms':>10}")
+    for name, template in CASES.items():
+        if name == 'csv-http' and args.skip_http:
+            continue
+        code = template.format(url=config.SOURCE_URL, csv=config.SOURCE_CSV, root=ROOT)
+        try:
+            timings = run_case(code, args.repeat)
+        except subprocess.CalledProcessError as error:
+            print(f'{name:<10} failed: {error.stderr.strip().splitlines()[-1]}')
+            continue
+        print(f'{name:<10} {statistics.median(timings) * 1000:>12.1f} {min(timings) * 1000:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# Байты ответов до и после сжатия и условных запросов (см. http_cache.py).
+# Для тех же запросов, что в benchmarks/callbacks.py (макеты страниц, графики, выпадающие списки),
+# и для GET-ответов Dash считается размер тела:
+#   plain - без сжатия (как раньше)
+#   gzip  - Accept-Encoding: gzip
+#   br    - Accept-Encoding: br (если установлен модуль brotli)
+#   304   - повторный запрос с If-None-Match: ответ без тела
+#
+# Запуск из корня проекта:  python benchmarks/http_bytes.py [--rows 100000] [--search-mode client]
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ENCODINGS = ['identity', 'gzip', 'br']
+
+
+def measure(client, method, path, body, encodings):
+    # Байты тела для каждой кодировки из encodings и для повторного запроса с ETag
+    sizes = dict.fromkeys(ENCODINGS)
+    etag = None
+    for encoding in encodings:
+        # Маленькие ответы уходят без сжатия - считаем столько, сколько реально передано
+        response = client.open(path, method=method, data=body, content_type='application/json',
+                               headers={'Accept-Encoding': encoding})
+        sizes[encoding] = len(response.get_data())
+        etag = response.headers.get('ETag', etag)
+    if etag is not None:
+        response = client.open(path, method=method, data=body, content_type='application/json',
+                               headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        sizes['304'] = len(response.get_data()) if response.status_code == 304 else None
+    else:
+        sizes['304'] = None
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=0, help='синтетическая таблица вместо timesData.csv')
+    parser.add_argument('--universities', type=int, default=20, help='сколько университетов перебирать')
+    parser.add_argument('--search-mode', choices=['server', 'client'], default=None,
+                        help='режим выпадающих списков (client - полный список университетов в макете)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.rows:
+            from synthetic import make_raw
+            make_raw(args.rows).to_csv(os.path.join(directory, 'timesData.csv'), index=False)
+            os.environ['UNIVERSITY_DATA_DIR'] = directory
+            os.environ['UNIVERSITY_SHARED_STORE_DIR'] = directory
+        if args.search_mode:
+            os.environ['UNIVERSITY_SEARCH_MODE'] = args.search_mode
+        os.environ.setdefault('UNIVERSITY_PAGE_WARMUP', '0')
+
+        import app
+        import data
+        import http_cache
+        from callbacks import DashClient, http_cases
+
+        universities = list(data.university_index.names)[:args.universities]
+        year = int(data.df['year'].max())
+        dash_client = DashClient(app.app)
+        client = dash_client.client
+        encodings = [encoding for encoding in ENCODINGS if encoding != 'br' or http_cache.brotli is not None]
+
+        cases = {'GET /_dash-layout': [('GET', '/_dash-layout', None)],
+                 'GET /_dash-dependencies': [('GET', '/_dash-dependencies', None)]}
+        for output_id, calls in http_cases(universities, year):
+            if output_id not in dash_client.dependencies:
+                continue
+            cases[output_id] = [('POST', '/_dash-update-component', json.dumps(dash_client.body(output_id, *call)))
+                                for call in calls]
+
+        print(f"{'case':<26} {'calls':>6} {'plain, KiB':>11} {'gzip, KiB':>10} {'br, KiB':>9} {'304, KiB':>9}")
+        totals = dict.fromkeys(ENCODINGS + ['304'], 0)
+        for name, requests in cases.items():
+            sums = dict.fromkeys(ENCODINGS + ['304'], 0)
+            for method, path, body in requests:
+                for key, size in measure(client, method, path, body, encodings).items():
+                    sums[key] = None if size is None or sums[key] is None else sums[key] + size
+            for key, size in sums.items():
+                totals[key] = None if size is None or totals[key] is None else totals[key] + size
+            cells = ['-' if sums[key] is None else f'{sums[key] / 1024:.1f}' for key in ENCODINGS + ['304']]
+            print(f'{name:<26} {len(requests):>6} {cells[0]:>11} {cells[1]:>10} {cells[2]:>9} {cells[3]:>9}')
+        cells = ['-' if totals[key] is None else f'{totals[key] / 1024:.1f}' for key in ENCODINGS + ['304']]
+        print(f"{'total':<26} {'':>6} {cells[0]:>11} {cells[1]:>10} {cells[2]:>9} {cells[3]:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+# Нагрузочный тест продакшен-сервера: запускает gunicorn (gunicorn.conf.py, wsgi:server) с разным
+# числом процессов и меряет, сколько запросов в секунду он обслуживает.
+# Клиенты - отдельные процессы, каждый в цикле шлет запросы колбэков university_results
+# (случайный университет) и страницы; после прогона печатаются запросы/с и задержки.
+#
+# Запуск из корня проекта:  python benchmarks/load_test.py --workers 1 2 4 --clients 16 --duration 10
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+HOST = '127.0.0.1'
+
+
+def callback_body(university):
+    return json.dumps({
+        'output': '..line-graph-ranking.figure...line-graph-scores.figure...bar-graph-students.figure...'
+                  'bar-graph-gender-ratio.figure..',
+        'outputs': [{'id': 'line-graph-ranking', 'property': 'figure'},
+                    {'id': 'line-graph-scores', 'property': 'figure'},
+                    {'id': 'bar-graph-students', 'property': 'figure'},
+                    {'id': 'bar-graph-gender-ratio', 'property': 'figure'}],
+        'inputs': [{'id': 'university-dropdown', 'property': 'value', 'value': university}],
+        'changedPropIds': ['university-dropdown.value'],
+        'state': [],
+    })
+
+
+def client(port, universities, deadline, seed, results):
+    rng = random.Random(seed)
+    latencies = []
+    errors = 0
+    connection = http.client.HTTPConnection(HOST, port, timeout=30)
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            if rng.random() < 0.8:
+                connection.request('POST', '/_dash-update-component', callback_body(rng.choice(universities)),
+                                   {'Content-Type': 'application/json'})
+            else:
+                connection.request('GET', '/')
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            connection = http.client.HTTPConnection(HOST, port, timeout=30)
+        latencies.append(time.perf_counter() - start)
+    results.put((latencies, errors))
+
+
+def wait_ready(port, timeout=120):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            connection = http.client.HTTPConnection(HOST, port, timeout=2)
+            connection.request('GET', '/readyz')
+            if connection.getresponse().status == 200:
+                return
+        except (OSError, http.client.HTTPException):
+            pass
+        time.sleep(0.2)
+    raise RuntimeError('server did not become ready')
+
+
+def run(workers, threads, clients, duration, port):
+    env = dict(os.environ, UNIVERSITY_BIND=f'{HOST}:{port}', UNIVERSITY_WORKERS=str(workers),
+               UNIVERSITY_THREADS=str(threads))
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:server'],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(port)
+        import data
+        universities = data.university_index.names
+        results = multiprocessing.Queue()
+        deadline = time.perf_counter() + duration
+        processes = [multiprocessing.Process(target=client, args=(port, universities, deadline, i, results))
+                     for i in range(clients)]
+        for process in processes:
+            process.start()
+        latencies, errors = [], 0
+        for _ in processes:
+            client_latencies, client_errors = results.get()
+            latencies.extend(client_latencies)
+            errors += client_errors
+        for process in processes:
+            process.join()
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+
+    latencies.sort()
+    percentile = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    print(f'{workers:>7} {threads:>7} {clients:>7} {len(latencies) / duration:>10.1f} '
+          f'{percentile(0.5):>8.1f} {percentile(0.95):>8.1f} {errors:>7}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f'CPU: {os.cpu_count()}')
+    print(f"{'workers':>7} {'threads':>7} {'clients':>7} {'req/s':>10} {'p50, ms':>8} {'p95, ms':>8} {'errors':>7}")
+    for workers in args.workers:
+        run(workers, args.threads, args.clients, args.duration, args.port)
+
+
+if __name__ == '__main__':
+    main()
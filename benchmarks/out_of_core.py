@@ -0,0 +1,143 @@
+# Хранилище по разделам на диске (config.DATA_BACKEND = 'partitioned', см. partitioned_store.py)
+# на синтетической таблице больше памяти (по умолчанию 50 млн строк: 50 лет x 1 млн университетов).
+# Разделы генерируются и пишутся по одному году, затем замеряются:
+#   - время записи и размер хранилища, время открытия, память процесса (анонимная и отображенные файлы);
+#   - задержка запросов страниц: строки университета по всем годам и с отсечением по годам,
+#     K университетов за год, линии рейтинга K университетов, поиск, срезы куба агрегатов;
+#   - агрегация по странам блоками по разделам нескольких лет (пиковая память Python - tracemalloc).
+#
+# Запуск из корня проекта:  python benchmarks/out_of_core.py [--rows 50000000] [--years 50] [--path DIR]
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+import partitioned_store
+from synthetic import COUNTRIES
+
+K = 10
+FLOAT_COLUMNS = ['world_rank', 'rank_lo', 'rank_hi', 'teaching', 'international', 'research', 'citations', 'income',
+                 'total_score', 'num_students', 'student_staff_ratio', 'international_students',
+                 'female_percentage', 'male_percentage']
+
+
+def status_kib(field):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    return 0
+
+
+def memory():
+    return f"RSS {status_kib('VmRSS') / 1024:.0f} MiB (anon {status_kib('RssAnon') / 1024:.0f}, " \
+           f"file {status_kib('RssFile') / 1024:.0f})"
+
+
+def make_partition(rng, n_universities, countries):
+    # Все университеты за год, показатели со случайными пропусками
+    columns = {'university': np.arange(n_universities, dtype=np.int32), 'country': countries}
+    for name in FLOAT_COLUMNS:
+        values = rng.uniform(1, 100, n_universities).astype(np.float32)
+        values[rng.random(n_universities) < 0.05] = np.nan
+        columns[name] = values
+    columns['world_rank'] = (rng.permutation(n_universities) + 1).astype(np.float32)
+    columns['is_tied'] = rng.random(n_universities) < 0.05
+    return columns
+
+
+def write_store(path, rows, n_years, seed=0):
+    rng = np.random.default_rng(seed)
+    n_universities = rows // n_years
+    names = [f'Synthetic University {i}' for i in range(n_universities)]
+    countries = rng.integers(0, len(COUNTRIES), n_universities).astype(np.int16)
+    writer = partitioned_store.StoreWriter(path, names, COUNTRIES)
+    del names
+    for year in range(2025 - n_years, 2025):
+        writer.add_partition(year, make_partition(rng, n_universities, countries))
+    return writer.finish()
+
+
+def latency(func, calls):
+    timings = []
+    for args in calls:
+        started = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - started)
+    timings = np.array(timings) * 1000
+    return np.percentile(timings, 50), np.percentile(timings, 99)
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=50_000_000)
+    parser.add_argument('--years', type=int, default=50)
+    parser.add_argument('--samples', type=int, default=50)
+    parser.add_argument('--path', help='каталог хранилища (если там уже есть хранилище - оно используется)')
+    args = parser.parse_args()
+
+    path = args.path or tempfile.mkdtemp(prefix='partitioned-')
+    try:
+        if partitioned_store.read_version(path) is None:
+            started = time.perf_counter()
+            write_store(path, args.rows, args.years)
+            print(f'written in {time.perf_counter() - started:.1f} s, {directory_size(path) / 2 ** 30:.2f} GiB')
+
+        print(f'before open: {memory()}')
+        started = time.perf_counter()
+        store = partitioned_store.PartitionedStore(path)
+        cube = store.cube()
+        print(f'{len(store)} rows, {len(store.years)} partitions, opened in '
+              f'{(time.perf_counter() - started) * 1000:.1f} ms: {memory()}')
+
+        rng = np.random.default_rng(1)
+        names = [store.names[int(code)] for code in rng.integers(0, len(store.names), args.samples)]
+        groups = [[store.names[int(code)] for code in rng.integers(0, len(store.names), K)]
+                  for _ in range(args.samples)]
+        year = store.years[-1]
+        recent = store.years[-5:]
+        cases = [
+            ('university, all years', store.university_frame, [(name,) for name in names]),
+            ('university, last 5 years', store.university_frame, [(name, recent) for name in names]),
+            (f'{K} universities, one year', store.universities_frame, [(group, year) for group in groups]),
+            (f'{K} ranking lines', store.series, [('world_rank', group) for group in groups]),
+            ('search', store.search, [(name[:14 + i % 8], 20) for i, name in enumerate(names)]),
+            ('cube by year', cube.by_year, [(['teaching', 'research'],)] * args.samples),
+            ('cube by country', cube.by_country, [('research',)] * args.samples),
+        ]
+        print(f"  {'query':<28} {'p50, ms':>9} {'p99, ms':>9}")
+        for name, func, calls in cases:
+            p50, p99 = latency(func, calls)
+            print(f'  {name:<28} {p50:>9.2f} {p99:>9.2f}')
+        print(f'after queries: {memory()}')
+
+        # Агрегация по требованию с отсечением разделов: только последние годы, блоками
+        partitions = {year: store._partitions[year] for year in store.years[-3:]}
+        tracemalloc.start()
+        started = time.perf_counter()
+        partitioned_store.aggregate_partitions(partitions, len(store.countries), chunk_rows=1 << 18)
+        seconds = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        rows = sum(store.rows[year] for year in partitions)
+        print(f'aggregate {len(partitions)} partitions ({rows} rows) in chunks: {seconds:.2f} s, '
+              f'peak Python memory {peak / 2 ** 20:.1f} MiB: {memory()}')
+    finally:
+        if not args.path:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# Масштабирование векторного разбора (parsers.py) на размноженной копии датасета.
+# Для сравнения на малых копиях замеряется прежний построчный clean_column через .apply.
+#
+# Запуск из корня проекта:  python benchmarks/parsers_scaling.py [--max-factor 100]
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd
+
+import data
+from parsers import parse_gender_ratio, parse_number, parse_rank
+
+NUMBER_COLUMNS = ['num_students', 'student_staff_ratio', 'international_students', 'income', 'total_score']
+
+
+def parse_all(frame):
+    parse_rank(frame['world_rank'])
+    for name in NUMBER_COLUMNS:
+        parse_number(frame[name])
+    parse_gender_ratio(frame['female_male_ratio'])
+
+
+def clean_column(column):
+    # Прежняя реализация из university_sravnenie
+    if isinstance(column, str):
+        column = column.replace(',', '').replace('%', '')
+    return pd.to_numeric(column, errors='coerce')
+
+
+def parse_all_apply(frame):
+    for name in NUMBER_COLUMNS:
+        frame[name].apply(clean_column)
+
+
+def best_of(func, frame, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(frame)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--max-factor', type=int, default=100)
+    parser.add_argument('--apply-max-factor', type=int, default=10,
+                        help='до какого размножения замерять прежний .apply (он медленный)')
+    args = parser.parse_args()
+
+    raw, _ = data.load_raw()
+    factors = [f for f in [1, 10, 25, 50, 100, 200, 500] if f <= args.max_factor]
+
+    print(f"{'factor':>7} {'rows':>10} {'vectorized, ms':>15} {'ns/row':>8} {'apply, ms':>10}")
+    for factor in factors:
+        frame = pd.concat([raw] * factor, ignore_index=True)
+        vectorized = best_of(parse_all, frame)
+        apply = best_of(parse_all_apply, frame, repeat=1) if factor <= args.apply_max_factor else None
+        apply_text = f'{apply * 1000:>10.1f}' if apply is not None else f"{'-':>10}"
+        print(f'{factor:>7} {len(frame):>10} {vectorized * 1000:>15.1f} '
+              f'{vectorized / len(frame) * 1e9:>8.0f} {apply_text}')
+
+
+if __name__ == '__main__':
+    main()
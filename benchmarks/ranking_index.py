@@ -0,0 +1,76 @@
+# Топ-N и процентиль университета за год:
+#   sort  - прежний способ, фильтр года и сортировка по всей таблице на каждый запрос
+#   index - RankingIndex (готовые сортировки по (год, показатель) и таблица процентилей)
+# Замер на реальных данных и на синтетической таблице (по умолчанию 1 млн строк), плюс время построения индекса.
+#
+# Запуск из корня проекта:  python benchmarks/ranking_index.py [--rows 1000000]
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+import data
+from ranking_index import RankingIndex
+from synthetic import make_dataset
+
+INDICATORS = ['research', 'teaching', 'world_rank']
+
+
+def per_call(func, calls):
+    started = time.perf_counter()
+    for args in calls:
+        func(*args)
+    return (time.perf_counter() - started) / len(calls) * 1e6
+
+
+def run(name, frame, samples, seed=0):
+    rng = np.random.default_rng(seed)
+    started = time.perf_counter()
+    index = RankingIndex(frame)
+    build = time.perf_counter() - started
+    years = index.years
+    top_calls = [(INDICATORS[i % len(INDICATORS)], int(rng.choice(years)), 20) for i in range(samples)]
+    rows = rng.integers(0, len(frame), samples)
+    percentile_calls = [(int(row), INDICATORS[i % len(INDICATORS)]) for i, row in enumerate(rows)]
+
+    def top_sort(indicator, year, n):
+        year_frame = frame[frame['year'] == year]
+        return year_frame.sort_values(indicator, ascending=index.indicators[indicator]).head(n)
+
+    def top_index(indicator, year, n):
+        return frame.iloc[index.top(indicator, year, n)]
+
+    def percentile_sort(row, indicator):
+        year_frame = frame[frame['year'] == frame['year'].iat[row]]
+        return year_frame[indicator].rank(pct=True, ascending=not index.indicators[indicator]).get(row)
+
+    def percentile_index(row, indicator):
+        return index.percentile(row, indicator)
+
+    print(f'{name}: {len(frame)} rows, index built in {build * 1000:.1f} ms')
+    print(f"  {'query':<12} {'sort, us':>12} {'index, us':>10} {'speedup':>8}")
+    for query, before_func, after_func, calls in [('top-20', top_sort, top_index, top_calls),
+                                                  ('percentile', percentile_sort, percentile_index,
+                                                   percentile_calls)]:
+        before = per_call(before_func, calls)
+        after = per_call(after_func, calls)
+        print(f'  {query:<12} {before:>12.1f} {after:>10.1f} {before / after:>7.0f}x')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--samples', type=int, default=200)
+    args = parser.parse_args()
+
+    run('timesData', data.df, args.samples)
+    run('synthetic', make_dataset(args.rows).frame, max(10, args.samples // 10))
+
+
+if __name__ == '__main__':
+    main()
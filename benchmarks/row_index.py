@@ -0,0 +1,71 @@
+# Время выборки строк в колбэках university_results / university_sravnenie:
+#   mask  - прежний способ, булевы маски по всей таблице (== / isin / year ==)
+#   index - UniversityIndex (непрерывные диапазоны строк)
+# Замер на реальных данных и на синтетической таблице (по умолчанию 1 млн строк).
+#
+# Запуск из корня проекта:  python benchmarks/row_index.py [--rows 1000000]
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+import data
+from synthetic import make_dataset
+from university_index import UniversityIndex
+
+
+def per_call(func, calls):
+    started = time.perf_counter()
+    for args in calls:
+        func(*args)
+    return (time.perf_counter() - started) / len(calls) * 1e6
+
+
+def run(name, frame, samples, seed=0):
+    rng = np.random.default_rng(seed)
+    index = UniversityIndex(frame)
+    names = np.array(index.names, dtype=object)
+    years = np.unique(frame['year'].to_numpy())
+    single = [(names[i],) for i in rng.integers(0, len(names), samples)]
+    multi = [(list(names[rng.integers(0, len(names), 5)]), int(rng.choice(years))) for _ in range(samples)]
+    column = frame['university_name']
+
+    def results_mask(university):
+        return frame[column == university]
+
+    def results_index(university):
+        return index.slice(frame, university)
+
+    def sravnenie_mask(universities, year):
+        return (frame[column.isin(universities) & (frame['year'] == year)],
+                frame[column.isin(universities)])
+
+    def sravnenie_index(universities, year):
+        return index.take(frame, universities, year), index.take(frame, universities)
+
+    print(f'{name}: {len(frame)} rows, {len(names)} universities')
+    print(f"  {'callback':<22} {'mask, us':>10} {'index, us':>10} {'speedup':>8}")
+    for callback, mask, indexed, calls in [('university_results', results_mask, results_index, single),
+                                           ('university_sravnenie', sravnenie_mask, sravnenie_index, multi)]:
+        before = per_call(mask, calls)
+        after = per_call(indexed, calls)
+        print(f'  {callback:<22} {before:>10.1f} {after:>10.1f} {before / after:>7.0f}x')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--samples', type=int, default=200)
+    args = parser.parse_args()
+
+    run('timesData', data.df, args.samples)
+    run('synthetic', make_dataset(args.rows).frame, max(10, args.samples // 10))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+# Скорость поиска университетов (search.NameIndex) и размер начального макета страницы.
+#   - средняя и худшая задержка поиска при росте числа названий до десятков тысяч
+#   - размер JSON макета university_results с полным списком вариантов и с поиском на сервере
+#
+# Запуск из корня проекта:  python benchmarks/search.py
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+from plotly.io.json import to_json_plotly
+
+from search import NameIndex
+from synthetic import COUNTRIES
+
+PREFIXES = ['University of', 'Technical University of', 'State University of', 'Institute of', 'College of']
+PLACES = ['Oxford', 'Cambridge', 'Berlin', 'München', 'Tokyo', 'Kyoto', 'Moscow', 'Toronto', 'Sydney', 'Zürich',
+          'Paris', 'Lyon', 'Boston', 'Chicago', 'Seoul', 'Delhi', 'São Paulo', 'Madrid', 'Milan', 'Vienna']
+QUERIES = ['u', 'univ', 'oxf', 'munchen', 'zurich', 'state univ', 'tokyo 12', 'kyoto', 'japan', 'camrbidge', 'xyz']
+
+
+def make_names(count, seed=0):
+    rng = np.random.default_rng(seed)
+    prefixes = rng.choice(PREFIXES, count)
+    places = rng.choice(PLACES, count)
+    return [f'{prefix} {place} {i}' for i, (prefix, place) in enumerate(zip(prefixes, places))], \
+        list(rng.choice(COUNTRIES, count))
+
+
+def main():
+    print(f"{'names':>8} {'build, ms':>10} {'mean, us':>9} {'max, us':>8}")
+    for count in [1_000, 10_000, 50_000, 100_000]:
+        names, countries = make_names(count)
+        started = time.perf_counter()
+        index = NameIndex(names, countries)
+        build = time.perf_counter() - started
+        timings = []
+        for _ in range(20):
+            for query in QUERIES:
+                started = time.perf_counter()
+                index.search(query, 20)
+                timings.append(time.perf_counter() - started)
+        print(f'{count:>8} {build * 1000:>10.0f} {np.mean(timings) * 1e6:>9.0f} {np.max(timings) * 1e6:>8.0f}')
+
+    import data
+    all_options = [{'label': uni, 'value': uni} for uni in data.university_index.names]
+    few_options = [{'label': uni, 'value': uni} for uni in data.university_search.search('', 20)]
+    print(f'dropdown options payload: full list {len(to_json_plotly(all_options))} bytes, '
+          f'server search {len(to_json_plotly(few_options))} bytes')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+# Размер ответа и время кодирования графиков колбэков:
+#   plain   - фигуры plotly как есть (float64, полный шаблон), как было до serialization.py
+#   compact - serialization.compact_figure (float32 с округлением, урезанный шаблон)
+# Кодирование замеряется стандартным json и orjson (если установлен).
+#
+# Запуск из корня проекта:  python benchmarks/serialization.py
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from plotly.io.json import to_json_plotly
+
+import data
+from pages import country_sravnenie, global_tendensii, university_results, university_sravnenie
+from serialization import compact_figure
+
+try:
+    import orjson  # noqa: F401
+    ENGINES = ['json', 'orjson']
+except ImportError:
+    ENGINES = ['json']
+
+
+def raw(func):
+    # Исходная функция колбэка без кэша и без компактной сериализации
+    return func.uncached.__wrapped__
+
+
+def figure_sets():
+    names = data.university_index.names
+    yield 'global_tendensii', [raw(global_tendensii.update_line_graph)(i) for i in global_tendensii.INDICATORS]
+    yield 'country_sravnenie', [raw(country_sravnenie.update_graphs)(i) for i in country_sravnenie.INDICATORS]
+    yield 'university_results', [raw(university_results.update_graphs)(name) for name in names[:20]]
+    yield 'university_sravnenie', [raw(university_sravnenie.build_figures)(names[:k], int(data.df['year'].max()))
+                                   for k in (1, 5, 10)]
+
+
+def encode(outputs, engine, repeat=5):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = sum(len(to_json_plotly(list(result), engine=engine)) for result in outputs)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return size, best / len(outputs)
+
+
+def main():
+    header = f"{'callback':<22} {'variant':<8} {'bytes/call':>11}"
+    header += ''.join(f' {engine + ", ms":>10}' for engine in ENGINES)
+    print(header)
+    for name, outputs in figure_sets():
+        compact = [tuple(compact_figure(value) for value in result) for result in outputs]
+        for variant, values in [('plain', outputs), ('compact', compact)]:
+            row = f'{name:<22} {variant:<8}'
+            for i, engine in enumerate(ENGINES):
+                size, seconds = encode(values, engine)
+                if i == 0:
+                    row += f' {size // len(values):>11}'
+                row += f' {seconds * 1000:>10.2f}'
+            print(row)
+        started = time.perf_counter()
+        for result in outputs:
+            tuple(compact_figure(value) for value in result)
+        print(f"{'':<22} compact_figure itself: {(time.perf_counter() - started) / len(outputs) * 1000:.2f} ms/call")
+
+
+if __name__ == '__main__':
+    main()
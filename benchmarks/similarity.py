@@ -0,0 +1,69 @@
+# Поиск похожих университетов (ближайшие соседи по профилю показателей за год):
+#   pandas - прежний способ, на каждый запрос фильтр года, нормировка и расстояния по таблице года
+#   index  - SimilarityIndex (заранее нормированные матрицы признаков по годам)
+# Замер на реальных данных и на синтетической таблице (по умолчанию в 100 раз больше реальной),
+# плюс время построения индекса.
+#
+# Запуск из корня проекта:  python benchmarks/similarity.py [--rows 260000]
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+import data
+from similarity import FEATURES, SimilarityIndex
+from synthetic import make_dataset
+
+K = 8
+
+
+def per_call(func, rows):
+    timings = []
+    for row in rows:
+        started = time.perf_counter()
+        func(int(row))
+        timings.append(time.perf_counter() - started)
+    timings = np.array(timings) * 1000
+    return np.percentile(timings, 50), np.percentile(timings, 99)
+
+
+def run(name, frame, samples, seed=0):
+    rng = np.random.default_rng(seed)
+    started = time.perf_counter()
+    index = SimilarityIndex(frame)
+    build = time.perf_counter() - started
+    rows = rng.integers(0, len(frame), samples)
+
+    def similar_pandas(row):
+        year_frame = frame.loc[frame['year'] == frame['year'].iat[row], FEATURES]
+        normed = ((year_frame - year_frame.mean()) / year_frame.std(ddof=0)).fillna(0)
+        distances = ((normed - normed.loc[frame.index[row]]) ** 2).sum(axis=1).drop(frame.index[row])
+        return distances.nsmallest(K)
+
+    def similar_index(row):
+        return index.similar(row, K)
+
+    print(f'{name}: {len(frame)} rows, {len(index.years)} years, index built in {build * 1000:.1f} ms')
+    print(f"  {'method':<8} {'p50, ms':>9} {'p99, ms':>9}")
+    for method, func in [('pandas', similar_pandas), ('index', similar_index)]:
+        p50, p99 = per_call(func, rows)
+        print(f'  {method:<8} {p50:>9.3f} {p99:>9.3f}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=260_000)
+    parser.add_argument('--samples', type=int, default=200)
+    args = parser.parse_args()
+
+    run('timesData', data.df, args.samples)
+    run('synthetic', make_dataset(args.rows).frame, args.samples)
+
+
+if __name__ == '__main__':
+    main()
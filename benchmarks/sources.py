@@ -0,0 +1,82 @@
+# Ленивая загрузка источников рейтингов и выгрузка по бюджету памяти (см. sources.py, data.current).
+# Для каждого источника пишется синтетическая таблица в его формате (столбцы timesData.csv,
+# переименованные обратно в столбцы источника), затем замеряются:
+#   - старт: загрузка только источника по умолчанию против загрузки всех источников сразу;
+#   - первое обращение к источнику (CSV -> снимок -> датасет и индексы), повторная загрузка после выгрузки
+#     (снимок и общий файл уже на диске) и обращение к загруженному источнику;
+#   - память каждого источника и выгрузки при бюджете, в который помещаются только два источника
+#     (при переключении между двумя другими источниками каждое обращение - повторная загрузка).
+#
+# Запуск из корня проекта:  python benchmarks/sources.py [--rows 100000] [--cycles 20]
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+
+def write_tables(directory, rows):
+    import sources
+    from synthetic import make_raw
+
+    for seed, source in enumerate(sources.SOURCES.values()):
+        raw = make_raw(rows, seed=seed).rename(columns={new: old for old, new in source.columns.items()})
+        raw.to_csv(os.path.join(directory, source.filename), index=False)
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    func(*args)
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100_000, help='строк в таблице каждого источника')
+    parser.add_argument('--cycles', type=int, default=20, help='сколько раз переключать источники по кругу')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['UNIVERSITY_DATA_DIR'] = directory
+        os.environ['UNIVERSITY_SHARED_STORE_DIR'] = directory
+        os.environ['UNIVERSITY_DATA_MEMORY_BUDGET'] = '0'
+        write_tables(directory, args.rows)
+
+        import config
+        import data
+        import sources
+
+        # Бюджет - на источник по умолчанию и еще полтора источника: третий выгружает давно не использованный
+        names = [source.name for source in sources.enabled()]
+        names.sort(key=lambda name: name != config.DEFAULT_SOURCE)
+        print(f"{'source':<10} {'first, ms':>10} {'hit, ms':>8} {'MiB':>7}")
+        first = {}
+        for name in names:
+            first[name] = timed(data.current, name)
+            hit = np.median([timed(data.current, name) for _ in range(1000)])
+            size = data.current(name).memory_bytes
+            print(f'{name:<10} {first[name]:>10.1f} {hit:>8.4f} {size / 2 ** 20:>7.1f}')
+            if name == config.DEFAULT_SOURCE:
+                config.DATA_MEMORY_BUDGET = int(size * 2.5)
+        print(f'startup: default source only {first[config.DEFAULT_SOURCE]:.1f} ms, '
+              f'all sources up front {sum(first.values()):.1f} ms')
+
+        # Переключение по кругу между остальными источниками: каждый раз один из них выгружается
+        others = names[1:]
+        reloads, peak = [], 0
+        for i in range(args.cycles):
+            reloads.append(timed(data.current, others[i % len(others)]))
+            peak = max(peak, data.stats()['memory_bytes'])
+        stats = data.stats()
+        print(f'budget {config.DATA_MEMORY_BUDGET / 2 ** 20:.1f} MiB: {stats["evictions"]} evictions, '
+              f'reload after eviction p50 {np.median(reloads):.1f} ms, peak in use {peak / 2 ** 20:.1f} MiB, '
+              f'loaded {[name for name, item in stats["sources"].items() if item["loaded"]]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+# Генератор синтетической таблицы в формате timesData.csv (те же столбцы и строковые форматы:
+# '=45', '201-225', '20,152', '25%', '33 : 67', '-'). Используется бенчмарками для проверки
+# масштабирования на таблицах больше исходной.
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import pandas as pd
+
+from preprocessing import build_dataset
+
+YEARS = list(range(2011, 2017))
+COUNTRIES = [
+    'United States of America', 'United Kingdom', 'Germany', 'France', 'Japan', 'China', 'Russian Federation',
+    'Canada', 'Australia', 'Switzerland', 'Netherlands', 'Sweden', 'Italy', 'Spain', 'South Korea', 'India',
+    'Brazil', 'Belgium', 'Denmark', 'Finland', 'Norway', 'Austria', 'Israel', 'Singapore', 'Ireland',
+]
+
+
+def _score(rng, size, missing=0.0):
+    values = np.round(rng.uniform(10, 100, size), 1)
+    values[rng.random(size) < missing] = np.nan
+    return values
+
+
+def _text(values, fmt, missing_mask, missing='-'):
+    text = np.char.mod(fmt, values).astype(object)
+    text[missing_mask] = missing
+    return text
+
+
+def make_raw(rows=100_000, seed=0):
+    rng = np.random.default_rng(seed)
+    n_universities = -(-rows // len(YEARS))
+    university = np.repeat(np.arange(n_universities), len(YEARS))[:rows]
+    year = np.tile(YEARS, n_universities)[:rows]
+    names = np.array([f'Synthetic University {i}' for i in range(n_universities)], dtype=object)
+    countries = np.array(COUNTRIES, dtype=object)[rng.integers(0, len(COUNTRIES), n_universities)]
+
+    # Место в рейтинге - случайная перестановка внутри года, после 200 - диапазоны по 25
+    rank = np.empty(rows, dtype=np.int64)
+    for value in YEARS:
+        mask = year == value
+        rank[mask] = rng.permutation(mask.sum()) + 1
+    band_lo = 201 + (rank - 201) // 25 * 25
+    world_rank = np.where(rank <= 200, np.char.mod('%d', rank),
+                          np.char.add(np.char.mod('%d-', band_lo), np.char.mod('%d', band_lo + 24))).astype(object)
+    tied = (rank <= 200) & (rng.random(rows) < 0.1)
+    world_rank[tied] = np.char.add('=', world_rank[tied].astype(str))
+
+    no_students = rng.random(rows) < 0.05
+    students = rng.integers(1000, 60000, rows)
+    female = rng.integers(20, 71, rows)
+    no_ratio = rng.random(rows) < 0.15
+
+    return pd.DataFrame({
+        'world_rank': world_rank,
+        'university_name': names[university],
+        'country': countries[university],
+        'teaching': _score(rng, rows),
+        'international': _score(rng, rows, 0.02),
+        'research': _score(rng, rows),
+        'citations': _score(rng, rows),
+        'income': _text(_score(rng, rows), '%.1f', rng.random(rows) < 0.1),
+        'total_score': _text(_score(rng, rows), '%.1f', rank > 200),
+        'num_students': _thousands(students, no_students),
+        'student_staff_ratio': np.where(no_students, np.nan, np.round(rng.uniform(3, 40, rows), 1)),
+        'international_students': _text(rng.integers(1, 50, rows), '%d%%', no_students, np.nan),
+        'female_male_ratio': _ratio_text(female, no_ratio),
+        'year': year,
+    })
+
+
+def _thousands(values, missing_mask):
+    # 20152 -> '20,152'
+    text = pd.Series(values).map('{:,}'.format).to_numpy(dtype=object)
+    text[missing_mask] = np.nan
+    return text
+
+
+def _ratio_text(female, missing_mask):
+    text = np.char.add(np.char.mod('%d : ', female), np.char.mod('%d', 100 - female)).astype(object)
+    text[missing_mask] = np.nan
+    return text
+
+
+def make_dataset(rows=100_000, seed=0):
+    return build_dataset(make_raw(rows, seed), version=f'synthetic-{rows}-{seed}')
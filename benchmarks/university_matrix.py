@@ -0,0 +1,73 @@
+# Данные для графика рейтинга university_sravnenie при выборе K университетов:
+#   filter - фильтр таблицы по isin и группировка по университету (как раньше строил px.line)
+#   slices - K срезов UniversityIndex
+#   matrix - одна выборка K строк из матрицы университет x год (UniversityYearMatrix)
+# Замер на реальных данных и на синтетической таблице (по умолчанию 1 млн строк).
+#
+# Запуск из корня проекта:  python benchmarks/university_matrix.py [--rows 1000000]
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+import data
+from synthetic import make_dataset
+from university_index import UniversityIndex
+from university_matrix import UniversityYearMatrix
+
+SELECTION_SIZES = [1, 5, 20, 100]
+
+
+def per_call(func, calls):
+    started = time.perf_counter()
+    for args in calls:
+        func(*args)
+    return (time.perf_counter() - started) / len(calls) * 1e6
+
+
+def run(name, frame, samples, seed=0):
+    rng = np.random.default_rng(seed)
+    index = UniversityIndex(frame)
+    started = time.perf_counter()
+    matrix = UniversityYearMatrix(frame, index)
+    build = time.perf_counter() - started
+    names = np.array(index.names, dtype=object)
+    column = frame['university_name']
+
+    def by_filter(universities):
+        selected = frame[column.isin(universities)]
+        return [(group['year'].to_numpy(), group['world_rank'].to_numpy())
+                for _, group in selected.groupby('university_name', observed=True)]
+
+    def by_slices(universities):
+        return [(rows['year'].to_numpy(), rows['world_rank'].to_numpy())
+                for rows in (index.slice(frame, university) for university in universities)]
+
+    def by_matrix(universities):
+        return matrix.series('world_rank', universities)
+
+    print(f'{name}: {len(frame)} rows, {len(names)} universities, matrices built in {build * 1000:.1f} ms')
+    print(f"  {'K':>4} {'filter, us':>12} {'slices, us':>11} {'matrix, us':>11}")
+    for k in SELECTION_SIZES:
+        calls = [(list(names[rng.choice(len(names), min(k, len(names)), replace=False)]),) for _ in range(samples)]
+        print(f'  {k:>4} {per_call(by_filter, calls):>12.1f} {per_call(by_slices, calls):>11.1f} '
+              f'{per_call(by_matrix, calls):>11.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--samples', type=int, default=50)
+    args = parser.parse_args()
+
+    run('timesData', data.df, args.samples)
+    run('synthetic', make_dataset(args.rows).frame, max(5, args.samples // 5))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+# Память рабочих процессов gunicorn (только Linux, читает /proc/<pid>/smaps_rollup).
+# Запускает продакшен-сервер с разным числом процессов, прогоняет запросы ко всем страницам
+# и колбэкам и печатает RSS/PSS главного и каждого рабочего процесса. PSS делит общие страницы
+# между процессами, поэтому при общем датасете (UNIVERSITY_SHARED_STORE=1) PSS на процесс
+# падает с ростом их числа, а сумма PSS почти не растет.
+#
+# Запуск из корня проекта:  python benchmarks/worker_memory.py --workers 1 2 4 [--rows 1000000] [--no-shared]
+import argparse
+import http.client
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from load_test import HOST, callback_body, wait_ready
+
+FIELDS = ['Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty']
+
+
+def memory(pid):
+    # Поля smaps_rollup в КиБ
+    result = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            name, _, rest = line.partition(':')
+            if name in FIELDS:
+                result[name] = int(rest.split()[0])
+    return result
+
+
+def children(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(child) for child in f.read().split()]
+
+
+def exercise(port, universities, requests):
+    # Каждый рабочий процесс должен открыть страницы и построить графики, иначе меряем пустые процессы
+    connection = http.client.HTTPConnection(HOST, port, timeout=60)
+    for path in ['/', '/_dash-layout', '/_dash-dependencies']:
+        connection.request('GET', path)
+        connection.getresponse().read()
+    for i in range(requests):
+        connection.request('POST', '/_dash-update-component', callback_body(universities[i % len(universities)]),
+                           {'Content-Type': 'application/json'})
+        connection.getresponse().read()
+
+
+def run(workers, port, env, universities, requests):
+    env = dict(env, UNIVERSITY_BIND=f'{HOST}:{port}', UNIVERSITY_WORKERS=str(workers), UNIVERSITY_THREADS='1')
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:server'],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(port)
+        for _ in range(workers):
+            exercise(port, universities, requests)
+        time.sleep(0.5)
+        master = memory(server.pid)
+        workers_memory = [memory(pid) for pid in children(server.pid)]
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+    return master, workers_memory
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--rows', type=int, default=0, help='синтетическая таблица вместо timesData.csv')
+    parser.add_argument('--requests', type=int, default=50, help='запросов колбэка на процесс')
+    parser.add_argument('--no-shared', action='store_true', help='без общего файла с датасетом')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--output', help='сохранить результаты в JSON')
+    args = parser.parse_args()
+
+    env = dict(os.environ, UNIVERSITY_SHARED_STORE='0' if args.no_shared else '1')
+    with tempfile.TemporaryDirectory() as directory:
+        if args.rows:
+            from synthetic import make_raw
+            make_raw(args.rows).to_csv(os.path.join(directory, 'timesData.csv'), index=False)
+            env['UNIVERSITY_DATA_DIR'] = directory
+            os.environ['UNIVERSITY_DATA_DIR'] = directory
+        import data
+        universities = data.university_index.names
+
+        results = []
+        print(f"{'workers':>7} {'process':>8} {'RSS, MiB':>10} {'PSS, MiB':>10} {'shared, MiB':>12} {'private, MiB':>13}")
+        for workers in args.workers:
+            master, workers_memory = run(workers, args.port, env, universities, args.requests)
+            for name, item in [('master', master)] + [(f'worker{i}', item) for i, item in enumerate(workers_memory)]:
+                shared = item['Shared_Clean'] + item['Shared_Dirty']
+                private = item['Private_Clean'] + item['Private_Dirty']
+                print(f'{workers:>7} {name:>8} {item["Rss"] / 1024:>10.1f} {item["Pss"] / 1024:>10.1f} '
+                      f'{shared / 1024:>12.1f} {private / 1024:>13.1f}')
+            total_pss = sum(item['Pss'] for item in [master] + workers_memory)
+            print(f'{workers:>7} {"total":>8} {"":>10} {total_pss / 1024:>10.1f}')
+            results.append({'workers': workers, 'master': master, 'workers_memory': workers_memory,
+                            'total_pss_kib': total_pss})
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'rows': args.rows, 'shared_store': not args.no_shared, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+import json
+import os
+import struct
+
+import numpy as np
+
+# Общий формат бинарных файлов датасета: снимка (data.py) и общего файла процессов (shared_store.py).
+#   MAGIC (8 байт) | длина заголовка (uint32) | заголовок JSON | массивы, выровненные по ALIGN байт
+# Описания массивов (dtype, nbytes, offset) лежат в самом заголовке, где их держит вызывающий модуль,
+# поэтому массивы читаются представлениями NumPy без разбора текста.
+ALIGN = 64
+
+
+def _align(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def write(path, magic, header, entries):
+    # entries - пары (описание массива из header, массив); смещения дописываются в описания
+    for meta, array in entries:
+        meta.update({'dtype': array.dtype.str, 'nbytes': int(array.nbytes)})
+    # Смещения зависят от длины заголовка, поэтому пересчитываем их, пока заголовок не перестанет меняться
+    while True:
+        header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+        offset = _align(len(magic) + 4 + len(header_bytes))
+        for meta, _ in entries:
+            meta['offset'] = offset
+            offset = _align(offset + meta['nbytes'])
+        if json.dumps(header, ensure_ascii=False).encode('utf-8') == header_bytes:
+            break
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    # Свой временный файл у каждого процесса: один и тот же файл могут собирать несколько процессов сразу
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(magic)
+        f.write(struct.pack('<I', len(header_bytes)))
+        f.write(header_bytes)
+        for meta, array in entries:
+            f.seek(meta['offset'])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.truncate(offset)
+    os.replace(tmp_path, path)
+
+
+def rewrite_header(path, magic, header, data_offset):
+    # Новый заголовок на месте старого, массивы не трогаются. False - заголовок не помещается до data_offset
+    # (тогда файл нужно записать заново). Пробелы в конце JSON допустимы; файл подменяется атомарно
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    room = data_offset - len(magic) - 4
+    if len(header_bytes) > room:
+        return False
+    with open(path, 'rb') as f:
+        buffer = bytearray(f.read())
+    buffer[len(magic):data_offset] = struct.pack('<I', room) + header_bytes.ljust(room, b' ')
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(buffer)
+    os.replace(tmp_path, path)
+    return True
+
+
+def read_header(path, magic):
+    # Только заголовок, без чтения массивов
+    with open(path, 'rb') as f:
+        return _parse_header(f.read(len(magic) + 4), magic, path, f.read)
+
+
+def header_from_buffer(buffer, magic, path):
+    # Заголовок из уже прочитанного или отображенного в память файла
+    prefix = bytes(buffer[:len(magic) + 4])
+    return _parse_header(prefix, magic, path, lambda length: bytes(buffer[len(magic) + 4:len(magic) + 4 + length]))
+
+
+def _parse_header(prefix, magic, path, read):
+    if len(prefix) < len(magic) + 4 or prefix[:len(magic)] != magic:
+        raise ValueError(f'{path} has no {magic.decode()} header')
+    (header_length,) = struct.unpack('<I', prefix[len(magic):])
+    return json.loads(read(header_length).decode('utf-8'))
+
+
+def array(buffer, meta, shape):
+    # Представление массива из описания в заголовке поверх буфера файла (bytes или np.memmap)
+    count = int(np.prod(shape, dtype=np.int64))
+    return np.frombuffer(buffer, dtype=np.dtype(meta['dtype']), count=count, offset=meta['offset']).reshape(shape)
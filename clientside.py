@@ -0,0 +1,48 @@
+from plotly.io.json import to_json_plotly
+
+# Переключение вариантов графика в браузере (см. assets/clientside.js).
+# Для каждого значения переключателя заранее строятся выходы колбэка. В dcc.Store уходит
+# один базовый вариант и для остальных только отличающиеся свойства трасс и макета:
+# обычно это значения по оси y, подписи и заголовок.
+
+
+def _as_plain(value):
+    return value.to_plotly_json() if hasattr(value, 'to_plotly_json') else value
+
+
+def _changed(base, value):
+    # Отличающиеся и пропавшие ключи словаря относительно базового варианта. Значения сравниваются
+    # целиком: вложенный словарь (например, marker) в браузере заменяется полностью
+    changed = {key: item for key, item in value.items()
+               if key not in base or to_json_plotly(base[key]) != to_json_plotly(item)}
+    return changed, [key for key in base if key not in value]
+
+
+def _figure_diff(base, figure):
+    if len(base.get('data', [])) != len(figure.get('data', [])):
+        # Число трасс отличается - отправляем график целиком
+        return {'figure': figure}
+    traces = [_changed(base_trace, trace) for base_trace, trace in zip(base['data'], figure['data'])]
+    layout, removed_layout = _changed(base.get('layout', {}), figure.get('layout', {}))
+    diff = {'data': [changed for changed, _ in traces], 'layout': layout}
+    if removed_layout or any(removed for _, removed in traces):
+        # Ключи, которых в этом варианте нет, браузер удаляет из базового варианта
+        diff['removed'] = {'data': [removed for _, removed in traces], 'layout': removed_layout}
+    return diff
+
+
+def variants_store(build, keys):
+    # build(key) возвращает выходы колбэка (кортеж или одно значение)
+    keys = list(keys)
+    outputs = {}
+    for key in keys:
+        result = build(key)
+        result = result if isinstance(result, (tuple, list)) else (result,)
+        outputs[key] = [_as_plain(value) for value in result]
+
+    base = outputs[keys[0]]
+    variants = {}
+    for key in keys:
+        variants[key] = [_figure_diff(base_value, value) if isinstance(value, dict) and 'data' in value else value
+                         for base_value, value in zip(base, outputs[key])]
+    return {'base': base, 'variants': variants}
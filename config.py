@@ -0,0 +1,89 @@
+import os
+
+# Настройки приложения. Любое значение можно переопределить переменной окружения.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Откуда берется датасет, если локальной копии CSV еще нет
+SOURCE_URL = os.environ.get(
+    'UNIVERSITY_SOURCE_URL',
+    'https://raw.githubusercontent.com/MyascoFP/university_project/master/timesData.csv',
+)
+
+# Откуда скачиваются таблицы остальных источников рейтингов (см. sources.py): <адрес>/<имя файла>
+SOURCE_BASE_URL = os.environ.get('UNIVERSITY_SOURCE_BASE_URL',
+                                 'https://raw.githubusercontent.com/MyascoFP/university_project/master')
+# Брать таблицы всех источников из fixtures/ вместо скачивания (маленькие таблицы для проверок)
+FIXTURES = os.environ.get('UNIVERSITY_FIXTURES', '0') == '1'
+
+# Каталог для локальных данных: исходный CSV и бинарный снимок
+DATA_DIR = os.environ.get('UNIVERSITY_DATA_DIR', os.path.join(BASE_DIR, 'cache'))
+SOURCE_CSV = os.environ.get('UNIVERSITY_SOURCE_CSV', os.path.join(DATA_DIR, 'timesData.csv'))
+SNAPSHOT_PATH = os.environ.get('UNIVERSITY_SNAPSHOT', os.path.join(DATA_DIR, 'timesData.snap'))
+
+# Кэш готовых фигур для колбэков: предел по размеру сериализованных ответов (байт)
+FIGURE_CACHE_MAX_BYTES = int(os.environ.get('UNIVERSITY_FIGURE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+# Заранее строить фигуры для колбэков с небольшим конечным набором входов (переключатели показателей)
+FIGURE_CACHE_PRERENDER = os.environ.get('UNIVERSITY_FIGURE_CACHE_PRERENDER', '1') == '1'
+
+# Поиск университетов в выпадающих списках: 'server' - варианты подбираются на сервере по мере ввода,
+# 'client' - как раньше, полный список отправляется в браузер
+UNIVERSITY_SEARCH_MODE = os.environ.get('UNIVERSITY_SEARCH_MODE', 'server')
+UNIVERSITY_SEARCH_LIMIT = int(os.environ.get('UNIVERSITY_SEARCH_LIMIT', 20))
+
+# Переключатель показателей на страницах трендов и сравнения стран: 'client' - все варианты
+# графиков отправляются с макетом и переключаются в браузере, 'server' - колбэк на сервере
+INDICATOR_SWITCHING = os.environ.get('UNIVERSITY_INDICATOR_SWITCHING', 'client')
+
+# Сериализация графиков: число знаков после запятой для дробных значений и движок JSON
+# ('auto' - orjson, если установлен; 'json' - стандартный модуль)
+FIGURE_PRECISION = int(os.environ.get('UNIVERSITY_FIGURE_PRECISION', 2))
+FIGURE_JSON_ENGINE = os.environ.get('UNIVERSITY_FIGURE_JSON_ENGINE', 'auto')
+
+# Фоновый прогрев: после старта загрузить датасет и все страницы, не дожидаясь первого открытия
+PAGE_WARMUP = os.environ.get('UNIVERSITY_PAGE_WARMUP', '1') == '1'
+
+# Продакшен-сервер (gunicorn.conf.py): адрес, число процессов и потоков в каждом процессе
+SERVER_BIND = os.environ.get('UNIVERSITY_BIND', '0.0.0.0:8050')
+SERVER_WORKERS = int(os.environ.get('UNIVERSITY_WORKERS', min(os.cpu_count() or 1, 8) * 2 + 1))
+SERVER_THREADS = int(os.environ.get('UNIVERSITY_THREADS', 4))
+
+# Общий для процессов датасет: очищенные столбцы и агрегаты публикуются в файл, который все процессы
+# отображают в память только для чтения (см. shared_store.py). Для хранения в памяти - каталог в /dev/shm
+SHARED_STORE = os.environ.get('UNIVERSITY_SHARED_STORE', '1') == '1'
+SHARED_STORE_DIR = os.environ.get('UNIVERSITY_SHARED_STORE_DIR', DATA_DIR)
+
+# Доля вызовов колбэков, которые профилируются cProfile (0 - профилирование выключено).
+# Сводка по колбэку: /stats/profile/<имя колбэка>
+METRICS_PROFILE_RATE = float(os.environ.get('UNIVERSITY_METRICS_PROFILE_RATE', 0))
+# В сводку попадают только профили медленных вызовов: дольше стольких секунд (0 - все профилированные)
+METRICS_PROFILE_SLOW_SECONDS = float(os.environ.get('UNIVERSITY_METRICS_PROFILE_SLOW_SECONDS', 0.25))
+
+# Выгрузка среза датасета (/export/csv, /export/ndjson): сколько строк кодируется за один шаг
+EXPORT_CHUNK_ROWS = int(os.environ.get('UNIVERSITY_EXPORT_CHUNK_ROWS', 50_000))
+
+# Горячая перезагрузка датасета (см. reloader.py): как часто проверять, не поменялся ли исходный CSV
+# (секунд, 0 - не следить), и токен для POST /admin/reload (пустой - адрес выключен)
+RELOAD_INTERVAL = float(os.environ.get('UNIVERSITY_RELOAD_INTERVAL', 30))
+ADMIN_TOKEN = os.environ.get('UNIVERSITY_ADMIN_TOKEN', '')
+
+# Сжатие ответов и условные запросы (см. http_cache.py): ответы меньше COMPRESS_MIN_BYTES не сжимаются
+# (0 - сжатие выключено), ETag и ответы 304 для колбэков и GET-запросов, срок кэширования картинок (секунд)
+COMPRESS_MIN_BYTES = int(os.environ.get('UNIVERSITY_COMPRESS_MIN_BYTES', 1024))
+COMPRESS_GZIP_LEVEL = int(os.environ.get('UNIVERSITY_COMPRESS_GZIP_LEVEL', 6))
+COMPRESS_BROTLI_QUALITY = int(os.environ.get('UNIVERSITY_COMPRESS_BROTLI_QUALITY', 5))
+HTTP_ETAGS = os.environ.get('UNIVERSITY_HTTP_ETAGS', '1') == '1'
+STATIC_MAX_AGE = int(os.environ.get('UNIVERSITY_STATIC_MAX_AGE', 30 * 24 * 3600))
+
+# Где хранится датасет: 'memory' - целиком в памяти процесса (или в общем файле), 'partitioned' - в
+# разделенном по годам хранилище на диске для данных больше памяти (см. partitioned_store.py)
+DATA_BACKEND = os.environ.get('UNIVERSITY_DATA_BACKEND', 'memory')
+PARTITIONED_STORE_DIR = os.environ.get('UNIVERSITY_PARTITIONED_STORE_DIR', os.path.join(DATA_DIR, 'partitioned'))
+
+# Источники рейтингов (см. sources.py): какие включены и какой открывается по умолчанию. Источник загружается
+# при первом обращении; если загруженные источники занимают больше DATA_MEMORY_BUDGET байт, давно не
+# использованные выгружаются (0 - без предела). Источник по умолчанию не выгружается
+SOURCES = [name.strip() for name in os.environ.get('UNIVERSITY_SOURCES', 'times,cwur,shanghai').split(',')
+           if name.strip()]
+DEFAULT_SOURCE = os.environ.get('UNIVERSITY_DEFAULT_SOURCE', 'times')
+DATA_MEMORY_BUDGET = int(os.environ.get('UNIVERSITY_DATA_MEMORY_BUDGET', 512 * 1024 * 1024))
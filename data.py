@@ -1,3 +1,484 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+
+import numpy as np
 import pandas as pd
 
-df = pd.read_csv('https://raw.githubusercontent.com/MyascoFP/university_project/master/timesData.csv',sep=',')
+import binary_format
+import config
+import partitioned_store
+import shared_store
+import sources
+from aggregates import AggregateCube
+from preprocessing import build_dataset
+from ranking_index import RankingIndex
+from search import NameIndex
+from similarity import SimilarityIndex
+from university_index import UniversityIndex
+from university_matrix import UniversityYearMatrix
+
+logger = logging.getLogger(__name__)
+
+# Локальный снимок датасета - файл binary_format.py с MAGIC = UNIVSNAP.
+# Заголовок хранит версию формата, отпечаток исходного CSV и схему столбцов.
+# Каждый столбец лежит отдельным непрерывным буфером, поэтому при загрузке массивы получаются без разбора текста.
+MAGIC = b'UNIVSNAP'
+FORMAT_VERSION = 1
+
+
+def file_fingerprint(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def download_source(url=config.SOURCE_URL, path=config.SOURCE_CSV):
+    # Скачиваем CSV один раз и дальше работаем только с локальной копией
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.part'
+    with urllib.request.urlopen(url, timeout=30) as response, open(tmp_path, 'wb') as f:
+        f.write(response.read())
+    os.replace(tmp_path, path)
+    return path
+
+
+def _encode_column(series):
+    # Числовые столбцы сохраняем как есть, строковые - словарем и кодами int32 (-1 = пропуск)
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        return {'kind': 'numeric'}, np.ascontiguousarray(series.to_numpy())
+    codes, categories = pd.factorize(series, use_na_sentinel=True)
+    meta = {'kind': 'string', 'categories': [str(value) for value in categories]}
+    return meta, codes.astype(np.int32)
+
+
+def write_snapshot(frame, path, source_info):
+    columns = []
+    entries = []
+    for name in frame.columns:
+        meta, values = _encode_column(frame[name])
+        meta['name'] = name
+        columns.append(meta)
+        entries.append((meta, values))
+
+    header = {
+        'format_version': FORMAT_VERSION,
+        'rows': len(frame),
+        'source': source_info,
+        'columns': columns,
+    }
+    binary_format.write(path, MAGIC, header, entries)
+
+
+def read_snapshot_header(path):
+    header = binary_format.read_header(path, MAGIC)
+    if header.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f'Unsupported snapshot format version: {header.get("format_version")}')
+    return header
+
+
+def read_snapshot(path):
+    header = read_snapshot_header(path)
+    with open(path, 'rb') as f:
+        buffer = f.read()
+
+    columns = {}
+    for meta in header['columns']:
+        values = binary_format.array(buffer, meta, header['rows'])
+        if meta['kind'] == 'string':
+            # Восстанавливаем строки из словаря, пропуски остаются NaN как после read_csv
+            categories = np.array(meta['categories'] + [np.nan], dtype=object)
+            values = categories[values]
+        else:
+            values = values.copy()
+        columns[meta['name']] = values
+    return pd.DataFrame(columns), header
+
+
+def _snapshot_is_fresh(header, source_path, snapshot_path):
+    source = header['source']
+    if not os.path.exists(source_path):
+        # Исходника нет (например, нет сети при первом запуске) - доверяем снимку
+        return True
+    fingerprint = file_fingerprint(source_path)
+    if fingerprint['size'] == source['size'] and fingerprint['mtime_ns'] == source['mtime_ns']:
+        return True
+    # Файл трогали: пересобираем только если реально поменялось содержимое
+    if file_sha256(source_path) != source['sha256']:
+        return False
+    # Содержимое то же - запоминаем новый отпечаток, чтобы следующие запуски не хешировали CSV заново
+    source.update(fingerprint)
+    try:
+        _rewrite_snapshot_header(snapshot_path, header)
+    except OSError as error:
+        logger.warning('Could not refresh the fingerprint in %s: %s', snapshot_path, error)
+    return True
+
+
+def _rewrite_snapshot_header(path, header):
+    # Новый заголовок встает на место старого, если помещается до первого столбца, иначе снимок переписывается
+    data_offset = min((meta['offset'] for meta in header['columns']), default=0)
+    if not binary_format.rewrite_header(path, MAGIC, header, data_offset):
+        frame, _ = read_snapshot(path)
+        write_snapshot(frame, path, header['source'])
+
+
+def build_snapshot(source_path=config.SOURCE_CSV, snapshot_path=config.SNAPSHOT_PATH):
+    frame = pd.read_csv(source_path, sep=',')
+    source_info = file_fingerprint(source_path)
+    source_info['sha256'] = file_sha256(source_path)
+    write_snapshot(frame, snapshot_path, source_info)
+    # Читаем обратно, чтобы типы столбцов совпадали с быстрым путем
+    return read_snapshot(snapshot_path)
+
+
+def fresh_snapshot_header(source_path=config.SOURCE_CSV, snapshot_path=config.SNAPSHOT_PATH):
+    # Заголовок снимка, если снимок есть и соответствует исходному CSV, иначе None
+    if not os.path.exists(snapshot_path):
+        return None
+    try:
+        header = read_snapshot_header(snapshot_path)
+    except ValueError:
+        return None
+    return header if _snapshot_is_fresh(header, source_path, snapshot_path) else None
+
+
+def snapshot_version(header):
+    # Версия датасета - отпечаток исходного CSV, по ней можно сбрасывать кэши
+    return header['source']['sha256'][:12]
+
+
+def load_raw(source_path=config.SOURCE_CSV, snapshot_path=config.SNAPSHOT_PATH, url=config.SOURCE_URL):
+    # Быстрый путь: актуальный снимок на диске
+    if fresh_snapshot_header(source_path, snapshot_path) is not None:
+        return read_snapshot(snapshot_path)
+
+    # Медленный путь: один раз читаем CSV (при необходимости скачиваем) и сохраняем снимок
+    if not os.path.exists(source_path):
+        download_source(url, source_path)
+    return build_snapshot(source_path, snapshot_path)
+
+
+class DataState:
+    # Все, что строится из одной версии датасета одного источника. Страницы его только читают.
+
+    def __init__(self, dataset, snapshot_header, cube=None, source=config.DEFAULT_SOURCE):
+        self.source = source
+        self.snapshot_header = snapshot_header
+        self.version = dataset.version
+
+        # Канонический типизированный датасет, общий для всех страниц
+        self.dataset = dataset
+        self.df = dataset.frame
+
+        # Агрегаты год x страна x показатель для обзорных страниц
+        self.cube = cube if cube is not None else AggregateCube.from_frame(self.df)
+
+        # Диапазоны строк по университетам для колбэков
+        self.university_index = UniversityIndex(self.df)
+
+        # Поиск по названиям университетов и странам для выпадающих списков
+        self.university_search = NameIndex(self.university_index.names,
+                                           self.df['country'].to_numpy()[self.university_index.starts])
+
+        # Сортировки по (год, показатель) для топ-N и процентилей
+        self.ranking_index = RankingIndex(self.df)
+
+        # Матрицы университет x год по показателям для сравнения университетов
+        self.university_matrix = UniversityYearMatrix(self.df, self.university_index)
+
+        # Нормированные по годам профили показателей для поиска похожих университетов
+        self.similarity_index = SimilarityIndex(self.df)
+
+        self.years = self.ranking_index.years
+
+    @property
+    def memory_bytes(self):
+        # Оценка для бюджета памяти: таблица и массивы агрегатов и индексов
+        return self.dataset.memory_bytes + sum(_array_bytes(vars(part)) for part in (
+            self.cube, self.university_index, self.university_search, self.ranking_index, self.university_matrix,
+            self.similarity_index))
+
+    def university_frame(self, university):
+        # Строки одного университета по годам
+        return self.university_index.slice(self.df, university)
+
+    def universities_frame(self, universities, year=None):
+        # Строки нескольких университетов в порядке выбора, при year - только за этот год
+        return self.university_index.take(self.df, universities, year)
+
+
+class OutOfCoreState:
+    # Датасет в разделенном по годам хранилище на диске (config.DATA_BACKEND = 'partitioned',
+    # см. partitioned_store.py). В памяти только словари и куб агрегатов, строки университетов
+    # читаются из отображенных в память разделов. Индексы, которым нужна вся таблица в памяти
+    # (рейтинги и процентили, похожие университеты), не строятся - эти части страниц скрыты.
+    snapshot_header = None
+    dataset = None
+    df = None
+    ranking_index = None
+    similarity_index = None
+
+    def __init__(self, store, source=config.DEFAULT_SOURCE):
+        self.source = source
+        self.store = store
+        self.version = store.version
+        self.years = store.years
+        self.cube = store.cube()
+        # Хранилище отвечает тем же интерфейсом, что индекс университетов, поиск и матрицы университет x год
+        self.university_index = store
+        self.university_search = store
+        self.university_matrix = store
+
+    @property
+    def memory_bytes(self):
+        # Отображенные в память разделы не считаются: их страницы ядро вытесняет само
+        return _array_bytes(vars(self.cube)) + _array_bytes(vars(self.store))
+
+    def university_frame(self, university):
+        return self.store.university_frame(university)
+
+    def universities_frame(self, universities, year=None):
+        return self.store.universities_frame(universities, year)
+
+
+def _array_bytes(value):
+    # Байты массивов numpy в значении, словарях и списках массивов (кроме отображенных в память файлов)
+    if isinstance(value, np.memmap):
+        return 0
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_array_bytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)) and value and isinstance(value[0], (np.ndarray, dict)):
+        return sum(_array_bytes(item) for item in value)
+    return 0
+
+
+def _attach_shared_store(source):
+    # Уже опубликованный общий файл текущей версии (его создал другой процесс или прошлый запуск)
+    header = fresh_snapshot_header(source.source_csv, source.snapshot_path)
+    if header is None:
+        return None
+    path = shared_store.store_path(config.SHARED_STORE_DIR, source.name, snapshot_version(header))
+    if not os.path.exists(path):
+        return None
+    try:
+        dataset, cube = shared_store.attach(path)
+    except ValueError:
+        return None
+    return DataState(dataset, header, cube, source.name)
+
+
+def _load_source_raw(source):
+    return load_raw(source.source_csv, source.snapshot_path, source.url)
+
+
+def _open_partitioned_store(source):
+    # Хранилища еще нет - собираем его из исходного CSV (для больших данных его пишет StoreWriter заранее)
+    path = source.partitioned_dir
+    if partitioned_store.read_version(path) is None:
+        raw, snapshot_header = _load_source_raw(source)
+        dataset = build_dataset(source.prepare(raw), snapshot_version(snapshot_header))
+        del raw
+        partitioned_store.write_frame(dataset.frame, path, dataset.version)
+    return partitioned_store.PartitionedStore(path)
+
+
+def latest_version(source=None):
+    # Версия данных источника на диске без загрузки (None - неизвестна, нужна полная загрузка)
+    source = sources.get(source)
+    if config.DATA_BACKEND == 'partitioned':
+        return partitioned_store.read_version(source.partitioned_dir)
+    header = fresh_snapshot_header(source.source_csv, source.snapshot_path)
+    return snapshot_version(header) if header is not None else None
+
+
+def load_state(source=None, previous=None):
+    # previous - загруженное состояние прежней версии (при перезагрузке), из него берется куб агрегатов
+    source = sources.get(source)
+    start = time.perf_counter()
+    if config.DATA_BACKEND == 'partitioned':
+        state = OutOfCoreState(_open_partitioned_store(source), source.name)
+        state.load_seconds = time.perf_counter() - start
+        return state
+    if not config.SHARED_STORE:
+        state = _build_state(source, previous)
+    else:
+        state = _attach_shared_store(source)
+        if state is None:
+            # Собирает и публикует один процесс; остальные ждут его и подключаются к готовому файлу
+            with shared_store.publish_lock(config.SHARED_STORE_DIR, source.name):
+                state = _attach_shared_store(source)
+                if state is None:
+                    state = _build_state(source, previous)
+                    # Публикуем и дальше работаем с отображенной копией: ее страницы общие для всех процессов
+                    path = shared_store.store_path(config.SHARED_STORE_DIR, source.name, state.version)
+                    shared_store.publish(state.dataset, state.cube, path, source.name)
+                    dataset, cube = shared_store.attach(path)
+                    state = DataState(dataset, state.snapshot_header, cube, source.name)
+    state.load_seconds = time.perf_counter() - start
+    return state
+
+
+def _build_state(source, previous=None):
+    raw, snapshot_header = _load_source_raw(source)
+    dataset = build_dataset(source.prepare(raw), snapshot_version(snapshot_header))
+    del raw
+    return DataState(dataset, snapshot_header, extend_cube(previous, dataset.frame), source.name)
+
+
+def extend_cube(previous, frame):
+    # Куб новой версии из куба прежней: если новая версия только добавила годы, а строки прежних лет
+    # не поменялись, пересчитываются только срезы новых лет (AggregateCube.update_year).
+    # Иначе None - куб строится заново. Куб прежнего состояния не меняется: по нему еще отвечают запросы
+    if previous is None or previous.df is None:
+        return None
+    years = frame['year'].to_numpy()
+    new_years = sorted(set(np.unique(years).tolist()) - set(previous.years))
+    if not new_years or set(previous.years) - set(np.unique(years).tolist()):
+        return None
+    cube = previous.cube
+    old_rows = ~np.isin(years, new_years)
+    if old_rows.sum() != len(previous.df):
+        return None
+    for name in ['year', 'country'] + cube.indicators:
+        old = previous.df[name].astype(object).reset_index(drop=True)
+        if not old.equals(frame[name][old_rows].astype(object).reset_index(drop=True)):
+            return None
+
+    cube = cube.copy()
+    for year in new_years:
+        cube.update_year(year, frame[years == year], recompute_totals=year == new_years[-1])
+    logger.info('Aggregate cube extended with years %s', ', '.join(map(str, new_years)))
+    return cube
+
+
+# Загруженные источники: имя -> состояние, в порядке последнего обращения (LRU).
+# Источник загружается при первом обращении (первая открытая страница или прогрев), а не при импорте:
+# импорт модулей страниц и регистрация колбэков остаются дешевыми. Когда загруженные источники
+# занимают больше config.DATA_MEMORY_BUDGET, давно не использованные выгружаются; запросы, которые
+# еще работают с выгруженным состоянием, дорабатывают с ним. Источник по умолчанию не выгружается.
+_states = OrderedDict()
+_state_lock = threading.Lock()
+_load_locks = {name: threading.Lock() for name in sources.SOURCES}
+_stats = {'loads': dict.fromkeys(sources.SOURCES, 0), 'evictions': 0}
+
+
+def current(source=None):
+    name = sources.get(source).name
+    with _state_lock:
+        state = _states.get(name)
+        if state is not None:
+            _states.move_to_end(name)
+            return state
+    # Параллельные запросы к еще не загруженному источнику ждут одну загрузку
+    with _load_locks[name]:
+        state = _states.get(name)
+        if state is None:
+            with _state_lock:
+                previous = _states.get(name)
+            state = load_state(name, previous)
+            with _state_lock:
+                _states[name] = state
+                _stats['loads'][name] += 1
+                _evict(keep=name)
+        return state
+
+
+def _evict(keep):
+    # Под _state_lock: выгружаем давно не использованные источники, пока не уложимся в бюджет
+    if config.DATA_MEMORY_BUDGET <= 0:
+        return
+    total = sum(state.memory_bytes for state in _states.values())
+    for name in list(_states):
+        if total <= config.DATA_MEMORY_BUDGET:
+            break
+        if name in (keep, config.DEFAULT_SOURCE):
+            continue
+        total -= _states.pop(name).memory_bytes
+        _stats['evictions'] += 1
+        logger.info('Ranking source %s evicted, %.1f MiB of %.1f MiB budget in use', name, total / 2 ** 20,
+                    config.DATA_MEMORY_BUDGET / 2 ** 20)
+
+
+def is_loaded(source=None):
+    return sources.get(source).name in _states
+
+
+def loaded():
+    # Загруженные источники и их версии
+    with _state_lock:
+        return {name: state.version for name, state in _states.items()}
+
+
+def stats():
+    with _state_lock:
+        states = dict(_states)
+        evictions = _stats['evictions']
+        loads = dict(_stats['loads'])
+    return {
+        'memory_budget_bytes': config.DATA_MEMORY_BUDGET,
+        'memory_bytes': sum(state.memory_bytes for state in states.values()),
+        'evictions': evictions,
+        'sources': {source.name: {
+            'label': source.label,
+            'loaded': source.name in states,
+            'loads': loads[source.name],
+            'version': states[source.name].version if source.name in states else None,
+            'memory_bytes': states[source.name].memory_bytes if source.name in states else None,
+            'load_seconds': states[source.name].load_seconds if source.name in states else None,
+            # Строки, память таблицы и время предобработки (для подключенного общего файла - время подключения)
+            'dataset': _dataset_report(states.get(source.name)),
+        } for source in sources.enabled()},
+    }
+
+
+def _dataset_report(state):
+    if state is None or state.dataset is None:
+        return None
+    return state.dataset.report()
+
+
+_reload_lock = threading.Lock()
+
+
+def reload():
+    # Новая версия данных загруженных источников: состояние собирается в стороне и подменяется одним
+    # присваиванием, поэтому запрос видит либо старую версию, либо новую, но не наполовину собранную.
+    # Незагруженные источники проверяются при следующей загрузке. Возвращает список новых состояний.
+    with _reload_lock:
+        states = []
+        for name, version in loaded().items():
+            if latest_version(name) == version:
+                continue
+            with _state_lock:
+                previous = _states.get(name)
+            state = load_state(name, previous)
+            with _state_lock:
+                # Пока собиралась новая версия, источник могли выгрузить - тогда он загрузится при обращении
+                if name not in _states or _states[name].version == state.version:
+                    continue
+                _states[name] = state
+                _evict(keep=name)
+            states.append(state)
+        return states
+
+
+def __getattr__(name):
+    # data.df, data.cube, data.version и т.д. - атрибуты текущего состояния источника по умолчанию
+    if name in ('snapshot_header', 'version', 'dataset', 'df', 'cube', 'university_index', 'university_search',
+                'ranking_index', 'university_matrix', 'similarity_index', 'years'):
+        return getattr(current(), name)
+    raise AttributeError(f"module 'data' has no attribute {name!r}")
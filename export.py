@@ -0,0 +1,106 @@
+import numpy as np
+
+import config
+
+# Выгрузка среза датасета в CSV или NDJSON (по строке JSON на строку таблицы).
+# Строки выбираются и кодируются блоками по EXPORT_CHUNK_ROWS, ответ отдается генератором по мере
+# кодирования: в памяти одновременно только один блок, сколько бы строк ни попало в выгрузку.
+# Фильтры: университеты (через индекс университетов - только их диапазоны строк), страны, годы;
+# indicators - какие показатели выгружать (по умолчанию все).
+
+ID_COLUMNS = ['university_name', 'country', 'year']
+
+# Допустимые значения фильтра по году (столбец year - int16)
+MIN_YEAR, MAX_YEAR = 1, 9999
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+
+def indicator_columns(frame):
+    return [name for name in frame.columns if name not in ID_COLUMNS]
+
+
+def row_chunks(state, universities=(), countries=(), years=(), chunk_rows=config.EXPORT_CHUNK_ROWS):
+    # Номера строк среза блоками не длиннее chunk_rows
+    frame = state.df
+    if universities:
+        # Строки университета занимают непрерывный диапазон; неизвестные названия пропускаются
+        ranges = [state.university_index.range(university) for university in dict.fromkeys(universities)]
+    else:
+        ranges = [(0, len(frame))]
+
+    country_codes = None
+    if countries:
+        categories = frame['country'].array.categories
+        country_codes = np.flatnonzero(categories.isin(countries))
+        codes = np.asarray(frame['country'].array.codes)
+    year_values = np.asarray(years, dtype=frame['year'].dtype) if years else None
+    all_years = frame['year'].to_numpy()
+
+    for start, stop in ranges:
+        for chunk_start in range(start, stop, chunk_rows):
+            chunk_stop = min(chunk_start + chunk_rows, stop)
+            mask = np.ones(chunk_stop - chunk_start, dtype=bool)
+            if country_codes is not None:
+                mask &= np.isin(codes[chunk_start:chunk_stop], country_codes)
+            if year_values is not None:
+                mask &= np.isin(all_years[chunk_start:chunk_stop], year_values)
+            rows = chunk_start + np.flatnonzero(mask)
+            if len(rows):
+                yield rows
+
+
+def _csv(frame, chunks, positions):
+    yield frame.iloc[:0, positions].to_csv(index=False)
+    for rows in chunks:
+        yield frame.iloc[rows, positions].to_csv(index=False, header=False)
+
+
+def _ndjson(frame, chunks, positions):
+    floats32 = [name for name in frame.columns[positions] if frame[name].dtype == np.float32]
+    for rows in chunks:
+        chunk = frame.iloc[rows, positions]
+        if floats32:
+            # to_json печатает float32 через float64 с шумом (64.5999984741). Кратчайшая запись float32,
+            # как у to_csv, переведенная в float64, печатается так же, как в CSV: 64.6
+            chunk = chunk.assign(**{name: chunk[name].to_numpy().astype(str).astype(np.float64)
+                                    for name in floats32})
+        text = chunk.to_json(orient='records', lines=True, force_ascii=False)
+        yield text if text.endswith('\n') else text + '\n'
+
+
+def parse_years(values):
+    # Годы из параметров запроса; нечисловое значение или год вне MIN_YEAR..MAX_YEAR - ошибка, а не пропуск
+    # фильтра. Проверяется до первой части ответа: в генераторе строк ошибка оборвала бы уже начатый ответ
+    years = []
+    for value in values:
+        try:
+            year = int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'Invalid year {value!r}') from None
+        if not MIN_YEAR <= year <= MAX_YEAR:
+            raise ValueError(f'Year {year} is out of range {MIN_YEAR}-{MAX_YEAR}')
+        years.append(year)
+    return years
+
+
+def stream(state, fmt, universities=(), countries=(), years=(), indicators=()):
+    # Генератор частей ответа. Параметры проверяются сразу, до первой части: ошибка - ValueError
+    frame = state.df
+    if frame is None:
+        raise ValueError('Export is not available with the partitioned data backend')
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown export format {fmt!r}, expected one of {", ".join(FORMATS)}')
+    available = indicator_columns(frame)
+    unknown = [name for name in indicators if name not in available]
+    if unknown:
+        raise ValueError(f'Unknown indicators: {", ".join(unknown)}')
+    years = parse_years(years)
+    columns = ID_COLUMNS + (list(dict.fromkeys(indicators)) if indicators else available)
+    positions = [frame.columns.get_loc(name) for name in columns]
+    chunks = row_chunks(state, universities, countries, years)
+    encode = _csv if fmt == 'csv' else _ndjson
+    return encode(frame, chunks, positions)
@@ -0,0 +1,120 @@
+import functools
+import inspect
+import json
+import threading
+from collections import OrderedDict
+
+import config
+import data
+from metrics import metrics
+from serialization import estimated_size
+
+# Кэш результатов колбэков. Ключ - имя колбэка, версия датасета и значения входов.
+# Версия берется у источника рейтингов из аргумента колбэка source (см. sources.py), без него -
+# у источника по умолчанию. Размер записи - примерная длина JSON ответа (serialization.estimated_size),
+# при превышении предела вытесняются давно не использованные записи (LRU).
+
+
+def _source_position(func):
+    parameters = list(inspect.signature(func).parameters)
+    return parameters.index('source') if 'source' in parameters else None
+
+
+class FigureCache:
+
+    def __init__(self, max_bytes=config.FIGURE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(name, args, source_position=None):
+        source = args[source_position] if source_position is not None and source_position < len(args) else None
+        return name, data.current(source).version, json.dumps(args, sort_keys=True, default=str)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = estimated_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def retain_versions(self, versions):
+        # После смены датасета: записи других версий больше не понадобятся
+        versions = set(versions)
+        with self._lock:
+            for key in [key for key in self._entries if key[1] not in versions]:
+                self.bytes -= self._entries.pop(key)[1]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def cached(self, name):
+        # Декоратор для функции колбэка, ставится под @callback
+        def decorator(func):
+            source_position = _source_position(func)
+
+            @functools.wraps(func)
+            def wrapper(*args):
+                key = self.make_key(name, args, source_position)
+                value = self.get(key)
+                metrics.record_cache(value is not None)
+                if value is None:
+                    value = func(*args)
+                    self.put(key, value)
+                return value
+
+            wrapper.uncached = func
+            wrapper.cache_name = name
+            wrapper.source_position = source_position
+            return wrapper
+
+        return decorator
+
+    def prerender(self, func, inputs):
+        # Заранее заполняем кэш для всех вариантов входов; обращение к ним - поиск в словаре
+        if not config.FIGURE_CACHE_PRERENDER:
+            return
+        for args in inputs:
+            key = self.make_key(func.cache_name, args, func.source_position)
+            with self._lock:
+                present = key in self._entries
+            if not present:
+                self.put(key, func.uncached(*args))
+
+
+cache = FigureCache()
@@ -0,0 +1,30 @@
+# Имена модуля gunicorn читает как свои настройки, поэтому импортируем только значения
+from config import SERVER_BIND, SERVER_THREADS, SERVER_WORKERS
+
+# Настройки gunicorn для продакшена: gunicorn -c gunicorn.conf.py wsgi:server
+# Значения переопределяются переменными окружения UNIVERSITY_BIND, UNIVERSITY_WORKERS, UNIVERSITY_THREADS.
+
+bind = SERVER_BIND
+
+# Несколько процессов обходят GIL при построении графиков, потоки внутри процесса
+# обслуживают параллельные запросы, пока другие ждут ввода-вывода
+workers = SERVER_WORKERS
+threads = SERVER_THREADS
+worker_class = 'gthread'
+
+# Приложение (и датасет) загружается до fork, процессы делят его память
+preload_app = True
+
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # Потоки не переживают fork: наблюдатель за исходным CSV (см. reloader.py) запускается в каждом процессе.
+    # Первым делом он сверяет версию, полученную от главного процесса, с данными на диске
+    from reloader import reloader
+    reloader.start_watcher()
@@ -0,0 +1,128 @@
+import gzip
+import hashlib
+
+from flask import Response, g, request
+
+import config
+import data
+import sources
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Сжатие ответов и условные запросы для сервера Flask под Dash.
+#   - Ответы колбэков (/_dash-update-component) зависят только от тела запроса (входы и состояния)
+#     и версии выбранного в нем источника рейтингов, поэтому ETag считается от них до вызова колбэка.
+#     Если клиент прислал этот ETag в If-None-Match, отвечаем 304 и колбэк не вызывается.
+#     POST браузер не кэширует: ответы колбэков хранит и заголовок отправляет assets/http_cache.js.
+#     Версия источника запоминается до колбэка. Если за время колбэка источник перезагрузили, ответ
+#     собран по прежней версии и уходит без ETag. Если источник до колбэка не был загружен (колбэк
+#     загрузил его сам), ETag считается после колбэка.
+#   - Остальные GET-ответы (макет Dash, список колбэков) получают ETag по содержимому и тоже 304.
+#     Кроме HTML-страницы: Dash вставляет в нее случайный идентификатор, она разная на каждый запрос.
+#   - Текстовые ответы больше COMPRESS_MIN_BYTES сжимаются brotli (если модуль установлен) или gzip.
+#     ETag слабый (W/"..."): он один для сжатого и несжатого вариантов.
+#   - Картинки из static/images кэшируются браузером на STATIC_MAX_AGE секунд.
+
+DASH_UPDATE = '/_dash-update-component'
+STATIC_IMAGES = '/static/images/'
+COMPRESSIBLE = ('text/', 'application/json', 'application/javascript', 'application/x-ndjson', 'image/svg+xml')
+
+
+def _request_source():
+    # Источник рейтингов из входов или состояний колбэка (см. app.py, State('ranking-source'))
+    payload = request.get_json(silent=True, cache=True) or {}
+    for item in payload.get('inputs', []) + payload.get('state', []):
+        if isinstance(item, dict) and item.get('id') == 'ranking-source':
+            return item.get('value')
+    return None
+
+
+def _callback_version():
+    # Источник запроса и его загруженная версия (None - источник еще не загружен)
+    name = sources.get(_request_source()).name
+    return name, data.loaded().get(name)
+
+
+def callback_etag(name, version):
+    if version is None:
+        return None
+    body = request.get_data(cache=True)
+    return hashlib.sha256(f'{name}:{version}'.encode() + b'\0' + body).hexdigest()[:32]
+
+
+def _is_callback():
+    return request.method == 'POST' and request.path.endswith(DASH_UPDATE)
+
+
+def check_not_modified():
+    # before_request: 304 для колбэка, чей ответ у клиента уже есть
+    if not (config.HTTP_ETAGS and _is_callback()):
+        return None
+    name, version = _callback_version()
+    g.callback_version = version
+    etag = callback_etag(name, version)
+    if etag is not None and request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+    return None
+
+
+def _encoding():
+    if brotli is not None and request.accept_encodings['br']:
+        return 'br'
+    if request.accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=config.COMPRESS_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=config.COMPRESS_GZIP_LEVEL, mtime=0)
+
+
+def finish_response(response):
+    # after_request: ETag, ответ 304 для GET, сжатие, заголовки кэширования статики
+    if request.path.startswith(STATIC_IMAGES):
+        # send_file по умолчанию ставит no-cache, картинки же можно не сверять весь срок
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = config.STATIC_MAX_AGE
+    if response.status_code != 200 or response.direct_passthrough or response.is_streamed:
+        return response
+
+    if config.HTTP_ETAGS:
+        if _is_callback():
+            name, version = _callback_version()
+            before = g.get('callback_version')
+            # Версия сменилась во время колбэка: тело могло собраться по прежней версии
+            etag = callback_etag(name, version) if before in (None, version) else None
+            if etag is not None:
+                response.set_etag(etag, weak=True)
+        elif request.method == 'GET' and 'ETag' not in response.headers and response.mimetype != 'text/html':
+            response.add_etag(weak=True)
+            response.make_conditional(request)
+            if response.status_code == 304:
+                return response
+        if 'ETag' in response.headers:
+            # Браузер может хранить ответ, но должен сверять его с сервером
+            response.cache_control.no_cache = True
+
+    if (config.COMPRESS_MIN_BYTES and 'Content-Encoding' not in response.headers
+            and (response.mimetype or '').startswith(COMPRESSIBLE)):
+        encoding = _encoding()
+        body = response.get_data()
+        if encoding is not None and len(body) >= config.COMPRESS_MIN_BYTES:
+            response.set_data(compress(body, encoding))
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+    return response
+
+
+def init_app(server):
+    server.before_request(check_not_modified)
+    server.after_request(finish_response)
@@ -0,0 +1,195 @@
+import contextlib
+import cProfile
+import functools
+import io
+import pstats
+import random
+import threading
+import time
+from collections import defaultdict
+
+from dash.exceptions import PreventUpdate
+
+import config
+
+# Метрики колбэков для Prometheus (/metrics) и профилирование выборки медленных вызовов.
+# На каждый колбэк считаются вызовы, ошибки, распределение времени, попадания в кэш фигур,
+# байты ответов и время по фазам:
+#   data_slice   - выбор строк и агрегатов (блоки `with phase('data_slice')` в колбэках)
+#   figure_build - построение фигур (остаток времени колбэка)
+#   serialize    - компактная сериализация фигур и кодирование ответа Dash в JSON
+# Счетчики живут в памяти процесса: при нескольких рабочих процессах каждый отдает свои.
+
+BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+PHASES = ['data_slice', 'figure_build', 'serialize']
+
+_local = threading.local()
+
+
+class CallbackStats:
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.buckets = [0] * len(BUCKETS)
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.responses = 0
+        self.response_bytes = 0
+        self.profile = None
+        self.profiled = 0
+
+
+class Metrics:
+
+    def __init__(self, profile_rate=config.METRICS_PROFILE_RATE,
+                 profile_slow_seconds=config.METRICS_PROFILE_SLOW_SECONDS):
+        self.profile_rate = profile_rate
+        # Быстрые вызовы размывают сводку: профиль сохраняется, только если вызов дольше этого порога
+        self.profile_slow_seconds = profile_slow_seconds
+        self._stats = defaultdict(CallbackStats)
+        self._lock = threading.Lock()
+
+    def instrumented(self, name):
+        # Декоратор колбэка, ставится сразу под @callback (над @cache.cached)
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args):
+                record = {'name': name, 'phases': dict.fromkeys(PHASES, 0.0), 'cache': None}
+                _local.record = record
+                profiler = cProfile.Profile() if self.profile_rate and random.random() < self.profile_rate else None
+                started = time.perf_counter()
+                if profiler is not None:
+                    profiler.enable()
+                try:
+                    return func(*args)
+                except PreventUpdate:
+                    raise
+                except Exception:
+                    record['error'] = True
+                    raise
+                finally:
+                    if profiler is not None:
+                        profiler.disable()
+                    record['finished'] = time.perf_counter()
+                    record['seconds'] = record['finished'] - started
+                    phases = record['phases']
+                    phases['figure_build'] = max(0.0, record['seconds'] - phases['data_slice'] - phases['serialize'])
+                    self._observe(record, profiler)
+
+            return wrapper
+
+        return decorator
+
+    def _observe(self, record, profiler):
+        with self._lock:
+            stats = self._stats[record['name']]
+            stats.calls += 1
+            stats.errors += bool(record.get('error'))
+            stats.seconds += record['seconds']
+            for i, bound in enumerate(BUCKETS):
+                if record['seconds'] <= bound:
+                    stats.buckets[i] += 1
+            for phase_name, seconds in record['phases'].items():
+                stats.phases[phase_name] += seconds
+            if record['cache'] is True:
+                stats.cache_hits += 1
+            elif record['cache'] is False:
+                stats.cache_misses += 1
+            if profiler is not None and record['seconds'] > self.profile_slow_seconds:
+                stats.profiled += 1
+                if stats.profile is None:
+                    stats.profile = pstats.Stats(profiler)
+                else:
+                    stats.profile.add(profiler)
+
+    def record_cache(self, hit):
+        # Вызывается кэшем фигур внутри колбэка; попадание засчитывается текущему колбэку
+        record = getattr(_local, 'record', None)
+        if record is not None and record['cache'] is None:
+            record['cache'] = hit
+
+    def add_phase(self, phase_name, seconds):
+        record = getattr(_local, 'record', None)
+        if record is not None and 'finished' not in record:
+            record['phases'][phase_name] += seconds
+
+    def start_request(self):
+        _local.record = None
+
+    def observe_response(self, size):
+        # После ответа на /_dash-update-component: размер ответа и время кодирования JSON в Dash
+        record = getattr(_local, 'record', None)
+        _local.record = None
+        if record is None or 'finished' not in record:
+            return
+        with self._lock:
+            stats = self._stats[record['name']]
+            stats.responses += 1
+            stats.response_bytes += size
+            stats.phases['serialize'] += time.perf_counter() - record['finished']
+
+    def profile_report(self, name, limit=30):
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None or stats.profile is None:
+                return None
+            stream = io.StringIO()
+            stream.write(f'{stats.profiled} slow calls (> {self.profile_slow_seconds:g} s) profiled\n')
+            stats.profile.stream = stream
+            stats.profile.sort_stats('cumulative').print_stats(limit)
+            return stream.getvalue()
+
+    def render(self):
+        # Текстовый формат Prometheus
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{value_}"' for key, value_ in labels.items())
+                lines.append(f'{name}{{{label_text}}} {value}')
+
+        with self._lock:
+            items = sorted(self._stats.items())
+            metric('university_callback_calls_total', 'counter', 'Callback calls',
+                   [({'callback': name}, stats.calls) for name, stats in items])
+            metric('university_callback_errors_total', 'counter', 'Callback calls that raised',
+                   [({'callback': name}, stats.errors) for name, stats in items])
+
+            lines.append('# HELP university_callback_seconds Callback execution time')
+            lines.append('# TYPE university_callback_seconds histogram')
+            for name, stats in items:
+                for bound, count in zip(BUCKETS, stats.buckets):
+                    lines.append(f'university_callback_seconds_bucket{{callback="{name}",le="{bound}"}} {count}')
+                lines.append(f'university_callback_seconds_bucket{{callback="{name}",le="+Inf"}} {stats.calls}')
+                lines.append(f'university_callback_seconds_sum{{callback="{name}"}} {stats.seconds}')
+                lines.append(f'university_callback_seconds_count{{callback="{name}"}} {stats.calls}')
+
+            metric('university_callback_phase_seconds_total', 'counter', 'Callback time by phase',
+                   [({'callback': name, 'phase': phase_name}, seconds)
+                    for name, stats in items for phase_name, seconds in stats.phases.items()])
+            metric('university_callback_cache_total', 'counter', 'Figure cache lookups by callback',
+                   [({'callback': name, 'result': result}, count) for name, stats in items
+                    for result, count in [('hit', stats.cache_hits), ('miss', stats.cache_misses)]])
+            metric('university_callback_responses_total', 'counter', 'Callback HTTP responses',
+                   [({'callback': name}, stats.responses) for name, stats in items])
+            metric('university_callback_response_bytes_total', 'counter', 'Callback HTTP response bytes',
+                   [({'callback': name}, stats.response_bytes) for name, stats in items])
+        return '\n'.join(lines) + '\n'
+
+
+@contextlib.contextmanager
+def phase(name):
+    # with phase('data_slice'): ... - время блока засчитывается фазе текущего колбэка
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_phase(name, time.perf_counter() - started)
+
+
+metrics = Metrics()
@@ -0,0 +1,121 @@
+import importlib
+import logging
+import threading
+import time
+
+import data
+import sources
+
+logger = logging.getLogger(__name__)
+
+# Реестр страниц приложения: адрес -> модуль страницы.
+# Модули импортируются при старте - это дешево и нужно, чтобы их колбэки попали в Dash
+# (список колбэков Dash читает один раз, при первом запросе). Данные и макет страница строит
+# в load(source) при первом открытии адреса; фоновый прогрев может сделать это заранее.
+# Макет строится отдельно для каждого источника рейтингов (см. sources.py): списки университетов и годов
+# у источников разные. Макеты выгруженных источников (см. data.current) удаляются.
+# Время импорта и загрузки каждой страницы сохраняется в timings.
+
+ROUTES = {
+    '/': 'pages.global_tendensii',
+    '/page-1': 'pages.country_sravnenie',
+    '/page-2': 'pages.university_results',
+    '/page-3': 'pages.main',
+    '/page-4': 'pages.university_sravnenie',
+    '/page-5': 'pages.leaderboard',
+}
+
+
+class PageRegistry:
+
+    def __init__(self, routes=ROUTES):
+        self.routes = dict(routes)
+        self.timings = {path: {'module': module, 'import_seconds': None, 'load_seconds': None}
+                        for path, module in self.routes.items()}
+        self._modules = {}
+        self._layouts = {}
+        self._locks = {path: threading.Lock() for path in self.routes}
+        self._warm_up_thread = None
+
+    def __contains__(self, path):
+        return path in self.routes
+
+    def import_all(self):
+        for path, name in self.routes.items():
+            start = time.perf_counter()
+            self._modules[path] = importlib.import_module(name)
+            self.timings[path]['import_seconds'] = time.perf_counter() - start
+
+    def is_loaded(self, path, source=None):
+        return (path, sources.get(source).name) in self._layouts
+
+    def _load(self, path, source):
+        module = self._modules.get(path) or importlib.import_module(self.routes[path])
+        start = time.perf_counter()
+        load = getattr(module, 'load', None)
+        layout = load(source) if load is not None else module.layout
+        seconds = time.perf_counter() - start
+        self.timings[path]['load_seconds'] = seconds
+        logger.info('Page %s (%s, %s) loaded in %.1f ms', path, self.routes[path], source, seconds * 1000)
+        return layout
+
+    def layout(self, path, source=None):
+        # Макет страницы; при первом обращении страница загружается (один раз даже при параллельных запросах)
+        key = path, sources.get(source).name
+        layout = self._layouts.get(key)
+        if layout is not None:
+            return layout
+        with self._locks[path]:
+            layout = self._layouts.get(key)
+            if layout is None:
+                layout = self._layouts[key] = self._load(*key)
+        self._drop_unloaded()
+        return layout
+
+    def _drop_unloaded(self):
+        # Макеты выгруженных источников больше не нужны
+        for key in list(self._layouts):
+            if not data.is_loaded(key[1]):
+                self._layouts.pop(key, None)
+
+    def reload(self):
+        # После смены датасета пересобираем уже открытые страницы (списки университетов, годов и т.д.).
+        # Пока идет сборка, отдается старый макет страницы, затем он подменяется новым
+        self._drop_unloaded()
+        for path, source in list(self._layouts):
+            with self._locks[path]:
+                self._layouts[path, source] = self._load(path, source)
+
+    def warm_up(self):
+        # Загружаем источник по умолчанию и его еще не открытые страницы (остальные источники - при первом
+        # выборе); ошибка одной страницы не мешает остальным
+        start = time.perf_counter()
+        try:
+            data.current()
+        except Exception:
+            logger.exception('Dataset warm-up failed')
+            return
+        for path in self.routes:
+            if not self.is_loaded(path):
+                try:
+                    self.layout(path)
+                except Exception:
+                    logger.exception('Warm-up of page %s failed', path)
+        logger.info('Pages warmed up in %.1f ms', (time.perf_counter() - start) * 1000)
+
+    def start_warm_up(self):
+        if self._warm_up_thread is None:
+            self._warm_up_thread = threading.Thread(target=self.warm_up, name='page-warm-up', daemon=True)
+            self._warm_up_thread.start()
+        return self._warm_up_thread
+
+    def stats(self):
+        # Загрузка датасета считается отдельно: ее оплачивает первая открытая страница с данными
+        dataset = {'loaded': data.is_loaded(), 'load_seconds': None}
+        if dataset['loaded']:
+            dataset['load_seconds'] = data.current().load_seconds
+        pages = {path: dict(timing, loaded=self.is_loaded(path)) for path, timing in self.timings.items()}
+        return {'dataset': dataset, 'pages': pages}
+
+
+registry = PageRegistry()
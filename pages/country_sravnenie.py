@@ -1,19 +1,14 @@
-from dash import html, dcc, callback, Output, Input
+from dash import html, dcc, callback, clientside_callback, ClientsideFunction, Output, Input, State
 import dash_bootstrap_components as dbc
 import plotly.express as px
-import pandas as pd
-from data import df
+from clientside import variants_store
+from config import INDICATOR_SWITCHING
+import data
+from figure_cache import cache
+from metrics import metrics, phase
+from serialization import compact_outputs
 
-
-df['teaching'] = pd.to_numeric(df['teaching'], errors='coerce').fillna(0)
-df['research'] = pd.to_numeric(df['research'], errors='coerce').fillna(0)
-df['citations'] = pd.to_numeric(df['citations'], errors='coerce').fillna(0)
-df['income'] = pd.to_numeric(df['income'], errors='coerce').fillna(0)
-df['world_rank'] = pd.to_numeric(df['world_rank'], errors='coerce').fillna(0)
-
-# Группировка данных по странам
-average_ranking_by_country = df.groupby('country')['world_rank'].mean().reset_index()
-average_scores_by_country = df.groupby('country')[['teaching', 'research', 'citations', 'income']].mean().reset_index()
+INDICATORS = ['teaching', 'research', 'citations', 'income']
 
 layout = dbc.Container([
     dbc.Row([
@@ -54,12 +49,15 @@ layout = dbc.Container([
 ], fluid=True)
 
 
-@callback(
-    [Output('choropleth-map', 'figure'),
-     Output('bar-chart', 'figure')],
-    [Input('indicator-radioitems', 'value')]
-)
-def update_graphs(indicator):
+@cache.cached('country_sravnenie.update_graphs')
+@compact_outputs
+def update_graphs(indicator, source=None):
+    # Средние по странам за все годы - срезы куба агрегатов
+    with phase('data_slice'):
+        cube = data.current(source).cube
+        average_ranking_by_country = cube.by_country('world_rank')
+        average_scores_by_country = cube.by_country(INDICATORS)
+
     # Choropleth Map
     choropleth_fig = px.choropleth(
         average_ranking_by_country if indicator == 'world_rank' else average_scores_by_country,
@@ -83,4 +81,31 @@ def update_graphs(indicator):
     choropleth_fig.update_layout(margin={"r": 0, "t": 50, "l": 0, "b": 0})
     bar_fig.update_layout(margin={"r": 0, "t": 0, "l": 0, "b": 0})
 
-    return choropleth_fig, bar_fig
\ No newline at end of file
+    return choropleth_fig, bar_fig
+
+
+outputs = [Output('choropleth-map', 'figure'),
+           Output('bar-chart', 'figure')]
+if INDICATOR_SWITCHING == 'client':
+    # Все четыре варианта карты и диаграммы уходят в браузер вместе с макетом, переключение - без запросов к серверу
+    clientside_callback(
+        ClientsideFunction(namespace='variants', function_name='apply'),
+        outputs,
+        Input('indicator-radioitems', 'value'),
+        State('country-graphs-variants', 'data')
+    )
+else:
+    callback(outputs, [Input('indicator-radioitems', 'value')], State('ranking-source', 'value'))(
+        metrics.instrumented('country_sravnenie.update_graphs')(update_graphs))
+
+
+def load(source=None):
+    # Тяжелая часть страницы, выполняется при первом открытии (см. page_registry.py)
+    if INDICATOR_SWITCHING == 'client':
+        # Варианты графиков у каждого источника рейтингов свои, остальной макет общий
+        variants = dcc.Store(id='country-graphs-variants', data=variants_store(
+            lambda indicator: update_graphs.uncached(indicator, source), INDICATORS))
+        return dbc.Container(layout.children + [variants], fluid=True)
+    # Переключатель показателей имеет всего четыре значения - строим все графики заранее
+    cache.prerender(update_graphs, [(indicator, source) for indicator in INDICATORS])
+    return layout
@@ -1,19 +1,14 @@
-from dash import html, dcc, callback, Output, Input
+from dash import html, dcc, callback, clientside_callback, ClientsideFunction, Output, Input, State
 import dash_bootstrap_components as dbc
 import plotly.express as px
-import pandas as pd
-from data import df
+from clientside import variants_store
+from config import INDICATOR_SWITCHING
+import data
+from figure_cache import cache
+from metrics import metrics, phase
+from serialization import compact_outputs
 
-# Предобработка данных
-df['teaching'] = pd.to_numeric(df['teaching'], errors='coerce').fillna(0)
-df['research'] = pd.to_numeric(df['research'], errors='coerce').fillna(0)
-df['citations'] = pd.to_numeric(df['citations'], errors='coerce').fillna(0)
-df['income'] = pd.to_numeric(df['income'], errors='coerce').fillna(0)
-df['world_rank'] = pd.to_numeric(df['world_rank'], errors='coerce').fillna(0)
-
-# Группировка данных по годам
-average_ranking = df.groupby('year')['world_rank'].mean().reset_index()
-average_scores = df.groupby('year')[['teaching', 'research', 'citations', 'income']].mean().reset_index()
+INDICATORS = ['teaching', 'research', 'citations', 'income']
 
 # Создание Dash приложения
 layout = dbc.Container([
@@ -50,12 +45,14 @@ layout = dbc.Container([
     ], style={'margin': '0px'})  # Убираем отступы между строками
 ], fluid=True)
 
-@callback(
-    [Output('line-graph', 'figure'),
-     Output('graph-title', 'children')],
-    Input('indicator-radioitems', 'value')
-)
-def update_line_graph(indicator):
+@cache.cached('global_tendensii.update_line_graph')
+@compact_outputs
+def update_line_graph(indicator, source=None):
+    # Средние по годам берем из предрассчитанного куба агрегатов (пропуски в средние не попадают)
+    with phase('data_slice'):
+        cube = data.current(source).cube
+        average_ranking = cube.by_year('world_rank')
+        average_scores = cube.by_year(INDICATORS)
     if indicator == 'world_rank':
         title = 'Средний мировой рейтинг университетов по годам'
         fig = px.line(average_ranking, x='year', y='world_rank',
@@ -75,3 +72,30 @@ def update_line_graph(indicator):
     fig.update_layout(margin={"r": 0, "t": 0, "l": 0, "b": 0},
                       showlegend=False)
     return fig, title
+
+
+outputs = [Output('line-graph', 'figure'),
+           Output('graph-title', 'children')]
+if INDICATOR_SWITCHING == 'client':
+    # Все четыре варианта графика уходят в браузер вместе с макетом, переключение - без запросов к серверу
+    clientside_callback(
+        ClientsideFunction(namespace='variants', function_name='apply'),
+        outputs,
+        Input('indicator-radioitems', 'value'),
+        State('line-graph-variants', 'data')
+    )
+else:
+    callback(outputs, Input('indicator-radioitems', 'value'), State('ranking-source', 'value'))(
+        metrics.instrumented('global_tendensii.update_line_graph')(update_line_graph))
+
+
+def load(source=None):
+    # Тяжелая часть страницы, выполняется при первом открытии (см. page_registry.py)
+    if INDICATOR_SWITCHING == 'client':
+        # Варианты графиков у каждого источника рейтингов свои, остальной макет общий
+        variants = dcc.Store(id='line-graph-variants', data=variants_store(
+            lambda indicator: update_line_graph.uncached(indicator, source), INDICATORS))
+        return dbc.Container(layout.children + [variants], fluid=True)
+    # Переключатель показателей имеет всего четыре значения - строим все графики заранее
+    cache.prerender(update_line_graph, [(indicator, source) for indicator in INDICATORS])
+    return layout
@@ -0,0 +1,144 @@
+from dash import html, dcc, callback, Output, Input, State
+from dash.exceptions import PreventUpdate
+import dash_bootstrap_components as dbc
+import plotly.graph_objects as go
+import data
+from figure_cache import cache
+from metrics import metrics, phase
+from serialization import compact_outputs
+
+# Лидеры по показателю за год. Строки берутся из индекса рейтингов (ranking_index.py):
+# топ-N - срез заранее отсортированного массива, сортировки на запрос нет.
+
+indicator_labels = {
+    'world_rank': 'Мировой рейтинг',
+    'total_score': 'Общий балл',
+    'teaching': 'Преподавание',
+    'research': 'Исследования',
+    'citations': 'Цитирования',
+    'income': 'Доход от индустрии',
+    'international': 'Международная репутация',
+    'num_students': 'Число студентов',
+    'student_staff_ratio': 'Соотношение студентов и преподавателей',
+    'international_students': 'Процент иностранных студентов',
+}
+
+TOP_SIZES = [10, 20, 50, 100]
+
+
+def load(source=None):
+    # Макет строится при первом открытии страницы (см. page_registry.py): списку годов нужен датасет
+    ranking = data.current(source).ranking_index
+    if ranking is None:
+        # Хранилище на диске (см. data.OutOfCoreState): индекса рейтингов нет
+        return dbc.Container([
+            html.H1("Лидеры по показателям"),
+            html.P("Страница недоступна, когда датасет хранится на диске по разделам."),
+        ], fluid=True)
+    years = ranking.years
+
+    return dbc.Container([
+        dbc.Row([
+            html.Div([
+                html.H1("Лидеры по показателям"),
+                html.P("Лучшие университеты года по выбранному показателю."),
+                html.Hr(style={'color': 'black'}),
+            ], style={'textAlign': 'center'})
+        ]),
+
+        dbc.Row([
+            dbc.Col([
+                dbc.Label("Выберите показатель:"),
+                dcc.Dropdown(
+                    id='leaderboard-indicator',
+                    options=[{'label': label, 'value': value} for value, label in indicator_labels.items()],
+                    value='research',
+                    clearable=False
+                ),
+            ], width=5),
+            dbc.Col([
+                dbc.Label("Выберите год:"),
+                dcc.Dropdown(
+                    id='leaderboard-year',
+                    options=[{'label': year, 'value': year} for year in years],
+                    value=years[-1],
+                    clearable=False
+                ),
+            ], width=4),
+            dbc.Col([
+                dbc.Label("Сколько показать:"),
+                dbc.RadioItems(
+                    id='leaderboard-size',
+                    options=[{'label': size, 'value': size} for size in TOP_SIZES],
+                    value=20,
+                    inline=True
+                ),
+            ], width=3),
+        ], className="mb-4"),
+
+        dbc.Row([
+            dbc.Col(dcc.Graph(id='leaderboard-graph', config={'displayModeBar': False})),
+        ]),
+        dbc.Row([
+            dbc.Col(html.Div(id='leaderboard-table')),
+        ]),
+    ], fluid=True)
+
+
+@callback(
+    [Output('leaderboard-graph', 'figure'),
+     Output('leaderboard-table', 'children')],
+    [Input('leaderboard-indicator', 'value'),
+     Input('leaderboard-year', 'value'),
+     Input('leaderboard-size', 'value')],
+    State('ranking-source', 'value')
+)
+@metrics.instrumented('leaderboard.update_leaderboard')
+@cache.cached('leaderboard.update_leaderboard')
+@compact_outputs
+def update_leaderboard(indicator, year, size, source=None):
+    with phase('data_slice'):
+        state = data.current(source)
+        ranking = state.ranking_index
+        if ranking is None:
+            # Хранилище на диске: индекса рейтингов нет, в макете страницы нет и графика
+            raise PreventUpdate
+        rows = ranking.top(indicator, year, size)
+        top = state.df.iloc[rows]
+        names = top['university_name'].astype(str).tolist()
+        countries = top['country'].astype(str).tolist()
+        values = top[indicator].to_numpy()
+        percentiles = ranking.percentiles[indicator][rows]
+        # Места из индекса: у равных по показателю одно место
+        places = (ranking.positions[indicator][rows] + 1).tolist()
+        total = ranking.count(indicator, year)
+
+    label = indicator_labels[indicator]
+    # Горизонтальная диаграмма: первое место сверху
+    fig = go.Figure(go.Bar(
+        x=values,
+        y=names,
+        orientation='h',
+        customdata=percentiles,
+        hovertemplate=f'%{{y}}<br>{label}: %{{x}}<br>Процентиль: %{{customdata:.0f}}<extra></extra>',
+        marker_color='green',
+    ))
+    fig.update_layout(
+        title=f'Топ-{len(names)} по показателю: {label} ({year}, всего {total})',
+        yaxis=dict(autorange='reversed'),
+        xaxis_title=label,
+        height=max(400, 22 * len(names)),
+        margin={"r": 0, "t": 50, "l": 0, "b": 0},
+    )
+
+    table = dbc.Table(
+        [html.Thead(html.Tr([html.Th('Место'), html.Th('Университет'), html.Th('Страна'),
+                             html.Th(label), html.Th('Процентиль')]))] +
+        [html.Tbody([
+            html.Tr([html.Td(place), html.Td(name), html.Td(country),
+                     html.Td(f'{value:g}'), html.Td(f'{percentile:.0f}')])
+            for place, name, country, value, percentile in zip(places, names, countries, values, percentiles)
+        ])],
+        striped=True, bordered=False, hover=True, size='sm',
+    )
+    return fig, table
@@ -1,70 +1,183 @@
-from dash import html, dcc, callback, Output, Input
+from dash import html, dcc, callback, Output, Input, State
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
 import plotly.express as px
-import pandas as pd
-from data import df
-
-# Преобразование столбцов в числовой формат, обработка ошибок и пропусков
-df['teaching'] = pd.to_numeric(df['teaching'], errors='coerce').fillna(0)
-df['research'] = pd.to_numeric(df['research'], errors='coerce').fillna(0)
-df['citations'] = pd.to_numeric(df['citations'], errors='coerce').fillna(0)
-df['income'] = pd.to_numeric(df['income'], errors='coerce').fillna(0)
-df['world_rank'] = pd.to_numeric(df['world_rank'], errors='coerce').fillna(0)
-
-df[['female_percentage', 'male_percentage']] = df['female_male_ratio'].astype(str).str.split(' : ', expand=True)
-df['female_percentage'] = pd.to_numeric(df['female_percentage'], errors='coerce')
-df['male_percentage'] = pd.to_numeric(df['male_percentage'], errors='coerce')
-df['female_percentage'] = df['female_percentage'] / (df['female_percentage'] + df['male_percentage']) * 100
-df['male_percentage'] = 100 - df['female_percentage']
-
-# Получение списка уникальных университетов
-universities = df['university_name'].unique()
-
-# Создание Dash приложения
-layout = dbc.Container([
-    dbc.Row([
-        html.Div([
-            html.H1("Анализ университетов по годам"),
-            html.P("Выберите университет для анализа его мирового рейтинга и баллов по критериям."),
-            html.Hr(style={'color': 'black'}),
-        ], style={'textAlign': 'center'})
-    ]),
-
-    html.Br(),
-
-    dbc.Row([
-        dbc.Col([
-            dbc.Label("Выберите университет:"),
-            dcc.Dropdown(
-                id='university-dropdown',
-                options=[{'label': uni, 'value': uni} for uni in universities],
-                value=universities[0]
-            ),
-        ], width=12)
-    ]),
-
-    dbc.Row([
-        dbc.Col([
-            dcc.Graph(id='line-graph-ranking', config={'displayModeBar': False}),
+from config import UNIVERSITY_SEARCH_LIMIT, UNIVERSITY_SEARCH_MODE
+import data
+from figure_cache import cache
+from metrics import metrics, phase
+from serialization import compact_outputs
+
+# Числовые столбцы и доли по полу (female_percentage/male_percentage) готовит data.py
+
+
+def load(source=None):
+    # Макет строится при первом открытии страницы (см. page_registry.py): списку нужен загруженный датасет
+    state = data.current(source)
+
+    # Получение списка уникальных университетов
+    universities = state.university_index.names
+
+    # При поиске на сервере в макет попадает только несколько вариантов, остальные подбираются по мере ввода
+    if UNIVERSITY_SEARCH_MODE == 'server':
+        university_options = state.university_search.search('', UNIVERSITY_SEARCH_LIMIT)
+    else:
+        university_options = universities
+
+    return dbc.Container([
+        dbc.Row([
+            html.Div([
+                html.H1("Анализ университетов по годам"),
+                html.P("Выберите университет для анализа его мирового рейтинга и баллов по критериям."),
+                html.Hr(style={'color': 'black'}),
+            ], style={'textAlign': 'center'})
+        ]),
+
+        html.Br(),
+
+        dbc.Row([
+            dbc.Col([
+                dbc.Label("Выберите университет:"),
+                dcc.Dropdown(
+                    id='university-dropdown',
+                    options=[{'label': uni, 'value': uni} for uni in university_options],
+                    value=universities[0]
+                ),
+            ], width=12)
+        ]),
+
+        # Процентили университета по показателям за последний год (из индекса рейтингов)
+        dbc.Row([
+            dbc.Col(html.Div(id='percentile-badges', className="my-3")),
+        ]),
+
+        # Университеты с похожим профилем показателей за тот же год (см. similarity.py)
+        dbc.Row([
+            dbc.Col(html.Div(id='similar-universities', className="mb-3")),
+        ]),
+
+        dbc.Row([
+            dbc.Col([
+                dcc.Graph(id='line-graph-ranking', config={'displayModeBar': False}),
+            ]),
         ]),
-    ]),
 
-    dbc.Row([
-        dbc.Col([
-            dcc.Graph(id='line-graph-scores', config={'displayModeBar': False}),
+        dbc.Row([
+            dbc.Col([
+                dcc.Graph(id='line-graph-scores', config={'displayModeBar': False}),
+            ]),
         ]),
-    ]),
-    dbc.Row([
-        dbc.Col([
-            dcc.Graph(id='bar-graph-students', config={'displayModeBar': False}),
+        dbc.Row([
+            dbc.Col([
+                dcc.Graph(id='bar-graph-students', config={'displayModeBar': False}),
+            ]),
         ]),
-    ]),
-    dbc.Row([
-        dbc.Col([
-            dcc.Graph(id='bar-graph-gender-ratio', config={'displayModeBar': False}),
+        dbc.Row([
+            dbc.Col([
+                dcc.Graph(id='bar-graph-gender-ratio', config={'displayModeBar': False}),
+            ]),
         ]),
-    ]),
-], fluid=True)
+    ], fluid=True)
+
+
+if UNIVERSITY_SEARCH_MODE == 'server':
+    @callback(
+        Output('university-dropdown', 'options'),
+        Input('university-dropdown', 'search_value'),
+        State('university-dropdown', 'value'),
+        State('ranking-source', 'value')
+    )
+    @metrics.instrumented('university_results.update_university_options')
+    def update_university_options(search_value, selected_university, source=None):
+        if not search_value:
+            raise PreventUpdate
+        with phase('data_slice'):
+            names = data.current(source).university_search.search(search_value, UNIVERSITY_SEARCH_LIMIT)
+        # Выбранный университет должен оставаться в списке, иначе Dropdown сбросит значение
+        if selected_university and selected_university not in names:
+            names = [selected_university] + names
+        return [{'label': uni, 'value': uni} for uni in names]
+
+
+# Показатели для значков процентилей
+badge_labels = {
+    'world_rank': 'Мировой рейтинг',
+    'teaching': 'Преподавание',
+    'research': 'Исследования',
+    'citations': 'Цитирования',
+    'income': 'Доход от индустрии',
+    'international': 'Международная репутация',
+}
+
+
+def badge_color(percentile):
+    if percentile >= 90:
+        return 'success'
+    if percentile >= 50:
+        return 'primary'
+    return 'secondary'
+
+
+@callback(
+    Output('percentile-badges', 'children'),
+    Input('university-dropdown', 'value'),
+    State('ranking-source', 'value')
+)
+@metrics.instrumented('university_results.update_percentile_badges')
+def update_percentile_badges(selected_university, source=None):
+    with phase('data_slice'):
+        state = data.current(source)
+        # Без индекса рейтингов (хранилище на диске, см. data.OutOfCoreState) значков нет
+        if state.ranking_index is None:
+            return []
+        start, stop = state.university_index.range(selected_university)
+    if start == stop:
+        return []
+    # Внутри диапазона университета годы идут по возрастанию - последняя строка и есть последний год
+    row = stop - 1
+    year = int(state.df['year'].iat[row])
+    badges = [html.Span(f'Процентиль среди университетов за {year} год:', className="me-2")]
+    for indicator, label in badge_labels.items():
+        percentile = state.ranking_index.percentile(row, indicator)
+        if percentile != percentile:  # NaN - нет значения
+            continue
+        badges.append(dbc.Badge(f'{label}: {percentile:.0f}', color=badge_color(percentile), className="me-1"))
+    return badges
+
+
+SIMILAR_COUNT = 8
+
+
+@callback(
+    Output('similar-universities', 'children'),
+    Input('university-dropdown', 'value'),
+    State('ranking-source', 'value')
+)
+@metrics.instrumented('university_results.update_similar_universities')
+def update_similar_universities(selected_university, source=None):
+    with phase('data_slice'):
+        state = data.current(source)
+        if state.similarity_index is None:
+            return []
+        start, stop = state.university_index.range(selected_university)
+        if start == stop:
+            return []
+        row = stop - 1
+        rows, distances = state.similarity_index.similar(row, SIMILAR_COUNT)
+        similar = state.df.iloc[rows]
+        names = similar['university_name'].astype(str).tolist()
+        countries = similar['country'].astype(str).tolist()
+    year = int(state.df['year'].iat[row])
+    if not names:
+        return html.P(f'Недостаточно показателей за {year} год, чтобы найти похожие университеты.',
+                      className="text-muted")
+    return [
+        html.H5(f'Похожие университеты по показателям за {year} год'),
+        dbc.ListGroup([
+            dbc.ListGroupItem(f'{name} ({country}) - расстояние {distance:.2f}')
+            for name, country, distance in zip(names, countries, distances)
+        ], flush=True),
+    ]
 
 
 @callback(
@@ -72,10 +185,15 @@ layout = dbc.Container([
      Output('line-graph-scores', 'figure'),
      Output('bar-graph-students', 'figure'),
      Output('bar-graph-gender-ratio', 'figure')],
-    [Input('university-dropdown', 'value')]
+    [Input('university-dropdown', 'value')],
+    State('ranking-source', 'value')
 )
-def update_graphs(selected_university):
-    filtered_data = df[df['university_name'] == selected_university]
+@metrics.instrumented('university_results.update_graphs')
+@cache.cached('university_results.update_graphs')
+@compact_outputs
+def update_graphs(selected_university, source=None):
+    with phase('data_slice'):
+        filtered_data = data.current(source).university_frame(selected_university)
 
     # Line graph for world ranking
     ranking_fig = px.line(
@@ -1,33 +1,18 @@
-from dash import html, dcc, callback, Output, Input
+from urllib.parse import urlencode
+
+from dash import html, dcc, callback, Output, Input, State, Patch, no_update
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
 import plotly.express as px
-import pandas as pd
-from data import df
-
-
-# Преобразование столбцов в числовой формат, удаляя запятые и символы '%'
-def clean_column(column):
-    if isinstance(column, str):
-        column = column.replace(',', '').replace('%', '')
-    return pd.to_numeric(column, errors='coerce')
-
-additional_columns = ['num_students', 'student_staff_ratio', 'international_students']
-for column in additional_columns:
-    df[column] = df[column].apply(clean_column)
-
+import plotly.graph_objects as go
+from config import UNIVERSITY_SEARCH_LIMIT, UNIVERSITY_SEARCH_MODE
+import data
+from figure_cache import cache
+from metrics import metrics, phase
+from preprocessing import ADDITIONAL_COLUMNS as additional_columns
+from serialization import compact_outputs, compact_trace, pack_array
 
-# Предобработка данных
-df['teaching'] = pd.to_numeric(df['teaching'], errors='coerce')
-df['research'] = pd.to_numeric(df['research'], errors='coerce')
-df['citations'] = pd.to_numeric(df['citations'], errors='coerce')
-df['income'] = pd.to_numeric(df['income'], errors='coerce')
-
-# Создание списка уникальных университетов
-universities = df['university_name'].unique()
-years = df['year'].unique()
-
-# Группировка данных по годам
-average_scores = df.groupby('year')[['teaching', 'research', 'citations', 'income']].mean().reset_index()
+# Числовые столбцы уже очищены от запятых и символов '%' в data.py
 
 # Переводим критерии на русский
 criteria_labels = {
@@ -37,118 +22,180 @@ criteria_labels = {
     'income': 'Доход от индустрии'
 }
 
-# Создаем график средних баллов по критериям по годам с переводом на русский
-average_scores_fig = px.line(
-    average_scores, 
-    x='year', 
-    y=['teaching', 'research', 'citations', 'income'],
-    title='Средние баллы по критериям по годам',
-    labels={'year': 'Год', 'value': 'Баллы', 'variable': 'Критерий'}
-)
-average_scores_fig.for_each_trace(lambda t: t.update(name=criteria_labels[t.name]))
-
-layout = dbc.Container([
-    dbc.Row([
-        dbc.Col(html.H1("Анализ рейтингов университетов"), className="mb-2")
-    ]),
-    dbc.Row([
-        dbc.Col([
-            dbc.Label("Выберите университет:"),
-            dcc.Dropdown(
-            id='university-dropdown',
-            options=[{'label': uni, 'value': uni} for uni in universities],
-            value=[universities[0]],
-            multi=True
-        )], className="mb-4")
-    ]),
-    dbc.Row([
-        dbc.Col([
-            dbc.Label("Выберите год:"),
-            dcc.Dropdown(
-            id='year-dropdown',
-            options=[{'label': year, 'value': year} for year in years],
-            value=years[0],
-            clearable=False
-        )], className="mb-4")
-    ]),
-    dbc.Row([
-        dbc.Col(dcc.Graph(id='ranking-comparison'), className="mb-4")
-    ]),
-    dbc.Row([
-        dbc.Col(dcc.Graph(id='criteria-comparison'), className="mb-4")
-    ]),
-    dbc.Row([
-        dbc.Col(dcc.Graph(id='student-count-comparison'), className="mb-4")
-    ]),
-    dbc.Row([
-        dbc.Col(dcc.Graph(id='additional-bar-comparison'), className="mb-4")
-    ])
-], fluid=True)
 
-@callback(
-    [Output('criteria-comparison', 'figure'),
-     Output('ranking-comparison', 'figure'),
-     Output('student-count-comparison', 'figure'),
-     Output('additional-bar-comparison', 'figure')],
-    [Input('university-dropdown', 'value'),
-     Input('year-dropdown', 'value')]
-)
-def update_graphs(selected_universities, selected_year):
-    filtered_data = df[(df['university_name'].isin(selected_universities)) & (df['year'] == selected_year)]
-    filtered_data_1 = df[(df['university_name'].isin(selected_universities))]
+def load(source=None):
+    # Макет строится при первом открытии страницы (см. page_registry.py): спискам нужен загруженный датасет
+    state = data.current(source)
+
+    # Создание списка уникальных университетов
+    universities = state.university_index.names
+    years = state.years
+
+    # При поиске на сервере в макет попадает только несколько вариантов, остальные подбираются по мере ввода
+    if UNIVERSITY_SEARCH_MODE == 'server':
+        university_options = state.university_search.search('', UNIVERSITY_SEARCH_LIMIT)
+    else:
+        university_options = universities
+
+    return dbc.Container([
+        dbc.Row([
+            dbc.Col(html.H1("Анализ рейтингов университетов"), className="mb-2")
+        ]),
+        dbc.Row([
+            dbc.Col([
+                dbc.Label("Выберите университет:"),
+                dcc.Dropdown(
+                id='universities-dropdown',
+                options=[{'label': uni, 'value': uni} for uni in university_options],
+                value=[universities[0]],
+                multi=True
+            )], className="mb-4")
+        ]),
+        dbc.Row([
+            dbc.Col([
+                dbc.Label("Выберите год:"),
+                dcc.Dropdown(
+                id='year-dropdown',
+                options=[{'label': year, 'value': year} for year in years],
+                value=years[0],
+                clearable=False
+            )], className="mb-4")
+        ]),
+        # Данные выбранных университетов за все годы (см. export.py). Выгрузка читает таблицу в памяти,
+        # поэтому для хранилища на диске ссылки скрыты
+        dbc.Row([
+            dbc.Col([
+                html.A("Скачать CSV", id='export-csv', className="me-3"),
+                html.A("Скачать NDJSON", id='export-ndjson'),
+            ], className="mb-4")
+        ], style=None if state.df is not None else {'display': 'none'}),
+        dbc.Row([
+            dbc.Col(dcc.Graph(id='ranking-comparison'), className="mb-4")
+        ]),
+        dbc.Row([
+            dbc.Col(dcc.Graph(id='criteria-comparison'), className="mb-4")
+        ]),
+        dbc.Row([
+            dbc.Col(dcc.Graph(id='student-count-comparison'), className="mb-4")
+        ]),
+        dbc.Row([
+            dbc.Col(dcc.Graph(id='additional-bar-comparison'), className="mb-4")
+        ]),
+        # Что уже нарисовано в браузере: по нему считаются частичные обновления графиков
+        dcc.Store(id='comparison-state'),
+    ], fluid=True)
+
+
+if UNIVERSITY_SEARCH_MODE == 'server':
+    @callback(
+        Output('universities-dropdown', 'options'),
+        Input('universities-dropdown', 'search_value'),
+        State('universities-dropdown', 'value'),
+        State('ranking-source', 'value')
+    )
+    @metrics.instrumented('university_sravnenie.update_university_options')
+    def update_university_options(search_value, selected_universities, source=None):
+        if not search_value:
+            raise PreventUpdate
+        with phase('data_slice'):
+            names = data.current(source).university_search.search(search_value, UNIVERSITY_SEARCH_LIMIT)
+        # Выбранные университеты должны оставаться в списке, иначе Dropdown их сбросит
+        selected = [uni for uni in selected_universities or [] if uni not in names]
+        return [{'label': uni, 'value': uni} for uni in selected + names]
+
+
+# Критерии и дополнительные показатели в порядке трасс на столбчатых диаграммах
+CRITERIA = ['teaching', 'research', 'citations', 'income']
+ADDITIONAL_BARS = ['student_staff_ratio', 'international_students']
+
+additional_labels = {
+    'num_students': 'Число студентов',
+    'student_staff_ratio': 'Соотношение студентов и преподавателей',
+    'international_students': 'Процент иностранных студентов'
+}
+
+CRITERIA_TITLE = 'Сравнение баллов по критериям для выбранных университетов ({})'
+STUDENTS_TITLE = 'Сравнение численности студентов для выбранных университетов ({})'
+ADDITIONAL_TITLE = ('Сравнение соотношения студентов и преподавателей и процента иностранных студентов '
+                    'для выбранных университетов ({})')
+RANKING_COLORS = px.colors.qualitative.Plotly
+
+
+def year_rows(selected_universities, selected_year, source=None):
+    # Строки выбранных университетов за год; строки с пропусками в дополнительных показателях отбрасываются.
+    # Показатели, которых у источника рейтингов нет вовсе (см. sources.py), строки не отбрасывают
+    with phase('data_slice'):
+        state = data.current(source)
+        present = [name for name in additional_columns if state.cube.get(name, 'count') > 0]
+        filtered_data = state.universities_frame(selected_universities, selected_year)
+        return filtered_data.dropna(subset=present)
+
+
+def ranking_traces(universities, source=None):
+    # Линии рейтинга выбранных университетов: K строк матрицы университет x год за одну выборку.
+    # Цвет зависит только от университета, поэтому при добавлении линий по одной
+    # цвета совпадают с полной перерисовкой.
+    with phase('data_slice'):
+        state = data.current(source)
+        series = state.university_matrix.series('world_rank', universities)
+    return [ranking_trace(university, state.university_index.code(university) or 0, years, ranks)
+            for university, (years, ranks) in zip(universities, series)]
+
+
+def ranking_trace(university, code, years, ranks):
+    return go.Scatter(
+        x=years,
+        y=ranks,
+        name=university,
+        legendgroup=university,
+        mode='lines',
+        line=dict(width=4, color=RANKING_COLORS[code % len(RANKING_COLORS)]),
+        hovertemplate=f'Университет={university}<br>Год=%{{x}}<br>Мировой рейтинг=%{{y}}<extra></extra>',
+    )
+
+
+def ranking_figure(selected_universities, source=None):
+    # Линейный график: Сравнение изменения мирового рейтинга для нескольких университетов по годам
+    ranking_comparison = go.Figure(ranking_traces(selected_universities, source))
+    ranking_comparison.update_layout(
+        title='Сравнение изменения мирового рейтинга для нескольких университетов по годам',
+        xaxis_title='Год',
+        yaxis_title='Мировой рейтинг',
+        legend_title_text='Университет',
+    )
+    ranking_comparison.update_yaxes(autorange='reversed')
+    return ranking_comparison
+
 
-    # Удаление строк с пропущенными значениями для выбранных университетов
-    filtered_data = filtered_data.dropna(subset=additional_columns)
+@cache.cached('university_sravnenie.build_figures')
+@compact_outputs
+def build_figures(selected_universities, selected_year, source=None):
+    filtered_data = year_rows(selected_universities, selected_year, source)
 
     # Проверка, что после фильтрации остались данные
     if filtered_data.empty:
         return {}, {}, {}, {}
 
-    # Переводим критерии на русский
-    criteria_labels = {
-        'teaching': 'Преподавание',
-        'research': 'Исследования',
-        'citations': 'Цитирования',
-        'income': 'Доход от индустрии'
-    }
-
-    additional_labels = {
-        'num_students': 'Число студентов',
-        'student_staff_ratio': 'Соотношение студентов и преподавателей',
-        'international_students': 'Процент иностранных студентов'
-    }
-
     # Гистограмма: Сравнение баллов по критериям для выбранных университетов
     criteria_comparison = px.bar(
         filtered_data, 
         x='university_name', 
-        y=['teaching', 'research', 'citations', 'income'],
+        y=CRITERIA,
         barmode='group', 
-        title=f'Сравнение баллов по критериям для выбранных университетов ({selected_year})',
+        title=CRITERIA_TITLE.format(selected_year),
         labels={'variable': 'Критерий', 'value': 'Баллы', 'university_name': 'Университет'}
     )
     
     criteria_comparison.for_each_trace(lambda t: t.update(name=criteria_labels[t.name]))
 
-    # Линейный график: Сравнение изменения мирового рейтинга для нескольких университетов по годам
-    ranking_comparison = px.line(
-        filtered_data_1, 
-        x='year', 
-        y='world_rank', 
-        color='university_name',
-        title='Сравнение изменения мирового рейтинга для нескольких университетов по годам',
-        labels={'year': 'Год', 'world_rank': 'Мировой рейтинг', 'university_name': 'Университет'}
-    )
-    ranking_comparison.update_yaxes(autorange='reversed')
-
-    ranking_comparison.update_traces(mode='lines', line=dict(width=4))
+    ranking_comparison = ranking_figure(selected_universities, source)
 
     # Столбчатый график: Сравнение численности студентов для выбранных университетов
     student_count_comparison = px.bar(
         filtered_data, 
         x='university_name', 
         y='num_students',
-        title=f'Сравнение численности студентов для выбранных университетов ({selected_year})',
+        title=STUDENTS_TITLE.format(selected_year),
         labels={'num_students': 'Число студентов', 'university_name': 'Университет'},
         text='num_students'
     )
@@ -159,9 +206,9 @@ def update_graphs(selected_universities, selected_year):
     additional_bar_comparison = px.bar(
         filtered_data, 
         x='university_name', 
-        y=['student_staff_ratio', 'international_students'],
+        y=ADDITIONAL_BARS,
         barmode='group', 
-        title=f'Сравнение соотношения студентов и преподавателей и процента иностранных студентов для выбранных университетов ({selected_year})',
+        title=ADDITIONAL_TITLE.format(selected_year),
         labels={'variable': 'Показатель', 'value': 'Значение', 'university_name': 'Университет'}
     )
 
@@ -177,5 +224,88 @@ def update_graphs(selected_universities, selected_year):
     return criteria_comparison, ranking_comparison, student_count_comparison, additional_bar_comparison
 
 
-if __name__ == '__main__':
-    app.run_server(debug=True)
+def patch_bars(filtered_data, selected_year):
+    # Частичное обновление столбчатых диаграмм: меняются только массивы x/y и заголовки с годом
+    names = filtered_data['university_name'].astype(str).tolist()
+
+    criteria_comparison = Patch()
+    for i, column in enumerate(CRITERIA):
+        criteria_comparison['data'][i]['x'] = names
+        criteria_comparison['data'][i]['y'] = pack_array(filtered_data[column].to_numpy())
+    criteria_comparison['layout']['title']['text'] = CRITERIA_TITLE.format(selected_year)
+
+    student_count_comparison = Patch()
+    student_count_comparison['data'][0]['x'] = names
+    student_count_comparison['data'][0]['y'] = pack_array(filtered_data['num_students'].to_numpy())
+    student_count_comparison['data'][0]['text'] = pack_array(filtered_data['num_students'].to_numpy())
+    student_count_comparison['layout']['title']['text'] = STUDENTS_TITLE.format(selected_year)
+
+    additional_bar_comparison = Patch()
+    for i, column in enumerate(ADDITIONAL_BARS):
+        additional_bar_comparison['data'][i]['x'] = names
+        additional_bar_comparison['data'][i]['y'] = pack_array(filtered_data[column].to_numpy())
+    additional_bar_comparison['layout']['title']['text'] = ADDITIONAL_TITLE.format(selected_year)
+
+    return criteria_comparison, student_count_comparison, additional_bar_comparison
+
+
+def patch_ranking(drawn_universities, selected_universities, source=None):
+    # Линии убранных университетов удаляются, для добавленных дописываются в конец.
+    # Возвращает изменение графика и новый порядок линий.
+    removed = [i for i, university in enumerate(drawn_universities) if university not in selected_universities]
+    added = [university for university in selected_universities if university not in drawn_universities]
+    if not removed and not added:
+        return no_update, drawn_universities
+
+    ranking_comparison = Patch()
+    for i in reversed(removed):
+        del ranking_comparison['data'][i]
+    for trace in ranking_traces(added, source):
+        ranking_comparison['data'].append(compact_trace(trace))
+    drawn = [university for university in drawn_universities if university in selected_universities] + added
+    return ranking_comparison, drawn
+
+
+@callback(
+    [Output('export-csv', 'href'),
+     Output('export-ndjson', 'href')],
+    Input('universities-dropdown', 'value'),
+    State('ranking-source', 'value')
+)
+@metrics.instrumented('university_sravnenie.update_export_links')
+def update_export_links(selected_universities, source=None):
+    params = [('source', source)] if source else []
+    params += [('university', university) for university in selected_universities or []]
+    query = urlencode(params)
+    return f'/export/csv?{query}', f'/export/ndjson?{query}'
+
+
+@callback(
+    [Output('criteria-comparison', 'figure'),
+     Output('ranking-comparison', 'figure'),
+     Output('student-count-comparison', 'figure'),
+     Output('additional-bar-comparison', 'figure'),
+     Output('comparison-state', 'data')],
+    [Input('universities-dropdown', 'value'),
+     Input('year-dropdown', 'value')],
+    [State('comparison-state', 'data'),
+     State('ranking-source', 'value')]
+)
+@metrics.instrumented('university_sravnenie.update_graphs')
+def update_graphs(selected_universities, selected_year, drawn=None, source=None):
+    selected_universities = list(selected_universities or [])
+    filtered_data = year_rows(selected_universities, selected_year, source)
+    if filtered_data.empty:
+        return {}, {}, {}, {}, None
+
+    # Первый вывод (или графики были пустыми) - рисуем все целиком
+    if not drawn:
+        return (*build_figures(selected_universities, selected_year, source),
+                {'universities': selected_universities, 'year': selected_year})
+
+    # Дальше отправляем только изменения: объем ответа зависит от изменения, а не от всего выбора
+    criteria_comparison, student_count_comparison, additional_bar_comparison = \
+        patch_bars(filtered_data, selected_year)
+    ranking_comparison, drawn_universities = patch_ranking(drawn['universities'], selected_universities, source)
+    return (criteria_comparison, ranking_comparison, student_count_comparison, additional_bar_comparison,
+            {'universities': drawn_universities, 'year': selected_year})
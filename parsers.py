@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+# Векторный разбор строковых столбцов timesData.csv.
+# В столбцах мало различных значений (ранги, проценты, соотношения повторяются),
+# поэтому каждая функция разбирает только уникальные значения строковыми операциями pandas,
+# а результат раскладывает по строкам через коды pd.factorize. Питоновского цикла по строкам нет,
+# время растет линейно с числом строк.
+
+# '1', '=45', '201-225', '201–225' (в части лет используется длинное тире)
+RANK_PATTERN = r'^\s*(?P<tied>=?)\s*(?P<lo>\d+)\s*(?:[-–]\s*(?P<hi>\d+))?\s*$'
+# '33 : 67'
+RATIO_PATTERN = r'^\s*(?P<female>\d+(?:\.\d+)?)\s*:\s*(?P<male>\d+(?:\.\d+)?)\s*$'
+
+
+def _spread(values, parse_uniques):
+    # parse_uniques получает Series уникальных строк и возвращает словарь столбцов той же длины
+    codes, uniques = pd.factorize(pd.Series(values, copy=False).astype('string'), use_na_sentinel=True)
+    parsed = parse_uniques(pd.Series(uniques, dtype='string'))
+    result = {}
+    for name, column in parsed.items():
+        column = np.asarray(column)
+        # Последний элемент - значение для пропусков (код -1)
+        missing = False if column.dtype == bool else np.nan
+        result[name] = np.append(column, missing).astype(column.dtype).take(codes)
+    return result
+
+
+def parse_rank(values):
+    # Столбец уже числовой (например, read_csv прочитал ранги с пропусками как float64): разбирать нечего
+    if pd.api.types.is_numeric_dtype(getattr(values, 'dtype', None)):
+        ranks = np.asarray(values, dtype=np.float32)
+        return pd.DataFrame({'rank_lo': ranks, 'rank_hi': ranks, 'rank_mid': ranks,
+                             'is_tied': np.zeros(len(ranks), dtype=bool)})
+
+    def parse_uniques(uniques):
+        parts = uniques.str.extract(RANK_PATTERN)
+        lo = pd.to_numeric(parts['lo'], errors='coerce').to_numpy(dtype=np.float32)
+        hi = pd.to_numeric(parts['hi'], errors='coerce').to_numpy(dtype=np.float32)
+        hi = np.where(np.isnan(hi), lo, hi)
+        return {
+            'rank_lo': lo,
+            'rank_hi': hi,
+            'rank_mid': (lo + hi) / 2,
+            'is_tied': (parts['tied'] == '=').fillna(False).to_numpy(dtype=bool),
+        }
+
+    return pd.DataFrame(_spread(values, parse_uniques))
+
+
+def parse_number(values):
+    # '20,152' -> 20152, '25%' -> 25, '-' и пустые строки -> NaN
+    if pd.api.types.is_numeric_dtype(getattr(values, 'dtype', None)):
+        return np.asarray(values, dtype=np.float32)
+
+    def parse_uniques(uniques):
+        cleaned = uniques.str.replace(r'[,%\s]', '', regex=True)
+        return {'value': pd.to_numeric(cleaned, errors='coerce').to_numpy(dtype=np.float32)}
+
+    return _spread(values, parse_uniques)['value']
+
+
+def parse_gender_ratio(values):
+    # Доли женщин и мужчин в процентах, сумма всегда 100
+    def parse_uniques(uniques):
+        parts = uniques.str.extract(RATIO_PATTERN)
+        female = pd.to_numeric(parts['female'], errors='coerce').to_numpy(dtype=np.float32)
+        male = pd.to_numeric(parts['male'], errors='coerce').to_numpy(dtype=np.float32)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            female_share = female / (female + male) * 100
+        return {'female_percentage': female_share, 'male_percentage': 100 - female_share}
+
+    return pd.DataFrame(_spread(values, parse_uniques))
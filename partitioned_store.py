@@ -0,0 +1,360 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from aggregates import INDICATORS, STATISTICS, AggregateCube
+from search import normalize
+
+# Хранилище для данных больше памяти (config.DATA_BACKEND = 'partitioned').
+# Таблица разбита на разделы по годам, каждый столбец раздела - отдельный .npy-файл, который
+# отображается в память только для чтения: в памяти процесса остаются только словари и агрегаты,
+# а страницы данных подгружает и вытесняет ОС.
+#
+#   <каталог>/manifest.json                      - текущая версия, годы, число строк, столбцы, страны
+#   <каталог>/<версия>/universities.npy          - названия университетов (utf-8) по кодам
+#   <каталог>/<версия>/name_order.npy            - коды в порядке названий (поиск кода по названию)
+#   <каталог>/<версия>/search_keys.npy, search_ids.npy - нормализованные названия для поиска по началу слов
+#   <каталог>/<версия>/cube.npz                  - куб агрегатов (см. aggregates.py)
+#   <каталог>/<версия>/year=<год>/<столбец>.npy  - столбцы раздела
+#
+# Внутри раздела строки отсортированы по коду университета: строки одного университета за год
+# находятся двоичным поиском, а запрос с годами читает только их разделы.
+# Новая версия пишется в свой каталог, manifest.json подменяется последним, поэтому читатели
+# никогда не видят наполовину записанное хранилище.
+
+FORMAT_VERSION = 1
+MANIFEST = 'manifest.json'
+ID_COLUMNS = ['university', 'country']
+
+
+def _save(path, array):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.save(f, np.ascontiguousarray(array))
+    os.replace(tmp_path, path)
+
+
+def _encode(strings):
+    return np.array([str(value).encode('utf-8') for value in strings], dtype=bytes)
+
+
+def read_version(path):
+    # Версия текущего хранилища в каталоге path или None, если хранилища нет
+    try:
+        with open(os.path.join(path, MANIFEST), encoding='utf-8') as f:
+            return json.load(f)['version']
+    except FileNotFoundError:
+        return None
+
+
+def aggregate_partitions(partitions, n_countries, indicators=INDICATORS, chunk_rows=1 << 20):
+    # Куб агрегатов по разделам блоками по chunk_rows строк: в памяти один блок одного столбца.
+    # partitions - {год: {столбец: массив}}. Процентили по блокам не складываются, в кубе их нет (NaN).
+    years = sorted(partitions)
+    stat = {name: i for i, name in enumerate(STATISTICS)}
+    # Последняя ячейка по оси стран - строки без страны, после подсчета в ней итог по всем странам
+    shape = (len(years) + 1, n_countries + 1, len(indicators))
+    counts = np.zeros(shape)
+    sums = np.zeros(shape)
+    low = np.full(shape, np.nan)
+    high = np.full(shape, np.nan)
+    rows = np.zeros(shape[:2], dtype=np.int64)
+
+    for y, year in enumerate(years):
+        columns = partitions[year]
+        size = len(columns['country'])
+        for start in range(0, size, chunk_rows):
+            stop = min(start + chunk_rows, size)
+            codes = np.asarray(columns['country'][start:stop]).astype(np.intp)
+            codes[codes < 0] = n_countries
+            rows[y] += np.bincount(codes, minlength=n_countries + 1)
+            for i, name in enumerate(indicators):
+                values = np.asarray(columns[name][start:stop], dtype=np.float64)
+                valid = ~np.isnan(values)
+                group, values = codes[valid], values[valid]
+                counts[y, :, i] += np.bincount(group, minlength=n_countries + 1)
+                sums[y, :, i] += np.bincount(group, weights=values, minlength=n_countries + 1)
+                np.fmin.at(low[y, :, i], group, values)
+                np.fmax.at(high[y, :, i], group, values)
+
+    # Итог за год по всем странам (включая строки без страны)
+    counts[:-1, -1] = counts[:-1].sum(axis=1)
+    sums[:-1, -1] = sums[:-1].sum(axis=1)
+    low[:-1, -1] = np.fmin.reduce(low[:-1], axis=1)
+    high[:-1, -1] = np.fmax.reduce(high[:-1], axis=1)
+    rows[:-1, -1] = rows[:-1].sum(axis=1)
+
+    values = np.full(shape + (len(STATISTICS),), np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        values[..., stat['mean']] = np.where(counts > 0, sums / counts, np.nan)
+    values[..., stat['count']] = counts
+    values[..., stat['min']] = low
+    values[..., stat['max']] = high
+    return values, rows
+
+
+class StoreWriter:
+    # Запись нового хранилища по разделам: add_partition для каждого года, затем finish.
+    # В памяти одновременно только один раздел.
+
+    def __init__(self, path, universities, countries, version=None):
+        self.path = path
+        self.universities = list(universities)
+        self.countries = list(countries)
+        self.version = version
+        self.partitions = {}
+        self.columns = None
+        # Временное имя каталога, пока неизвестна версия
+        self._directory = os.path.join(path, f'.build-{os.getpid()}-{time.time_ns()}')
+        os.makedirs(self._directory)
+
+    def add_partition(self, year, columns):
+        # columns: university (коды), country (коды, -1 - нет страны) и числовые столбцы одной длины
+        year = int(year)
+        order = np.argsort(columns['university'], kind='stable')
+        directory = os.path.join(self._directory, f'year={year}')
+        os.makedirs(directory, exist_ok=True)
+        for name, values in columns.items():
+            values = np.asarray(values)
+            _save(os.path.join(directory, f'{name}.npy'), values[order])
+        self.partitions[year] = len(order)
+        self.columns = {name: np.asarray(values).dtype.str for name, values in columns.items()}
+
+    def finish(self, chunk_rows=1 << 20):
+        names = _encode(self.universities)
+        _save(os.path.join(self._directory, 'universities.npy'), names)
+        _save(os.path.join(self._directory, 'name_order.npy'), np.argsort(names, kind='stable').astype(np.intp))
+        # Ключи поиска: нормализованное название и его окончания с каждого следующего слова,
+        # чтобы, как в search.NameIndex, находилось и начало любого слова
+        keys, ids = [], []
+        for code, name in enumerate(self.universities):
+            words = normalize(name).split()
+            for i in range(len(words)):
+                keys.append(' '.join(words[i:]))
+                ids.append(code)
+        keys = _encode(keys)
+        order = np.argsort(keys, kind='stable')
+        _save(os.path.join(self._directory, 'search_keys.npy'), keys[order])
+        _save(os.path.join(self._directory, 'search_ids.npy'), np.asarray(ids, dtype=np.intp)[order])
+
+        # Агрегаты считаются по уже записанным разделам, отображенным в память
+        partitions = {year: _open_partition(self._directory, year, self.columns) for year in self.partitions}
+        values, rows = aggregate_partitions(partitions, len(self.countries), chunk_rows=chunk_rows)
+        cube = AggregateCube.from_arrays(INDICATORS, sorted(self.partitions), self.countries, values, rows)
+        cube._recompute_all_years()
+        np.savez(os.path.join(self._directory, 'cube.npz'), values=cube.values, rows=cube.rows)
+
+        if self.version is None:
+            digest = hashlib.sha256(json.dumps([self.partitions, len(names), time.time_ns()]).encode())
+            self.version = digest.hexdigest()[:12]
+        directory = os.path.join(self.path, self.version)
+        if os.path.exists(directory):
+            shutil.rmtree(directory)
+        os.rename(self._directory, directory)
+
+        manifest = {
+            'format_version': FORMAT_VERSION,
+            'version': self.version,
+            'partitions': {str(year): rows for year, rows in sorted(self.partitions.items())},
+            'columns': self.columns,
+            'countries': self.countries,
+            'universities': len(names),
+        }
+        tmp_path = os.path.join(self.path, f'{MANIFEST}.{os.getpid()}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(self.path, MANIFEST))
+
+        # Прошлые версии больше не нужны: открытые хранилища уже отобразили свои файлы в память
+        for name in os.listdir(self.path):
+            if name != self.version and name != MANIFEST and os.path.isdir(os.path.join(self.path, name)) \
+                    and not name.startswith('.build-'):
+                shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+        return self.version
+
+
+def write_frame(frame, path, version=None):
+    # Хранилище из канонической таблицы в памяти (см. preprocessing.py), например из timesData.csv
+    universities = frame['university_name'].array
+    countries = frame['country'].array
+    writer = StoreWriter(path, universities.categories, countries.categories, version)
+    university_codes = np.asarray(universities.codes, dtype=np.int32)
+    country_codes = np.asarray(countries.codes, dtype=np.int16)
+    value_columns = [name for name in frame.columns if name not in ('university_name', 'country', 'year')]
+    years = frame['year'].to_numpy()
+    for year in np.unique(years):
+        mask = years == year
+        columns = {'university': university_codes[mask], 'country': country_codes[mask]}
+        columns.update({name: frame[name].to_numpy()[mask] for name in value_columns})
+        writer.add_partition(year, columns)
+    return writer.finish()
+
+
+def _open_partition(directory, year, columns):
+    partition = os.path.join(directory, f'year={year}')
+    return {name: np.load(os.path.join(partition, f'{name}.npy'), mmap_mode='r') for name in columns}
+
+
+class PartitionedStore:
+    # Открытое хранилище. Заменяет для страниц university_index (names, code), university_search (search)
+    # и university_matrix (series); строки университетов - university_frame и universities_frame.
+
+    def __init__(self, path):
+        with open(os.path.join(path, MANIFEST), encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f'Unsupported partitioned store format: {manifest.get("format_version")}')
+        self.path = path
+        self.version = manifest['version']
+        self.years = sorted(int(year) for year in manifest['partitions'])
+        self.rows = {int(year): rows for year, rows in manifest['partitions'].items()}
+        self.countries = manifest['countries']
+        self.value_columns = [name for name in manifest['columns'] if name not in ID_COLUMNS]
+        directory = os.path.join(path, self.version)
+
+        # Все разделы отображаются сразу: файлы старой версии можно удалять, пока хранилище открыто
+        self._partitions = {year: _open_partition(directory, year, manifest['columns']) for year in self.years}
+        self._names = np.load(os.path.join(directory, 'universities.npy'), mmap_mode='r')
+        self._name_order = np.load(os.path.join(directory, 'name_order.npy'), mmap_mode='r')
+        self._search_keys = np.load(os.path.join(directory, 'search_keys.npy'), mmap_mode='r')
+        self._search_ids = np.load(os.path.join(directory, 'search_ids.npy'), mmap_mode='r')
+        self._cube_path = os.path.join(directory, 'cube.npz')
+        self.names = NameList(self._names)
+
+    def __len__(self):
+        return sum(self.rows.values())
+
+    def __contains__(self, university):
+        return self.code(university) is not None
+
+    def cube(self):
+        with np.load(self._cube_path) as arrays:
+            return AggregateCube.from_arrays(INDICATORS, self.years, self.countries, arrays['values'], arrays['rows'])
+
+    def code(self, university):
+        # Код университета по названию (двоичный поиск по отсортированным названиям) или None
+        key = str(university).encode('utf-8')
+        if len(key) > self._names.dtype.itemsize:
+            return None
+        # Ключ того же типа, что массив: иначе numpy приводит к общему типу весь отображенный массив
+        key = np.array(key, dtype=self._names.dtype)
+        position = int(np.searchsorted(self._names, key, sorter=self._name_order))
+        if position < len(self._names) and self._names[self._name_order[position]] == key:
+            return int(self._name_order[position])
+        return None
+
+    def search(self, query, limit=20):
+        # Поиск по началу названия или любого его слова (без нечетких совпадений)
+        query = normalize(query or '')
+        if not query:
+            return self.names[:limit]
+        key = query.encode('utf-8')
+        if len(key) > self._search_keys.dtype.itemsize:
+            return []
+        # Граница диапазона - ключ с увеличенным последним байтом (в utf-8 байта 0xff не бывает)
+        upper = key[:-1] + bytes([key[-1] + 1])
+        start = int(np.searchsorted(self._search_keys, np.array(key, dtype=self._search_keys.dtype), side='left'))
+        stop = int(np.searchsorted(self._search_keys, np.array(upper, dtype=self._search_keys.dtype), side='left'))
+        # У одного университета может совпасть несколько слов - берем с запасом и убираем повторы
+        codes = dict.fromkeys(self._search_ids[start:min(stop, start + 4 * limit)].tolist())
+        return [self.names[code] for code in list(codes)[:limit]]
+
+    def _years(self, years):
+        # Отсечение разделов: читаются только разделы запрошенных годов
+        if years is None:
+            return self.years
+        return [int(year) for year in years if int(year) in self._partitions]
+
+    def _frame(self, pieces, columns=None):
+        # pieces - (год, номера строк раздела); результат - таблица в формате канонического датасета
+        columns = self.value_columns if columns is None else columns
+        parts = {'university_name': [], 'country': [], 'year': []}
+        parts.update({name: [] for name in columns})
+        for year, rows in pieces:
+            partition = self._partitions[year]
+            parts['university_name'].append(self.names.take(partition['university'][rows]))
+            country = np.asarray(partition['country'][rows])
+            parts['country'].append(np.array(self.countries + [None], dtype=object)[country])
+            parts['year'].append(np.full(len(country), year, dtype=np.int16))
+            for name in columns:
+                parts[name].append(np.asarray(partition[name][rows]))
+        if not pieces:
+            return pd.DataFrame({name: [] for name in parts})
+        return pd.DataFrame({name: np.concatenate(values) for name, values in parts.items()})
+
+    def _ranges(self, year, codes):
+        universities = self._partitions[year]['university']
+        codes = np.asarray(codes, dtype=universities.dtype)
+        return (np.searchsorted(universities, codes, side='left'),
+                np.searchsorted(universities, codes, side='right'))
+
+    def university_frame(self, university, years=None):
+        # Строки одного университета по годам (по возрастанию)
+        code = self.code(university)
+        pieces = []
+        if code is not None:
+            for year in self._years(years):
+                starts, stops = self._ranges(year, [code])
+                if starts[0] < stops[0]:
+                    pieces.append((year, slice(int(starts[0]), int(stops[0]))))
+        return self._frame(pieces)
+
+    def universities_frame(self, universities, year=None):
+        # Строки нескольких университетов (в порядке выбора); при year - только раздел этого года
+        codes = np.array([code for code in map(self.code, universities) if code is not None], dtype=np.int64)
+        pieces = []
+        for partition_year in self._years(None if year is None else [year]):
+            starts, stops = self._ranges(partition_year, codes)
+            rows = [np.arange(start, stop) for start, stop in zip(starts, stops) if start < stop]
+            if rows:
+                pieces.append((partition_year, np.concatenate(rows)))
+        frame = self._frame(pieces)
+        if year is None and len(frame):
+            # Как у UniversityIndex.rows: университеты в порядке выбора, внутри - по годам
+            position = {university: i for i, university in enumerate(universities)}
+            frame = frame.iloc[np.lexsort((frame['year'], frame['university_name'].map(position)))]
+        return frame.reset_index(drop=True)
+
+    def series(self, indicator, universities):
+        # Как UniversityYearMatrix.series: для каждого университета годы и значения показателя
+        codes = [self.code(university) for university in universities]
+        known = np.array([code for code in codes if code is not None], dtype=np.int64)
+        found = {code: ([], []) for code in known.tolist()}
+        for year in self.years:
+            starts, stops = self._ranges(year, known)
+            column = self._partitions[year][indicator]
+            for code, start, stop in zip(known.tolist(), starts, stops):
+                if start < stop:
+                    found[code][0].append(year)
+                    found[code][1].append(column[start])
+        result = []
+        for code in codes:
+            years, values = found.get(code, ([], []))
+            result.append((np.array(years, dtype=np.int16), np.array(values, dtype=np.float32)))
+        return result
+
+
+class NameList:
+    # Названия университетов по кодам поверх отображенного массива: без списка строк в памяти
+
+    def __init__(self, names):
+        self._names = names
+
+    def __len__(self):
+        return len(self._names)
+
+    def __getitem__(self, code):
+        if isinstance(code, slice):
+            return [value.decode('utf-8') for value in self._names[code]]
+        return self._names[code].decode('utf-8')
+
+    def __iter__(self):
+        return (self[code] for code in range(len(self)))
+
+    def take(self, codes):
+        return np.array([value.decode('utf-8') for value in self._names[np.asarray(codes)]], dtype=object)
@@ -0,0 +1,81 @@
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from parsers import parse_gender_ratio, parse_number, parse_rank
+
+logger = logging.getLogger(__name__)
+
+# Баллы по критериям THE: 0-100, пропуск ('-' в исходнике) -> NaN
+SCORE_COLUMNS = ['teaching', 'international', 'research', 'citations', 'income', 'total_score']
+# Дополнительные числовые показатели (запятые-разделители тысяч и '%' удаляются)
+ADDITIONAL_COLUMNS = ['num_students', 'student_staff_ratio', 'international_students']
+CATEGORY_COLUMNS = ['university_name', 'country']
+
+
+def _freeze(columns):
+    # Собираем таблицу без копирования и запрещаем запись в буферы столбцов:
+    # страницы должны только читать общий датасет, а не менять его под себя
+    for values in columns.values():
+        array = values.codes if isinstance(values, pd.Categorical) else values
+        array.flags.writeable = False
+    return pd.DataFrame(columns, copy=False)
+
+
+class Dataset:
+    # Канонический датасет: строится один раз из сырой таблицы и дальше только читается.
+    #   frame         - компактно типизированная таблица
+    #   version       - версия исходных данных (см. data.version)
+    #   build_seconds - время предобработки
+
+    def __init__(self, frame, version, build_seconds):
+        self.frame = frame
+        self.version = version
+        self.build_seconds = build_seconds
+
+    @property
+    def memory_bytes(self):
+        return int(self.frame.memory_usage(index=True, deep=True).sum())
+
+    def report(self):
+        return {
+            'version': self.version,
+            'rows': len(self.frame),
+            'memory_bytes': self.memory_bytes,
+            'build_seconds': self.build_seconds,
+        }
+
+
+def build_dataset(raw, version=None):
+    started = time.perf_counter()
+
+    columns = {}
+    for name in CATEGORY_COLUMNS:
+        # Порядок категорий - порядок первого появления, как у unique()
+        columns[name] = pd.Categorical(raw[name], categories=pd.unique(raw[name].dropna()))
+    columns['year'] = raw['year'].to_numpy(dtype=np.int16)
+    # Диапазоны '201-225' и ничьи '=45' не теряются: world_rank - середина диапазона
+    ranks = parse_rank(raw['world_rank'])
+    columns['world_rank'] = ranks['rank_mid'].to_numpy()
+    for name in ['rank_lo', 'rank_hi', 'is_tied']:
+        columns[name] = ranks[name].to_numpy()
+    # Все, что не удалось разобрать как число, становится NaN. Нулями пропуски не заполняем:
+    # иначе они занижают средние значения на графиках.
+    for name in SCORE_COLUMNS + ADDITIONAL_COLUMNS:
+        columns[name] = parse_number(raw[name])
+    genders = parse_gender_ratio(raw['female_male_ratio'])
+    columns['female_percentage'] = genders['female_percentage'].to_numpy()
+    columns['male_percentage'] = genders['male_percentage'].to_numpy()
+
+    # Строки одного университета лежат подряд и упорядочены по годам (см. university_index.py)
+    order = np.lexsort((columns['year'], columns['university_name'].codes))
+    if not (order[1:] > order[:-1]).all():
+        columns = {name: values.take(order) for name, values in columns.items()}
+
+    frame = _freeze(columns)
+    dataset = Dataset(frame, version, time.perf_counter() - started)
+    logger.info('Dataset %s built: %d rows, %.1f KiB, %.1f ms', version, len(frame),
+                dataset.memory_bytes / 1024, dataset.build_seconds * 1000)
+    return dataset
@@ -0,0 +1,91 @@
+import numpy as np
+
+# Индекс рейтингов: для каждого (год, показатель) номера строк, отсортированные от лучшего к худшему,
+# и таблица процентилей каждой строки внутри своего года. Строится один раз при загрузке датасета,
+# поэтому топ-N - срез готового массива за O(N), а процентиль строки - чтение одного элемента.
+
+# Показатель -> True, если лучше меньшее значение (место в рейтинге, студентов на преподавателя)
+RANKED_INDICATORS = {
+    'world_rank': True,
+    'total_score': False,
+    'teaching': False,
+    'international': False,
+    'research': False,
+    'citations': False,
+    'income': False,
+    'num_students': False,
+    'student_staff_ratio': True,
+    'international_students': False,
+}
+
+EMPTY = np.empty(0, dtype=np.int32)
+
+
+class RankingIndex:
+
+    def __init__(self, frame, indicators=RANKED_INDICATORS):
+        self.indicators = dict(indicators)
+        years = frame['year'].to_numpy()
+        self.years = np.unique(years).tolist()
+        # Строки, сгруппированные по годам: [starts[i], stops[i]) в by_year - строки года years[i]
+        by_year = np.argsort(years, kind='stable')
+        starts = np.searchsorted(years[by_year], self.years, side='left')
+        stops = np.searchsorted(years[by_year], self.years, side='right')
+
+        self._order = {}
+        # Процентиль (0 - худший, 100 - лучший за год) и место (0 - лучший, равные значения делят лучшее из
+        # своих мест) каждой строки; NaN/-1 - нет значения
+        self.percentiles = {}
+        self.positions = {}
+        for indicator, lower_is_better in self.indicators.items():
+            values = frame[indicator].to_numpy()
+            percentiles = np.full(len(values), np.nan, dtype=np.float32)
+            positions = np.full(len(values), -1, dtype=np.int32)
+            for year, start, stop in zip(self.years, starts, stops):
+                rows = by_year[start:stop]
+                year_values = values[rows]
+                valid = ~np.isnan(year_values)
+                rows = rows[valid]
+                # Ключ сортировки: чем меньше, тем лучше
+                key = year_values[valid] if lower_is_better else -year_values[valid]
+                # Устойчивая сортировка: при равных значениях порядок строк не зависит от запуска
+                order = np.argsort(key, kind='stable')
+                ranked = rows[order].astype(np.int32)
+                self._order[(year, indicator)] = ranked
+
+                # Группы равных значений идут в отсортированном ключе подряд - один линейный проход.
+                sorted_key = key[order]
+                count = len(sorted_key)
+                if count == 0:
+                    continue
+                new_group = np.empty(count, dtype=bool)
+                new_group[0] = True
+                np.not_equal(sorted_key[1:], sorted_key[:-1], out=new_group[1:])
+                group = np.cumsum(new_group) - 1
+                group_starts = np.flatnonzero(new_group)
+                group_stops = np.append(group_starts[1:], count)
+                # Место - число лучших за год, поэтому у равных оно одно и не зависит от порядка строк
+                positions[ranked] = group_starts[group]
+
+                # Доля университетов года, которые хуже этого; равные делят место пополам.
+                worse = count - group_stops[group]
+                ties = group_stops[group] - group_starts[group]
+                if count > 1:
+                    percentiles[ranked] = 100 * (worse + 0.5 * (ties - 1)) / (count - 1)
+                else:
+                    percentiles[ranked] = 100
+            self.percentiles[indicator] = percentiles
+            self.positions[indicator] = positions
+
+    def top(self, indicator, year, n=20):
+        # Номера строк n лучших по показателю за год (строки без значения не участвуют)
+        return self._order.get((int(year), indicator), EMPTY)[:n]
+
+    def count(self, indicator, year):
+        return len(self._order.get((int(year), indicator), EMPTY))
+
+    def percentile(self, row, indicator):
+        return float(self.percentiles[indicator][row])
+
+    def position(self, row, indicator):
+        return int(self.positions[indicator][row])
@@ -0,0 +1,114 @@
+import logging
+import os
+import threading
+import time
+
+import config
+import data
+import sources
+from figure_cache import cache
+from page_registry import registry
+
+logger = logging.getLogger(__name__)
+
+# Горячая перезагрузка датасета без перезапуска приложения.
+# Новая версия (снимок, общий файл, агрегаты, индексы) собирается в фоновом потоке, пока запросы
+# обслуживает старая; затем состояние подменяется атомарно (data.reload), из кэша фигур уходят
+# записи старой версии, открытые страницы пересобираются с новыми списками университетов и годов.
+# Запуск: поток-наблюдатель за исходными CSV всех источников (RELOAD_INTERVAL) или POST /admin/reload.
+# Перезагружаются только загруженные источники, остальные прочитают новую версию при первом обращении.
+# Наблюдатель запускается в каждом рабочем процессе gunicorn. Новую версию собирает и публикует в общий файл
+# первый заметивший ее процесс, остальные ждут его и подключаются к файлу (см. data.load_state).
+# Процесс, созданный fork из главного (preload_app), мог получить версию старше файла на диске:
+# наблюдатель сразу при старте сверяет загруженные версии с диском.
+
+
+class Reloader:
+
+    def __init__(self, source_paths=None, interval=config.RELOAD_INTERVAL):
+        # Для хранилища на диске новая версия появляется вместе с новым manifest.json
+        if source_paths is None:
+            source_paths = [source.watch_path() for source in sources.enabled()]
+        self.source_paths = list(source_paths)
+        self.interval = interval
+        self.status = {'running': False, 'version': None, 'versions': None, 'reloaded': None, 'seconds': None,
+                       'error': None}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._watcher = None
+
+    def reload(self):
+        # Синхронная перезагрузка; True - подменена новая версия датасета
+        with self._lock:
+            if self.status['running']:
+                return False
+            self.status['running'] = True
+        start = time.perf_counter()
+        try:
+            states = data.reload()
+            if states:
+                cache.retain_versions(data.loaded().values())
+                registry.reload()
+                # Ответы старой версии, досчитанные во время пересборки
+                cache.retain_versions(data.loaded().values())
+            seconds = time.perf_counter() - start
+            self.status.update(version=data.current().version, versions=data.loaded(), reloaded=bool(states),
+                               seconds=seconds, error=None)
+            for state in states:
+                logger.info('Ranking source %s reloaded: version %s in %.1f ms', state.source, state.version,
+                            seconds * 1000)
+            return bool(states)
+        except Exception as error:
+            logger.exception('Dataset reload failed, keeping the current version')
+            self.status['error'] = repr(error)
+            return False
+        finally:
+            self.status['running'] = False
+
+    def start(self):
+        # Перезагрузка в фоне (для админского запроса); False - перезагрузка уже идет
+        with self._lock:
+            if self.status['running'] or (self._thread is not None and self._thread.is_alive()):
+                return False
+            self._thread = threading.Thread(target=self.reload, name='dataset-reload', daemon=True)
+            self._thread.start()
+            return True
+
+    def _fingerprint(self):
+        return [data.file_fingerprint(path) if os.path.exists(path) else None for path in self.source_paths]
+
+    def stale(self):
+        # Есть загруженный источник, версия которого отстала от данных на диске
+        return any(data.latest_version(name) != version for name, version in data.loaded().items())
+
+    def _watch(self):
+        seen = self._fingerprint()
+        if self.stale():
+            self.reload()
+            if self.status['error'] is not None:
+                # Повторим на следующей проверке
+                seen = None
+        if self.interval <= 0:
+            return
+        while True:
+            time.sleep(self.interval)
+            fingerprint = self._fingerprint()
+            if fingerprint != seen and not self.status['running']:
+                # Файл могут еще дописывать: перезагружаемся, когда он перестал меняться между проверками
+                time.sleep(min(self.interval, 1))
+                if self._fingerprint() != fingerprint:
+                    continue
+                self.reload()
+                if self.status['error'] is None:
+                    seen = fingerprint
+
+    def start_watcher(self):
+        # При interval <= 0 поток только сверяет версии при старте и завершается
+        if self._watcher is not None:
+            return None
+        self._watcher = threading.Thread(target=self._watch, name='dataset-watcher', daemon=True)
+        self._watcher.start()
+        return self._watcher
+
+
+reloader = Reloader()
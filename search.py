@@ -0,0 +1,91 @@
+import bisect
+import unicodedata
+
+import numpy as np
+
+# Поиск университетов по мере ввода (на стороне сервера).
+# Сначала ищем по префиксу: начало полного названия, начало любого слова названия, страна.
+# Если совпадений меньше limit, добавляем нечеткие совпадения по триграммам.
+
+FULL_NAME, WORD, COUNTRY = 0, 1, 2
+
+
+def normalize(text):
+    # Без регистра, диакритики и лишних пробелов: 'Universität  Wien' -> 'universitat wien'
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.casefold().split())
+
+
+def trigrams(text):
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex:
+
+    def __init__(self, names, countries=None):
+        self.names = list(names)
+        countries = list(countries) if countries is not None else [None] * len(self.names)
+
+        # Отдельный отсортированный список токенов для каждого вида префиксного совпадения
+        tokens = {FULL_NAME: [], WORD: [], COUNTRY: []}
+        postings = {}
+        for i, (name, country) in enumerate(zip(self.names, countries)):
+            normalized = normalize(name)
+            tokens[FULL_NAME].append((normalized, i))
+            tokens[WORD].extend((word, i) for word in normalized.split()[1:])
+            if isinstance(country, str):
+                tokens[COUNTRY].append((normalize(country), i))
+            for gram in trigrams(normalized):
+                postings.setdefault(gram, []).append(i)
+
+        self._tokens = {}
+        for kind, pairs in tokens.items():
+            pairs.sort()
+            self._tokens[kind] = ([token for token, _ in pairs], [i for _, i in pairs])
+        self._postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def __len__(self):
+        return len(self.names)
+
+    def _prefix(self, kind, query, limit):
+        keys, ids = self._tokens[kind]
+        start = bisect.bisect_left(keys, query)
+        stop = bisect.bisect_left(keys, query + '\uffff', lo=start)
+        return ids[start:min(stop, start + limit)]
+
+    def _fuzzy(self, query, limit, exclude):
+        grams = [self._postings[gram] for gram in trigrams(query) if gram in self._postings]
+        if not grams:
+            return []
+        counts = np.bincount(np.concatenate(grams), minlength=len(self.names))
+        # Нужно совпадение хотя бы половины триграмм запроса
+        threshold = max(1, len(trigrams(query)) // 2)
+        candidates = np.flatnonzero(counts >= threshold)
+        if len(candidates) > limit + len(exclude):
+            top = np.argpartition(-counts[candidates], limit + len(exclude) - 1)[:limit + len(exclude)]
+            candidates = candidates[top]
+        candidates = candidates[np.argsort(-counts[candidates], kind='stable')]
+        return [i for i in candidates.tolist() if i not in exclude][:limit]
+
+    def search_ids(self, query, limit=20):
+        query = normalize(query or '')
+        if not query:
+            return list(range(min(limit, len(self.names))))
+
+        found = []
+        seen = set()
+        for kind in (FULL_NAME, WORD, COUNTRY):
+            for i in self._prefix(kind, query, limit):
+                if i not in seen:
+                    seen.add(i)
+                    found.append(i)
+            if len(found) >= limit:
+                return found[:limit]
+        if len(query) >= 3:
+            found.extend(self._fuzzy(query, limit - len(found), seen))
+        return found
+
+    def search(self, query, limit=20):
+        return [self.names[i] for i in self.search_ids(query, limit)]
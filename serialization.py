@@ -0,0 +1,144 @@
+import base64
+import functools
+
+import numpy as np
+import plotly.io as pio
+from plotly.basedatatypes import BaseFigure, BaseTraceType
+
+import config
+from metrics import phase
+
+# Компактная сериализация фигур, которые возвращают колбэки:
+#   - числовые массивы передаются как base64 типизированные массивы ({'dtype', 'bdata'}),
+#     дробные значения округляются до FIGURE_PRECISION знаков и сжимаются до float32,
+#     целые - до наименьшего подходящего целого типа;
+#   - из шаблона оформления остаются только настройки тех типов трасс, что есть на графике;
+#   - у карт подсказка берет название страны из locations вместо отдельного массива hovertext.
+# JSON кодирует быстрый движок (orjson), если он установлен.
+
+if config.FIGURE_JSON_ENGINE != 'auto':
+    pio.json.config.default_engine = config.FIGURE_JSON_ENGINE
+
+INTEGER_TYPES = [np.int8, np.int16, np.int32]
+
+
+def _decode(value):
+    # np.ndarray, base64-словарь plotly или список чисел -> np.ndarray; иначе None
+    if isinstance(value, np.ndarray):
+        return value if value.dtype.kind in 'biuf' else None
+    if isinstance(value, dict) and 'bdata' in value and 'dtype' in value:
+        array = np.frombuffer(base64.b64decode(value['bdata']), dtype=np.dtype(value['dtype']))
+        return array.reshape(value['shape']) if 'shape' in value else array
+    if isinstance(value, (list, tuple)) and value and \
+            all(isinstance(item, (int, float)) and not isinstance(item, bool) for item in value):
+        return np.asarray(value)
+    return None
+
+
+def pack_array(array, precision=config.FIGURE_PRECISION):
+    if array.dtype.kind == 'f':
+        array = np.round(array.astype(np.float64), precision).astype(np.float32)
+    elif array.dtype.kind in 'iu' and array.size:
+        low, high = array.min(), array.max()
+        for dtype in INTEGER_TYPES:
+            if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+                array = array.astype(dtype)
+                break
+    elif array.dtype.kind == 'b':
+        array = array.astype(np.uint8)
+    array = np.ascontiguousarray(array)
+    packed = {'dtype': array.dtype.str.lstrip('<|='), 'bdata': base64.b64encode(array.tobytes()).decode('ascii')}
+    if array.ndim > 1:
+        packed['shape'] = ','.join(str(size) for size in array.shape)
+    return packed
+
+
+def _compact_value(value, precision):
+    array = _decode(value)
+    if array is not None:
+        return pack_array(array, precision)
+    if isinstance(value, dict):
+        return {key: _compact_value(item, precision) for key, item in value.items()}
+    return value
+
+
+def compact_trace(trace, precision=config.FIGURE_PRECISION):
+    trace = trace.to_plotly_json() if isinstance(trace, BaseTraceType) else trace
+    trace = {key: _compact_value(value, precision) for key, value in trace.items()}
+    hovertext, locations = trace.get('hovertext'), trace.get('locations')
+    if hovertext is not None and locations is not None and list(hovertext) == list(locations):
+        # Подсказка дублирует названия стран - берем их из locations
+        del trace['hovertext']
+        if 'hovertemplate' in trace:
+            trace['hovertemplate'] = trace['hovertemplate'].replace('%{hovertext}', '%{location}')
+    return trace
+
+
+def _compact_layout(layout, trace_types):
+    template = layout.get('template')
+    if isinstance(template, dict) and isinstance(template.get('data'), dict):
+        data = {key: value for key, value in template['data'].items() if key in trace_types}
+        layout = dict(layout, template=dict(template, data=data))
+    return layout
+
+
+def compact_figure(figure, precision=config.FIGURE_PRECISION):
+    figure = figure.to_plotly_json() if isinstance(figure, BaseFigure) else figure
+    if not isinstance(figure, dict) or 'data' not in figure:
+        return figure
+    data = [compact_trace(trace, precision) for trace in figure['data']]
+    trace_types = {trace.get('type', 'scatter') for trace in data}
+    return dict(figure, data=data, layout=_compact_layout(figure.get('layout', {}), trace_types))
+
+
+def _json_size(value):
+    if isinstance(value, str):
+        return len(value) + 2
+    if isinstance(value, dict):
+        return 2 + sum(len(str(key)) + 4 + _json_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return 2 + sum(_json_size(item) + 1 for item in value)
+    if isinstance(value, np.ndarray):
+        return value.size * (8 if value.dtype.kind in 'biuf' else 16)
+    if hasattr(value, 'to_plotly_json'):
+        # Фигуры plotly и компоненты Dash
+        return estimated_size(value.to_plotly_json())
+    return len(str(value))
+
+
+# Размер шаблона оформления по типам трасс: после _compact_layout он зависит только от них
+_template_sizes = {}
+
+
+def estimated_size(value):
+    # Примерная длина JSON ответа без кодирования (для предела кэша фигур). У компактной фигуры
+    # обходятся трассы, где массивы уже строки base64, и layout без шаблона; размер шаблона запоминается
+    if isinstance(value, tuple):
+        return 2 + sum(estimated_size(item) + 1 for item in value)
+    if isinstance(value, BaseFigure):
+        value = compact_figure(value)
+    if not (isinstance(value, dict) and isinstance(value.get('data'), list) and isinstance(value.get('layout'), dict)):
+        return _json_size(value)
+    layout = dict(value['layout'])
+    template = layout.pop('template', None)
+    size = 30 + sum(_json_size(trace) + 1 for trace in value['data']) + _json_size(layout)
+    if template is not None:
+        key = (pio.templates.default, tuple(sorted({trace.get('type', 'scatter') for trace in value['data']})))
+        if key not in _template_sizes:
+            _template_sizes[key] = _json_size(template)
+        size += _template_sizes[key]
+    return size
+
+
+def compact_outputs(func):
+    # Декоратор колбэка: графики в ответе заменяются компактными словарями,
+    # остальные значения (строки, Patch, no_update) возвращаются как есть
+    @functools.wraps(func)
+    def wrapper(*args):
+        result = func(*args)
+        with phase('serialize'):
+            if isinstance(result, tuple):
+                return tuple(compact_figure(value) if isinstance(value, BaseFigure) else value for value in result)
+            return compact_figure(result) if isinstance(result, BaseFigure) else result
+
+    return wrapper
@@ -0,0 +1,115 @@
+import contextlib
+import glob
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+import binary_format
+from aggregates import AggregateCube
+from preprocessing import Dataset
+
+# Общий для всех процессов датасет в файле, который отображается в память (mmap).
+# Туда один раз публикуются очищенные столбцы канонической таблицы (строковые - коды категорий
+# и словарь), а также массивы куба агрегатов. Процессы подключаются к файлу только для чтения:
+# столбцы становятся представлениями NumPy поверх отображения, без копирования. Страницы с данными
+# принадлежат страничному кэшу ОС и общие для всех рабочих процессов, сколько бы их ни было.
+# Для хранения в памяти, а не на диске, каталог можно указать в /dev/shm (UNIVERSITY_SHARED_STORE_DIR).
+#
+# Формат - binary_format.py с MAGIC = UNIVSHM1, массивы описаны в заголовке в словаре arrays.
+# Файл свой у каждого источника рейтингов и версии: <источник>-v<FORMAT_VERSION>-<версия датасета>.shm.
+# Версия формата меняется вместе со схемой заголовка и массивов, а также с переводом таблиц источников
+# в столбцы timesData.csv (sources.Source.prepare): файлы прежней схемы не подключаются.
+MAGIC = b'UNIVSHM1'
+FORMAT_VERSION = 3
+
+
+@contextlib.contextmanager
+def publish_lock(directory, name):
+    # Межпроцессная блокировка сборки и публикации: новую версию собирает один процесс, остальные ждут
+    # и подключаются к опубликованному файлу. Без fcntl (Windows) каждый процесс собирает сам
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f'{name}.lock'), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def store_path(directory, source, version):
+    return os.path.join(directory, f'{source}-v{FORMAT_VERSION}-{version}.shm')
+
+
+def write_store(path, header, arrays):
+    header = dict(header, arrays={name: {'shape': list(array.shape)} for name, array in arrays.items()})
+    binary_format.write(path, MAGIC, header, [(header['arrays'][name], array) for name, array in arrays.items()])
+
+
+def open_store(path):
+    # Заголовок и словарь массивов-представлений (только чтение) поверх отображенного файла
+    buffer = np.memmap(path, mode='r')
+    header = binary_format.header_from_buffer(buffer, MAGIC, path)
+    if header.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f'Unsupported shared store format version: {header.get("format_version")}')
+    arrays = {name: binary_format.array(buffer, meta, meta['shape']) for name, meta in header['arrays'].items()}
+    return header, arrays
+
+
+def publish(dataset, cube, path, source):
+    frame = dataset.frame
+    columns = []
+    arrays = {}
+    for name in frame.columns:
+        values = frame[name].array
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            columns.append({'name': name, 'categories': [str(category) for category in values.categories]})
+            arrays[f'column:{name}'] = np.asarray(values.codes)
+        else:
+            columns.append({'name': name})
+            arrays[f'column:{name}'] = frame[name].to_numpy()
+    arrays['cube:values'] = cube.values
+    arrays['cube:rows'] = cube.rows
+    header = {
+        'format_version': FORMAT_VERSION,
+        'source': source,
+        'version': dataset.version,
+        'rows': len(frame),
+        'columns': columns,
+        'cube': {'indicators': cube.indicators, 'years': cube.years, 'countries': [str(c) for c in cube.countries]},
+    }
+    write_store(path, header, arrays)
+
+    # Файлы прошлых версий этого источника больше не нужны; процессы, которые еще их отображают, продолжат
+    # работать. Файлы других источников не трогаем
+    for old_path in glob.glob(os.path.join(os.path.dirname(path) or '.', f'{glob.escape(source)}-v*-*.shm')):
+        if os.path.abspath(old_path) != os.path.abspath(path):
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+
+
+def attach(path):
+    # Датасет и куб поверх общего файла: ничего не копируется и не пересчитывается
+    started = time.perf_counter()
+    header, arrays = open_store(path)
+    columns = {}
+    for meta in header['columns']:
+        values = arrays['column:' + meta['name']]
+        if 'categories' in meta:
+            values = pd.Categorical.from_codes(values, categories=pd.Index(meta['categories']), validate=False)
+        columns[meta['name']] = values
+    frame = pd.DataFrame(columns, copy=False)
+    cube = AggregateCube.from_arrays(header['cube']['indicators'], header['cube']['years'],
+                                     header['cube']['countries'], arrays['cube:values'], arrays['cube:rows'])
+    return Dataset(frame, header['version'], time.perf_counter() - started), cube
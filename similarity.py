@@ -0,0 +1,66 @@
+import warnings
+
+import numpy as np
+
+# Поиск похожих университетов: ближайшие соседи по профилю показателей внутри одного года.
+# Для каждого года заранее строится матрица признаков (строки года x показатели), нормированная
+# по году (z-оценки); пропуск показателя считается средним значением за год. Запрос - одно
+# матрично-векторное произведение по строкам года и argpartition, без перебора в Python.
+
+FEATURES = ['teaching', 'research', 'citations', 'income', 'international', 'student_staff_ratio']
+
+
+class SimilarityIndex:
+
+    def __init__(self, frame, features=FEATURES):
+        self.features = list(features)
+        years = frame['year'].to_numpy()
+        self.years = np.unique(years).tolist()
+        by_year = np.argsort(years, kind='stable')
+        starts = np.searchsorted(years[by_year], self.years, side='left')
+        stops = np.searchsorted(years[by_year], self.years, side='right')
+        values = np.column_stack([frame[name].to_numpy(dtype=np.float32) for name in self.features])
+
+        self._years = years
+        self._rows = {}
+        self._matrix = {}
+        self._norms = {}
+        # Номер строки таблицы -> номер строки в матрице ее года
+        self._position = np.full(len(frame), -1, dtype=np.int64)
+        for year, start, stop in zip(self.years, starts, stops):
+            rows = by_year[start:stop]
+            year_values = values[rows]
+            with warnings.catch_warnings():
+                # Показатель, которого нет ни у кого за год, дает NaN и ниже превращается в 0
+                warnings.simplefilter('ignore', RuntimeWarning)
+                mean = np.nanmean(year_values, axis=0)
+                std = np.nanstd(year_values, axis=0)
+            std[~(std > 0)] = 1
+            matrix = (year_values - mean) / std
+            # Строки, где известно меньше половины показателей, в соседи не попадают
+            known = (~np.isnan(matrix)).sum(axis=1) * 2 >= len(self.features)
+            matrix[np.isnan(matrix)] = 0
+            self._rows[year] = rows
+            self._matrix[year] = np.ascontiguousarray(matrix, dtype=np.float32)
+            norms = np.einsum('ij,ij->i', matrix, matrix).astype(np.float32)
+            norms[~known] = np.inf
+            self._norms[year] = norms
+            self._position[rows] = np.arange(len(rows))
+
+    def similar(self, row, k=10):
+        # Номера строк k ближайших университетов за тот же год и евклидовы расстояния до них
+        year = int(self._years[row])
+        matrix, norms, rows = self._matrix[year], self._norms[year], self._rows[year]
+        position = self._position[row]
+        if not np.isfinite(norms[position]):
+            return rows[:0], np.empty(0, dtype=np.float32)
+        query = matrix[position]
+        # |a - q|^2 = |a|^2 - 2 a.q + |q|^2
+        distances = norms - 2 * (matrix @ query) + norms[position]
+        distances[position] = np.inf
+        k = min(k, int(np.isfinite(distances).sum()))
+        if k == 0:
+            return rows[:0], np.empty(0, dtype=np.float32)
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest], kind='stable')]
+        return rows[nearest], np.sqrt(np.maximum(distances[nearest], 0))
@@ -0,0 +1,107 @@
+import logging
+import os
+import pathlib
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Источники рейтингов. Датасет Kaggle (см. README) кроме рейтинга Times Higher Education содержит
+# рейтинги CWUR и Шанхайский (ARWU). Столбцы каждого источника переименовываются в столбцы timesData.csv,
+# дальше снимок, предобработка, общий файл и индексы у всех источников одинаковые.
+# Показателей, которых у источника нет, в таблице нет и на графиках: столбцы остаются пустыми (NaN).
+# Из столбцов источника берутся только переименованные и перечисленные в keep: одноименный столбец
+# может означать другое (citations в CWUR - место по цитированию, а не балл).
+#   CWUR: общий балл. Остальные показатели CWUR - места, а не баллы, поэтому в критерии они не попадают.
+#   Шанхайский рейтинг: alumni ('качество образования') -> teaching, pub ('научный результат') -> research,
+#   hici (часто цитируемые ученые) -> citations. Страны в этой таблице нет.
+# Маленькие таблицы в том же формате лежат в fixtures/ и подменяют скачивание при UNIVERSITY_FIXTURES=1.
+
+# Столбцы timesData.csv, которые читает preprocessing.build_dataset
+RAW_COLUMNS = ['world_rank', 'university_name', 'country', 'teaching', 'international', 'research', 'citations',
+               'income', 'total_score', 'num_students', 'student_staff_ratio', 'international_students',
+               'female_male_ratio', 'year']
+
+FIXTURES_DIR = os.path.join(config.BASE_DIR, 'fixtures')
+
+
+class Source:
+
+    def __init__(self, name, label, filename, columns=None, keep=None, url=None, source_csv=None,
+                 snapshot_path=None, partitioned_dir=None):
+        self.name = name
+        self.label = label
+        self.filename = filename
+        self.columns = dict(columns or {})
+        # Столбцы источника, которые уже названы и понимаются как в timesData.csv (None - все)
+        self.keep = None if keep is None else list(keep)
+        stem = os.path.splitext(filename)[0]
+        self.source_csv = source_csv or os.path.join(config.DATA_DIR, filename)
+        self.snapshot_path = snapshot_path or os.path.join(config.DATA_DIR, stem + '.snap')
+        self.partitioned_dir = partitioned_dir or os.path.join(config.DATA_DIR, 'partitioned-' + name)
+        if config.FIXTURES:
+            self.url = pathlib.Path(FIXTURES_DIR, filename).as_uri()
+        else:
+            self.url = url or f'{config.SOURCE_BASE_URL}/{filename}'
+
+    def prepare(self, raw):
+        # Сырая таблица источника -> столбцы timesData.csv
+        if self.keep is not None:
+            raw = raw[[column for column in raw.columns if column in self.columns or column in self.keep]]
+        return raw.rename(columns=self.columns).reindex(columns=RAW_COLUMNS)
+
+    def watch_path(self):
+        # Файл, по изменению которого видна новая версия источника (см. reloader.py)
+        if config.DATA_BACKEND == 'partitioned':
+            return os.path.join(self.partitioned_dir, 'manifest.json')
+        return self.source_csv
+
+
+SOURCES = {
+    # Пути и адрес основного источника задаются прежними настройками
+    'times': Source('times', 'Times Higher Education', 'timesData.csv', url=config.SOURCE_URL,
+                    source_csv=config.SOURCE_CSV, snapshot_path=config.SNAPSHOT_PATH,
+                    partitioned_dir=config.PARTITIONED_STORE_DIR),
+    'cwur': Source('cwur', 'CWUR', 'cwurData.csv', columns={
+        'institution': 'university_name',
+        'score': 'total_score',
+    }, keep=['world_rank', 'country', 'year']),
+    'shanghai': Source('shanghai', 'Шанхайский рейтинг (ARWU)', 'shanghaiData.csv', columns={
+        'alumni': 'teaching',
+        'pub': 'research',
+        'hici': 'citations',
+    }, keep=['world_rank', 'university_name', 'total_score', 'year']),
+}
+
+
+def enabled():
+    # Источники, включенные в этом развертывании (UNIVERSITY_SOURCES), в порядке настройки
+    return [SOURCES[name] for name in config.SOURCES if name in SOURCES]
+
+
+def require(name=None):
+    # Источник по имени; None - источник по умолчанию. Неизвестный или выключенный - ValueError
+    name = name or config.DEFAULT_SOURCE
+    if name not in SOURCES or name not in config.SOURCES:
+        raise ValueError(f'Unknown ranking source {name!r}, expected one of {", ".join(config.SOURCES)}')
+    return SOURCES[name]
+
+
+def get(name=None):
+    # Источник, выбранный в браузере. Выбор сохраняется в браузере (persistence) и может пережить
+    # выключение источника в UNIVERSITY_SOURCES - тогда страницы показывают источник по умолчанию
+    try:
+        return require(name)
+    except ValueError:
+        if name not in _unknown:
+            _unknown.add(name)
+            logger.warning('Unknown ranking source %r, using %s', name, config.DEFAULT_SOURCE)
+        return require(config.DEFAULT_SOURCE)
+
+
+# Неизвестные имена, о которых уже предупредили в журнале
+_unknown = set()
+
+
+def options():
+    return [{'label': source.label, 'value': source.name} for source in enabled()]
@@ -0,0 +1,40 @@
+# Проверки на маленьких таблицах из fixtures/ (UNIVERSITY_FIXTURES=1) во временном каталоге данных.
+# Настройки читаются при импорте config, поэтому окружение задается до импорта модулей приложения.
+#
+# Запуск из корня проекта:  python -m pytest -q tests
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DATA_DIR = tempfile.mkdtemp(prefix='university-tests-')
+os.environ.update({
+    'UNIVERSITY_FIXTURES': '1',
+    'UNIVERSITY_DATA_DIR': DATA_DIR,
+    'UNIVERSITY_SHARED_STORE_DIR': DATA_DIR,
+    'UNIVERSITY_SHARED_STORE': '1',
+    'UNIVERSITY_SOURCES': 'times,cwur,shanghai',
+    'UNIVERSITY_DEFAULT_SOURCE': 'times',
+    'UNIVERSITY_DATA_BACKEND': 'memory',
+    'UNIVERSITY_PAGE_WARMUP': '0',
+    'UNIVERSITY_RELOAD_INTERVAL': '0',
+})
+
+import pytest  # noqa: E402
+
+import config  # noqa: E402
+import data  # noqa: E402
+
+
+@pytest.fixture
+def fresh_data(monkeypatch):
+    # Каждая проверка начинает без загруженных источников и без предела памяти
+    monkeypatch.setattr(config, 'DATA_MEMORY_BUDGET', 0)
+    with data._state_lock:
+        data._states.clear()
+        data._stats['evictions'] = 0
+    yield data
+    with data._state_lock:
+        data._states.clear()
@@ -0,0 +1,40 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import data
+import sources
+from aggregates import AggregateCube
+from preprocessing import build_dataset
+
+
+def state_of(raw, version):
+    return data.DataState(build_dataset(sources.get('times').prepare(raw), version), None)
+
+
+def test_reload_with_added_year_extends_the_cube():
+    raw = pd.read_csv(os.path.join(sources.FIXTURES_DIR, 'timesData.csv'))
+    last_year = raw['year'].max()
+    previous = state_of(raw[raw['year'] < last_year], 'old')
+    frame = build_dataset(sources.get('times').prepare(raw), 'new').frame
+
+    cube = data.extend_cube(previous, frame)
+    assert cube is not None and cube is not previous.cube
+    assert last_year not in previous.cube.years
+    full = AggregateCube.from_frame(frame)
+    assert cube.years == full.years
+    np.testing.assert_allclose(cube.by_country(cube.indicators, year=last_year).set_index('country').sort_index(),
+                               full.by_country(full.indicators, year=last_year).set_index('country').sort_index())
+    for country in full.countries + [None]:
+        np.testing.assert_allclose(cube.by_year(cube.indicators, country=country).to_numpy(),
+                                   full.by_year(full.indicators, country=country).to_numpy())
+
+def test_changed_past_rows_rebuild_the_cube():
+    raw = pd.read_csv(os.path.join(sources.FIXTURES_DIR, 'timesData.csv'))
+    last_year = raw['year'].max()
+    previous = state_of(raw[raw['year'] < last_year], 'old')
+    changed = raw.copy()
+    changed.loc[changed.index[0], 'teaching'] = 1.0
+    frame = build_dataset(sources.get('times').prepare(changed), 'new').frame
+    assert data.extend_cube(previous, frame) is None
@@ -0,0 +1,38 @@
+import pytest
+
+
+@pytest.fixture
+def client(fresh_data):
+    import app
+
+    return app.app.server.test_client()
+
+
+@pytest.mark.parametrize('year', ['20x6', '99999', '-1', ''])
+def test_bad_year_is_rejected_before_streaming(client, year):
+    response = client.get(f'/export/csv?year={year}')
+    assert response.status_code == 400
+
+
+def test_year_filter(client):
+    lines = client.get('/export/csv?year=2016').get_data(as_text=True).splitlines()
+    assert len(lines) > 1
+    assert all(',2016,' in line for line in lines[1:])
+
+
+def test_csv_and_ndjson_export_the_same_values(client):
+    import io
+    import json
+
+    import pandas as pd
+
+    query = 'year=2016&indicator=research&indicator=num_students&indicator=female_percentage'
+    csv = pd.read_csv(io.StringIO(client.get(f'/export/csv?{query}').get_data(as_text=True)), dtype=str,
+                      keep_default_na=False)
+    records = [json.loads(line) for line in client.get(f'/export/ndjson?{query}').get_data(as_text=True).splitlines()]
+    assert len(records) == len(csv)
+    for record, (_, row) in zip(records, csv.iterrows()):
+        for name in ['research', 'num_students', 'female_percentage']:
+            # Те же записи чисел: 64.6 в CSV - 64.6 в NDJSON, пустое значение - null
+            value = record[name]
+            assert (repr(float(value)) if value is not None else '') == row[name]
@@ -0,0 +1,46 @@
+import json
+
+from flask import Response
+
+import http_cache
+
+PAYLOAD = json.dumps({'output': 'page-content.children',
+                      'inputs': [{'id': 'url', 'property': 'pathname', 'value': '/page-2'}],
+                      'state': [{'id': 'ranking-source', 'property': 'value', 'value': 'times'}]})
+
+
+def _callback(server, loaded_after):
+    # Хуки до и после колбэка; между ними загруженные версии подменяются на loaded_after
+    with server.test_request_context(http_cache.DASH_UPDATE, method='POST', data=PAYLOAD,
+                                     content_type='application/json'):
+        assert http_cache.check_not_modified() is None
+        loaded_after()
+        return http_cache.finish_response(Response('{}', mimetype='application/json'))
+
+
+def test_callback_gets_etag_of_unchanged_version(fresh_data):
+    import app
+
+    fresh_data.current('times')
+    response = _callback(app.app.server, lambda: None)
+    assert response.headers.get('ETag')
+
+
+def test_no_etag_when_source_reloaded_during_callback(fresh_data, monkeypatch):
+    import app
+
+    fresh_data.current('times')
+    loaded = fresh_data.loaded()
+
+    def reload():
+        monkeypatch.setattr(fresh_data, 'loaded', lambda: {**loaded, 'times': 'new-version'})
+
+    response = _callback(app.app.server, reload)
+    assert 'ETag' not in response.headers
+
+
+def test_source_loaded_by_callback_gets_etag(fresh_data):
+    import app
+
+    response = _callback(app.app.server, lambda: fresh_data.current('times'))
+    assert response.headers.get('ETag')
@@ -0,0 +1,20 @@
+import time
+
+from metrics import Metrics
+
+
+def test_only_slow_calls_enter_the_profile():
+    metrics = Metrics(profile_rate=1, profile_slow_seconds=0.05)
+
+    @metrics.instrumented('callback')
+    def callback(seconds):
+        time.sleep(seconds)
+
+    for _ in range(3):
+        callback(0)
+    assert metrics.profile_report('callback') is None
+
+    callback(0.1)
+    report = metrics.profile_report('callback')
+    assert report.startswith('1 slow calls')
+    assert 'sleep' in report
@@ -0,0 +1,36 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from parsers import parse_gender_ratio, parse_number, parse_rank
+
+
+def test_rank_ties_and_ranges():
+    ranks = parse_rank(pd.Series(['1', '=45', '201-225', '201–225', '-', None]))
+    np.testing.assert_array_equal(ranks['rank_lo'], [1, 45, 201, 201, np.nan, np.nan])
+    np.testing.assert_array_equal(ranks['rank_hi'], [1, 45, 225, 225, np.nan, np.nan])
+    np.testing.assert_array_equal(ranks['rank_mid'], [1, 45, 213, 213, np.nan, np.nan])
+    assert ranks['is_tied'].tolist() == [False, True, False, False, False, False]
+
+
+def test_numeric_rank_column_with_blanks():
+    # read_csv читает ранги с пропуском как float64
+    raw = pd.read_csv(io.StringIO('world_rank,x\n1,a\n,b\n3,c'))
+    ranks = parse_rank(raw['world_rank'])
+    np.testing.assert_array_equal(ranks['rank_mid'], [1, np.nan, 3])
+    np.testing.assert_array_equal(ranks['rank_lo'], ranks['rank_hi'])
+    assert not ranks['is_tied'].any()
+
+
+def test_numbers():
+    values = parse_number(pd.Series(['20,152', '25%', '-', '', '64.6', None]))
+    np.testing.assert_array_equal(values, np.array([20152, 25, np.nan, np.nan, 64.6, np.nan], dtype=np.float32))
+    assert values.dtype == np.float32
+    np.testing.assert_array_equal(parse_number(pd.Series([1.5, np.nan])), np.array([1.5, np.nan], dtype=np.float32))
+
+
+def test_gender_ratio():
+    genders = parse_gender_ratio(pd.Series(['33 : 67', '50:50', '-', None]))
+    np.testing.assert_allclose(genders['female_percentage'], [33, 50, np.nan, np.nan])
+    np.testing.assert_allclose(genders['male_percentage'], [67, 50, np.nan, np.nan])
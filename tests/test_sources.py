@@ -0,0 +1,74 @@
+import os
+
+import config
+import shared_store
+import sources
+
+
+def test_switching_source_changes_page_data(fresh_data):
+    from page_registry import registry
+
+    times = fresh_data.current('times')
+    cwur = fresh_data.current('cwur')
+    assert (times.source, cwur.source) == ('times', 'cwur')
+    assert times.version != cwur.version
+    # Макет страницы строится по данным выбранного источника
+    assert registry.layout('/page-2', 'cwur') is not registry.layout('/page-2', 'times')
+    assert 'cwur' in fresh_data.loaded() and 'times' in fresh_data.loaded()
+
+
+def test_unknown_or_disabled_source_falls_back_to_default(fresh_data, monkeypatch):
+    import app
+
+    # Выбор, сохраненный в браузере, пережил выключение источника
+    monkeypatch.setattr(config, 'SOURCES', ['times', 'cwur'])
+    assert sources.get('shanghai').name == config.DEFAULT_SOURCE
+    assert sources.get('no-such-source').name == config.DEFAULT_SOURCE
+    assert app.render_page_content('/page-2', 'shanghai') is app.render_page_content('/page-2', 'times')
+
+    response = app.app.server.test_client().get('/export/csv?source=shanghai')
+    assert response.status_code == 400
+
+
+def test_memory_budget_evicts_least_recently_used(fresh_data, monkeypatch):
+    times = fresh_data.current('times')
+    cwur = fresh_data.current('cwur')
+    # Помещаются источник по умолчанию и еще один
+    monkeypatch.setattr(config, 'DATA_MEMORY_BUDGET', times.memory_bytes + cwur.memory_bytes + 1)
+    fresh_data.current('shanghai')
+    assert not fresh_data.is_loaded('cwur')
+    assert fresh_data.is_loaded('times') and fresh_data.is_loaded('shanghai')
+    assert fresh_data.stats()['evictions'] == 1
+
+    # Источник по умолчанию не выгружается, даже если бюджет меньше него самого
+    monkeypatch.setattr(config, 'DATA_MEMORY_BUDGET', 1)
+    fresh_data.current('cwur')
+    assert fresh_data.is_loaded('times') and fresh_data.is_loaded('cwur')
+    assert not fresh_data.is_loaded('shanghai')
+
+
+def test_shared_stores_of_sources_coexist(fresh_data):
+    times = fresh_data.current('times')
+    fresh_data.current('cwur')
+    fresh_data.current('shanghai')
+
+    for source in sources.enabled():
+        version = fresh_data.current(source.name).version
+        assert os.path.exists(shared_store.store_path(config.SHARED_STORE_DIR, source.name, version))
+    # Новый процесс подключается к файлу источника по умолчанию, а не собирает датасет заново
+    attached = fresh_data._attach_shared_store(sources.get('times'))
+    assert attached is not None and attached.version == times.version
+
+
+def test_source_stats_report_dataset(fresh_data):
+    fresh_data.current('times')
+    report = fresh_data.stats()['sources']['times']['dataset']
+    assert report['rows'] > 0 and report['memory_bytes'] > 0 and report['build_seconds'] >= 0
+    assert fresh_data.stats()['sources']['cwur']['dataset'] is None
+
+
+def test_cwur_ranks_do_not_become_scores(fresh_data):
+    # citations у CWUR - место по цитированию, в критерии оно не попадает
+    df = fresh_data.current('cwur').df
+    assert df[['teaching', 'research', 'citations']].isna().all().all()
+    assert df['total_score'].notna().any() and df['country'].notna().any()
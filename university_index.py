@@ -0,0 +1,58 @@
+import numpy as np
+
+# Индекс строк по университетам. Канонический датасет отсортирован по (university_name, year),
+# поэтому строки каждого университета занимают непрерывный диапазон [start, stop),
+# а внутри диапазона годы идут по возрастанию. Колбэки получают срезы за O(k)
+# вместо сравнения строк по всей таблице.
+
+
+class UniversityIndex:
+
+    def __init__(self, frame):
+        names = frame['university_name'].array
+        codes = np.asarray(names.codes)
+        if len(codes) and (np.diff(codes) < 0).any():
+            raise ValueError('Dataset must be sorted by university_name to build UniversityIndex')
+        self.names = list(names.categories)
+        self._codes = {name: code for code, name in enumerate(self.names)}
+        categories = np.arange(len(self.names))
+        self.starts = np.searchsorted(codes, categories, side='left')
+        self.stops = np.searchsorted(codes, categories, side='right')
+        self.years = frame['year'].to_numpy()
+
+    def __contains__(self, university):
+        return university in self._codes
+
+    def code(self, university):
+        # Постоянный номер университета (код категории) или None
+        return self._codes.get(university)
+
+    def range(self, university):
+        code = self._codes.get(university)
+        if code is None:
+            return 0, 0
+        return int(self.starts[code]), int(self.stops[code])
+
+    def slice(self, frame, university):
+        # Срез-представление без копирования данных
+        start, stop = self.range(university)
+        return frame.iloc[start:stop]
+
+    def row(self, university, year):
+        # Номер строки (университет, год) или None
+        start, stop = self.range(university)
+        position = start + int(np.searchsorted(self.years[start:stop], year))
+        if position < stop and self.years[position] == year:
+            return position
+        return None
+
+    def rows(self, universities, year=None):
+        # Номера строк для нескольких университетов (в порядке выбора), при year - только за этот год
+        if year is not None:
+            found = (self.row(university, year) for university in universities)
+            return np.array([position for position in found if position is not None], dtype=np.int64)
+        ranges = [np.arange(*self.range(university)) for university in universities]
+        return np.concatenate(ranges) if ranges else np.empty(0, dtype=np.int64)
+
+    def take(self, frame, universities, year=None):
+        return frame.iloc[self.rows(universities, year)]
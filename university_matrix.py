@@ -0,0 +1,52 @@
+import numpy as np
+
+from aggregates import INDICATORS
+
+# Широкие матрицы университет x год для показателей (одна трехмерная таблица показатель x университет x год).
+# Строятся один раз при загрузке датасета; сравнение K университетов - выборка K строк по кодам
+# университетов, время зависит только от K, а не от размера таблицы.
+
+
+class UniversityYearMatrix:
+
+    def __init__(self, frame, university_index, indicators=INDICATORS):
+        self.indicators = list(indicators)
+        self._indicator_pos = {name: i for i, name in enumerate(self.indicators)}
+        self.university_index = university_index
+        years = frame['year'].to_numpy()
+        self.years = np.unique(years)
+
+        # Строка таблицы -> (код университета, номер года)
+        codes = np.asarray(frame['university_name'].array.codes)
+        year_pos = np.searchsorted(self.years, years)
+        shape = (len(university_index.names), len(self.years))
+
+        # present - у университета есть строка за этот год (значение показателя при этом может быть пропуском)
+        self.present = np.zeros(shape, dtype=bool)
+        self.present[codes, year_pos] = True
+        self.values = np.full((len(self.indicators),) + shape, np.nan, dtype=np.float32)
+        for i, name in enumerate(self.indicators):
+            self.values[i, codes, year_pos] = frame[name].to_numpy()
+        self.present.flags.writeable = False
+        self.values.flags.writeable = False
+
+    def gather(self, indicator, codes):
+        # (значения K x год, наличие строк K x год) для университетов с кодами codes
+        codes = np.asarray(codes, dtype=np.int64)
+        return self.values[self._indicator_pos[indicator]][codes], self.present[codes]
+
+    def series(self, indicator, universities):
+        # Для каждого университета в порядке выбора - годы, за которые есть строки, и значения показателя.
+        # У неизвестного названия - пустые массивы.
+        codes = [self.university_index.code(university) for university in universities]
+        values, present = self.gather(indicator, [code for code in codes if code is not None])
+        empty = (self.years[:0], np.empty(0, dtype=np.float32))
+        rows = iter(zip(values, present))
+        result = []
+        for code in codes:
+            if code is None:
+                result.append(empty)
+            else:
+                row, mask = next(rows)
+                result.append((self.years[mask], row[mask]))
+        return result
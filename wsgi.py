@@ -0,0 +1,23 @@
+import gc
+
+import data
+from app import app
+from page_registry import registry
+
+# Точка входа для WSGI-сервера: gunicorn -c gunicorn.conf.py wsgi:server
+# С preload_app модуль импортируется один раз в главном процессе, до fork. Поэтому датасет,
+# агрегаты, индексы и макеты страниц строятся здесь, а рабочие процессы получают их готовыми
+# и делят страницы памяти с главным (copy-on-write).
+# Заранее загружается только источник рейтингов по умолчанию, остальные каждый процесс загружает при первом
+# выборе (если общий файл источника уже опубликован, он подключается без сборки).
+
+# Дожидаемся прогрева: fork при работающем потоке прогрева оставил бы в процессах захваченные блокировки
+registry.start_warm_up().join()
+if not data.is_loaded():
+    raise RuntimeError('Dataset failed to load, see the log above')
+
+# Объекты, созданные при загрузке, больше не нужно обходить сборщику мусора: иначе он трогает
+# их заголовки в каждом процессе и разделяемые страницы копируются
+gc.freeze()
+
+server = app.server